@@ -0,0 +1,124 @@
+"""
+Mide el puente contra dos brokers locales (uno hace de "nube"):
+
+    mosquitto -p 1883 &
+    mosquitto -p 1884 &
+    python benchmark.py --mensajes 20000 --tamano 200
+
+1. Corte: el reenvío está pausado y se publican N mensajes en el broker
+   local; se mide cuántos por segundo llegan a disco y la profundidad.
+2. Reenvío: se reanuda y se mide cuánto tarda en llegar todo a la nube
+   (desempaquetado en sus topics originales), junto con la profundidad
+   de la cola cada segundo.
+"""
+
+import argparse
+import json
+import shutil
+import tempfile
+import time
+
+from puente import Bridge, crear_cliente, separar
+from desempaquetador import Unpacker
+
+
+def esperar(condicion, timeout, muestras=None, stats=None):
+    inicio = time.perf_counter()
+    while not condicion():
+        if time.perf_counter() - inicio > timeout:
+            return False
+        if muestras is not None and (not muestras or time.perf_counter() - muestras[-1][0] - inicio >= 1):
+            muestras.append((time.perf_counter() - inicio, stats()["en_cola"]))
+        time.sleep(0.01)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del puente local -> nube")
+    parser.add_argument("--local", default="localhost:1883")
+    parser.add_argument("--nube", default="localhost:1884")
+    parser.add_argument("--mensajes", type=int, default=10000)
+    parser.add_argument("--tamano", type=int, default=200, help="Bytes por mensaje")
+    parser.add_argument("--qos", type=int, default=1)
+    parser.add_argument("--ventana", type=int, default=8)
+    parser.add_argument("--max-lote", type=int, default=500)
+    parser.add_argument("--compresion", type=int, default=6)
+    parser.add_argument("--sync", default="interval")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="cola_puente_")
+    unpacker = Unpacker(args.nube)
+    unpacker.start()
+
+    # Cuenta lo que llega a la nube en los topics originales
+    llegados = [0]
+    receptor = crear_cliente("")
+    receptor.on_message = lambda c, u, m: llegados.__setitem__(0, llegados[0] + 1)
+    receptor.connect(*separar(args.nube))
+    receptor.subscribe("state/telemetry/bench", qos=1)
+    receptor.loop_start()
+
+    puente = Bridge(local=args.local, nube=args.nube, topics=["state/telemetry/#"],
+                    directorio=directorio, puente_id="bench", max_lote=args.max_lote,
+                    ventana=args.ventana, compresion=args.compresion, sync=args.sync)
+    puente.pausar()
+    puente.start()
+    time.sleep(1)
+
+    publicador = crear_cliente("")
+    publicador.connect(*separar(args.local))
+    publicador.loop_start()
+
+    # Lecturas parecidas a la telemetría real (JSON con relleno)
+    relleno = "x" * max(args.tamano - 60, 0)
+    print(f"📤 Publicando {args.mensajes} mensajes con el reenvío pausado...")
+    inicio = time.perf_counter()
+    for i in range(args.mensajes):
+        payload = json.dumps({"device_id": "bench", "seq": i, "temp": 20 + i % 10, "x": relleno})
+        publicador.publish("state/telemetry/bench", payload, qos=args.qos)
+    completo = esperar(lambda: puente.stats()["recibidos"] >= args.mensajes, 120)
+    corte = time.perf_counter() - inicio
+    stats = puente.stats()
+    print(f"💾 {stats['recibidos']} en disco en {corte:.2f} s "
+          f"({stats['recibidos'] / corte:.0f} msg/s) | en cola: {stats['en_cola']} | "
+          f"{stats['bytes_en_disco'] / 1024:.0f} KB")
+    if not completo:
+        print("⚠️ No llegaron todos los mensajes al puente")
+
+    print("🔁 Reanudando reenvío...")
+    muestras = []
+    inicio = time.perf_counter()
+    puente.reanudar()
+    completo = esperar(lambda: llegados[0] >= stats["recibidos"], 300, muestras, puente.stats)
+    reenvio = time.perf_counter() - inicio
+    final = puente.stats()
+
+    resultado = {
+        "mensajes": args.mensajes,
+        "tamano": args.tamano,
+        "qos": args.qos,
+        "ventana": args.ventana,
+        "max_lote": args.max_lote,
+        "compresion_nivel": args.compresion,
+        "sync": args.sync,
+        "ingesta_msg_s": round(stats["recibidos"] / corte, 1),
+        "reenvio_s": round(reenvio, 3),
+        "reenvio_msg_s": round(llegados[0] / reenvio, 1),
+        "llegados": llegados[0],
+        "lotes": final["lotes_enviados"],
+        "relacion_compresion": final["compresion"],
+        "profundidad": [(round(t, 1), n) for t, n in muestras]
+    }
+    print(json.dumps(resultado, indent=2))
+    if not completo:
+        print(f"⚠️ Faltaron {stats['recibidos'] - llegados[0]} mensajes en la nube")
+
+    publicador.loop_stop()
+    receptor.loop_stop()
+    puente.stop()
+    unpacker.stop()
+    shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
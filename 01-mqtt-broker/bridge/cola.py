@@ -0,0 +1,232 @@
+"""
+Cola en disco de solo anexado para el puente local -> nube.
+
+Los mensajes se escriben en segmentos (archivos .log) con un registro por
+mensaje. Un archivo "cursor" guarda la posición del primer mensaje que la
+nube todavía no confirmó; al arrancar se reanuda desde ahí, así un corte
+de WAN o un reinicio no pierde mensajes. Los segmentos ya confirmados se
+borran.
+
+El archivo "epoca" guarda un número aleatorio que se elige al crear la
+cola. Si la carpeta se borra y se vuelve a crear, las posiciones empiezan
+de nuevo en (0, 0) con otra época, y el desempaquetador no confunde los
+lotes nuevos con repetidos.
+
+Registro:  crc32 (I) | largo payload (I) | ts (d) | qos (B) | retain (B) | largo topic (H) | topic | payload
+"""
+
+import os
+import struct
+import threading
+import time
+import zlib
+
+CABECERA = struct.Struct("!IIdBBH")
+
+
+class Mensaje:
+    __slots__ = ("topic", "payload", "qos", "retain", "ts")
+
+    def __init__(self, topic, payload, qos=0, retain=False, ts=None):
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.retain = retain
+        self.ts = ts if ts is not None else time.time()
+
+
+class DiskQueue:
+    def __init__(self, directorio, segmento_bytes=16 * 1024 * 1024, sync="interval",
+                 sync_intervalo=1.0):
+        """
+        Args:
+            directorio: Carpeta de los segmentos y del cursor
+            segmento_bytes: Tamaño a partir del cual se abre un segmento nuevo
+            sync: "always" (fsync por mensaje), "interval" o "never"
+            sync_intervalo: Segundos entre fsync con sync="interval"
+        """
+        self.directorio = directorio
+        self.segmento_bytes = segmento_bytes
+        self.sync = sync
+        self.sync_intervalo = sync_intervalo
+        os.makedirs(directorio, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._ultimo_sync = time.monotonic()
+        self.pendientes = 0          # Mensajes sin confirmar
+
+        self.epoca = self._leer_epoca()
+        self._confirmado = self._leer_cursor()
+        self._recuperar()
+        self._lectura = self._confirmado
+        self._lector = None          # (segmento, archivo abierto)
+
+    # === ARCHIVOS ===
+    def _ruta(self, segmento):
+        return os.path.join(self.directorio, f"{segmento:010d}.log")
+
+    def _segmentos(self):
+        return sorted(int(nombre[:-4]) for nombre in os.listdir(self.directorio)
+                      if nombre.endswith(".log"))
+
+    def _leer_cursor(self):
+        try:
+            with open(os.path.join(self.directorio, "cursor")) as f:
+                segmento, offset = f.read().split()
+            return int(segmento), int(offset)
+        except (OSError, ValueError):
+            segmentos = self._segmentos()
+            return (segmentos[0] if segmentos else 0), 0
+
+    def _leer_epoca(self):
+        ruta = os.path.join(self.directorio, "epoca")
+        try:
+            with open(ruta) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            epoca = int.from_bytes(os.urandom(8), "big")
+            with open(ruta + ".tmp", "w") as f:
+                f.write(str(epoca))
+            os.replace(ruta + ".tmp", ruta)
+            return epoca
+
+    def _guardar_cursor(self):
+        ruta = os.path.join(self.directorio, "cursor")
+        with open(ruta + ".tmp", "w") as f:
+            f.write(f"{self._confirmado[0]} {self._confirmado[1]}")
+        os.replace(ruta + ".tmp", ruta)
+
+    def _recuperar(self):
+        """Cuenta los mensajes pendientes y corta un registro incompleto al final"""
+        segmentos = [s for s in self._segmentos() if s >= self._confirmado[0]] or [self._confirmado[0]]
+        for segmento in segmentos:
+            inicio = self._confirmado[1] if segmento == self._confirmado[0] else 0
+            if not os.path.exists(self._ruta(segmento)):
+                continue
+            with open(self._ruta(segmento), "rb") as f:
+                f.seek(inicio)
+                valido = inicio
+                while True:
+                    registro = self._leer_registro(f)
+                    if registro is None:
+                        break
+                    self.pendientes += 1
+                    valido = f.tell()
+            if os.path.getsize(self._ruta(segmento)) > valido:
+                print(f"⚠️ Registro incompleto en el segmento {segmento}, se descarta")
+                with open(self._ruta(segmento), "r+b") as f:
+                    f.truncate(valido)
+
+        self._segmento = segmentos[-1]
+        self._escritor = open(self._ruta(self._segmento), "ab")
+
+    @staticmethod
+    def _leer_registro(f):
+        cabecera = f.read(CABECERA.size)
+        if len(cabecera) < CABECERA.size:
+            return None
+        crc, largo, ts, qos, retain, largo_topic = CABECERA.unpack(cabecera)
+        cuerpo = f.read(largo_topic + largo)
+        if len(cuerpo) < largo_topic + largo or zlib.crc32(cuerpo) != crc:
+            return None
+        topic = cuerpo[:largo_topic].decode("utf-8")
+        return Mensaje(topic, cuerpo[largo_topic:], qos, bool(retain), ts)
+
+    # === ESCRITURA ===
+    def append(self, mensaje):
+        """Anexa un mensaje al segmento actual"""
+        topic = mensaje.topic.encode("utf-8")
+        cuerpo = topic + bytes(mensaje.payload)
+        cabecera = CABECERA.pack(zlib.crc32(cuerpo), len(mensaje.payload), mensaje.ts,
+                                 mensaje.qos, int(mensaje.retain), len(topic))
+        with self._lock:
+            if self._escritor.tell() >= self.segmento_bytes:
+                self._rotar()
+            self._escritor.write(cabecera + cuerpo)
+            self._escritor.flush()
+            self.pendientes += 1
+            self._sincronizar()
+
+    def _rotar(self):
+        # Debe llamarse con el lock tomado
+        os.fsync(self._escritor.fileno())
+        self._escritor.close()
+        self._segmento += 1
+        self._escritor = open(self._ruta(self._segmento), "ab")
+
+    def _sincronizar(self):
+        # Debe llamarse con el lock tomado
+        if self.sync == "always" or (self.sync == "interval" and
+                                     time.monotonic() - self._ultimo_sync >= self.sync_intervalo):
+            os.fsync(self._escritor.fileno())
+            self._ultimo_sync = time.monotonic()
+
+    # === LECTURA Y CONFIRMACIÓN ===
+    def leer(self, max_mensajes=500, max_bytes=256 * 1024):
+        """
+        Lee mensajes desde la posición de lectura (no los confirma)
+
+        Returns:
+            (mensajes, posición final): la posición se pasa a ack() cuando
+            la nube confirma el lote
+        """
+        mensajes, tamaño = [], 0
+        with self._lock:
+            segmento, offset = self._lectura
+            while len(mensajes) < max_mensajes and tamaño < max_bytes:
+                f = self._abrir_lector(segmento)
+                if f is None:
+                    break
+                f.seek(offset)
+                mensaje = self._leer_registro(f)
+                if mensaje is None:
+                    # Fin del segmento: seguir con el siguiente si ya existe
+                    if segmento < self._segmento:
+                        segmento, offset = segmento + 1, 0
+                        continue
+                    break
+                offset = f.tell()
+                mensajes.append(mensaje)
+                tamaño += len(mensaje.payload)
+            self._lectura = (segmento, offset)
+        return mensajes, (segmento, offset)
+
+    def _abrir_lector(self, segmento):
+        if self._lector is not None and self._lector[0] == segmento:
+            return self._lector[1]
+        if self._lector is not None:
+            self._lector[1].close()
+            self._lector = None
+        if not os.path.exists(self._ruta(segmento)):
+            return None
+        self._lector = (segmento, open(self._ruta(segmento), "rb"))
+        return self._lector[1]
+
+    def ack(self, posicion, cantidad):
+        """Confirma los mensajes hasta `posicion` y borra los segmentos ya enviados"""
+        with self._lock:
+            self._confirmado = posicion
+            self.pendientes -= cantidad
+            self._guardar_cursor()
+            for segmento in self._segmentos():
+                if segmento >= posicion[0]:
+                    break
+                if self._lector is not None and self._lector[0] == segmento:
+                    self._lector[1].close()
+                    self._lector = None
+                os.remove(self._ruta(segmento))
+
+    def rebobinar(self):
+        """Vuelve a leer desde lo último confirmado (tras una reconexión)"""
+        with self._lock:
+            self._lectura = self._confirmado
+
+    def bytes_en_disco(self):
+        return sum(os.path.getsize(self._ruta(s)) for s in self._segmentos())
+
+    def close(self):
+        with self._lock:
+            os.fsync(self._escritor.fileno())
+            self._escritor.close()
+            if self._lector is not None:
+                self._lector[1].close()
@@ -0,0 +1,83 @@
+"""
+Lado nube del puente: recibe los lotes de bridge/+/lote y vuelve a
+publicar cada mensaje en su topic original del broker en la nube, así la
+app móvil sigue escuchando state/telemetry/#, result/# y alert/#.
+
+Los lotes repetidos (reenviados tras una reconexión) se descartan por su
+posición en la cola del puente; si la época de la cola cambia (la carpeta
+se creó de nuevo) la posición vuelve a empezar. La entrega es "al menos una vez": si un
+lote reenviado se corta en otro punto pueden repetirse algunos mensajes.
+
+    NUBE=localhost:1884 python desempaquetador.py
+"""
+
+import os
+import signal
+import threading
+
+from lotes import desempaquetar
+from puente import crear_cliente, separar
+
+NUBE = os.getenv("NUBE", "localhost:1884")
+TOPIC_LOTES = "bridge/+/lote"
+
+
+class Unpacker:
+    def __init__(self, nube=NUBE):
+        self.nube = nube
+        self._ultima = {}        # puente -> (época, segmento, offset) del último lote publicado
+        self.stats = {"lotes": 0, "mensajes": 0, "repetidos": 0, "invalidos": 0}
+
+        self.cliente = crear_cliente("")
+        self.cliente.on_connect = self._on_connect
+        self.cliente.on_message = self._on_message
+
+    def _on_connect(self, client, userdata, flags, rc):
+        print(f"☁️ Desempaquetador conectado a {self.nube} (rc={rc})")
+        client.subscribe(TOPIC_LOTES, qos=1)
+
+    def _on_message(self, client, userdata, msg):
+        puente = msg.topic.split("/")[1]
+        try:
+            posicion, mensajes = desempaquetar(msg.payload)
+        except Exception as e:
+            print(f"❌ Lote inválido de {puente}: {e}")
+            self.stats["invalidos"] += 1
+            return
+
+        ultima = self._ultima.get(puente)
+        if ultima is not None and posicion[0] == ultima[0] and posicion <= ultima:
+            self.stats["repetidos"] += 1
+            return
+        self._ultima[puente] = posicion
+
+        for m in mensajes:
+            client.publish(m.topic, m.payload, qos=m.qos, retain=m.retain)
+        self.stats["lotes"] += 1
+        self.stats["mensajes"] += len(mensajes)
+
+    def start(self):
+        self.cliente.connect(*separar(self.nube), keepalive=60)
+        self.cliente.loop_start()
+
+    def stop(self):
+        self.cliente.loop_stop()
+        self.cliente.disconnect()
+
+
+def main():
+    unpacker = Unpacker()
+    unpacker.start()
+
+    detener = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: detener.set())
+    try:
+        while not detener.wait(10):
+            print("📊", unpacker.stats)
+    except KeyboardInterrupt:
+        pass
+    unpacker.stop()
+
+
+if __name__ == "__main__":
+    main()
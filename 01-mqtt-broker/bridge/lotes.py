@@ -0,0 +1,83 @@
+"""
+Formato de los lotes que el puente publica hacia la nube.
+
+    MAGIC "MQB2" | flags (B) | época (Q) | segmento fin (I) | offset fin (Q) | cantidad (I) | cuerpo
+
+El cuerpo (comprimido con zlib si flags & 1) tiene un registro por mensaje:
+
+    ts (d) | qos (B) | retain (B) | largo topic (H) | largo payload (I) | topic | payload
+
+Dentro de una época de la cola la posición final (segmento, offset) crece
+siempre: el desempaquetador la usa para descartar lotes repetidos tras una
+reconexión. La época cambia si la cola del puente se crea de nuevo.
+"""
+
+import struct
+import zlib
+
+from cola import Mensaje
+
+MAGIC = b"MQB2"
+CABECERA = struct.Struct("!4sBQIQI")
+REGISTRO = struct.Struct("!dBBHI")
+COMPRIMIDO = 1
+
+
+def empaquetar(mensajes, posicion, nivel=6):
+    """
+    Serializa un lote de mensajes
+
+    Args:
+        mensajes: Lista de Mensaje
+        posicion: (época, segmento, offset) final del lote en la cola
+        nivel: Nivel de zlib (0 = sin comprimir)
+
+    Returns:
+        bytes: Lote listo para publicar
+    """
+    partes = []
+    for m in mensajes:
+        topic = m.topic.encode("utf-8")
+        partes.append(REGISTRO.pack(m.ts, m.qos, int(m.retain), len(topic), len(m.payload)))
+        partes.append(topic)
+        partes.append(bytes(m.payload))
+    cuerpo = b"".join(partes)
+
+    flags = 0
+    if nivel:
+        comprimido = zlib.compress(cuerpo, nivel)
+        # Payloads ya comprimidos (JPEG) pueden crecer: se envía lo más corto
+        if len(comprimido) < len(cuerpo):
+            cuerpo, flags = comprimido, COMPRIMIDO
+
+    epoca, segmento, offset = posicion
+    return CABECERA.pack(MAGIC, flags, epoca, segmento, offset, len(mensajes)) + cuerpo
+
+
+def desempaquetar(lote):
+    """
+    Returns:
+        ((época, segmento, offset) final, lista de Mensaje)
+
+    Raises:
+        ValueError: Si el lote no tiene el formato esperado
+    """
+    if len(lote) < CABECERA.size:
+        raise ValueError("Lote demasiado corto")
+    magic, flags, epoca, segmento, offset, cantidad = CABECERA.unpack_from(lote)
+    if magic != MAGIC:
+        raise ValueError("No es un lote del puente")
+
+    cuerpo = memoryview(lote)[CABECERA.size:]
+    if flags & COMPRIMIDO:
+        cuerpo = memoryview(zlib.decompress(cuerpo))
+
+    mensajes, i = [], 0
+    for _ in range(cantidad):
+        ts, qos, retain, largo_topic, largo = REGISTRO.unpack_from(cuerpo, i)
+        i += REGISTRO.size
+        topic = bytes(cuerpo[i:i + largo_topic]).decode("utf-8")
+        i += largo_topic
+        mensajes.append(Mensaje(topic, bytes(cuerpo[i:i + largo]), qos, bool(retain), ts))
+        i += largo
+    return (epoca, segmento, offset), mensajes
@@ -0,0 +1,266 @@
+"""
+Puente de almacenamiento y reenvío: broker local -> broker en la nube.
+
+Todo mensaje de los topics locales se escribe primero en la cola en disco;
+un hilo aparte lo reenvía a la nube en lotes comprimidos. Si la WAN se cae
+los mensajes se siguen acumulando en disco y se reenvían al reconectar.
+
+    python puente.py
+    LOCAL=localhost:1883 NUBE=broker.emqx.io:8883 NUBE_TLS=1 python puente.py
+"""
+
+import collections
+import json
+import os
+import signal
+import threading
+import time
+import paho.mqtt.client as mqtt
+
+from cola import DiskQueue, Mensaje
+from lotes import empaquetar
+
+# === CONFIGURACIÓN ===
+LOCAL = os.getenv("LOCAL", "localhost:1883")
+NUBE = os.getenv("NUBE", "localhost:1884")
+NUBE_TLS = os.getenv("NUBE_TLS", "0") == "1"
+NUBE_USUARIO = os.getenv("NUBE_USUARIO")
+NUBE_CLAVE = os.getenv("NUBE_CLAVE")
+PUENTE_ID = os.getenv("PUENTE_ID", "invernadero")
+TOPICS = os.getenv("TOPICS", "state/telemetry/#,result/#,alert/#").split(",")
+DIRECTORIO = os.getenv("DIRECTORIO", "cola_puente")
+MAX_LOTE = int(os.getenv("MAX_LOTE", "500"))               # Mensajes por lote
+MAX_LOTE_BYTES = int(os.getenv("MAX_LOTE_BYTES", str(256 * 1024)))
+VENTANA = int(os.getenv("VENTANA", "8"))                   # Lotes sin confirmar en vuelo
+COMPRESION = int(os.getenv("COMPRESION", "6"))             # Nivel de zlib (0 = sin comprimir)
+SYNC = os.getenv("SYNC", "interval")                       # "always", "interval" o "never"
+REPORTE_CADA = float(os.getenv("REPORTE_CADA", "10"))      # Segundos entre reportes
+
+
+def crear_cliente(client_id):
+    try:
+        # paho-mqtt 2.x exige indicar la versión de los callbacks
+        return mqtt.Client(client_id=client_id, callback_api_version=mqtt.CallbackAPIVersion.VERSION1)
+    except AttributeError:
+        return mqtt.Client(client_id=client_id)
+
+
+def separar(direccion):
+    host, _, puerto = direccion.partition(":")
+    return host, int(puerto or 1883)
+
+
+class Bridge:
+    def __init__(self, local=LOCAL, nube=NUBE, topics=TOPICS, directorio=DIRECTORIO,
+                 puente_id=PUENTE_ID, max_lote=MAX_LOTE, max_lote_bytes=MAX_LOTE_BYTES,
+                 ventana=VENTANA, compresion=COMPRESION, sync=SYNC):
+        self.local = local
+        self.nube = nube
+        self.topics = topics
+        self.topic_lote = f"bridge/{puente_id}/lote"
+        self.max_lote = max_lote
+        self.max_lote_bytes = max_lote_bytes
+        self.ventana = ventana
+        self.compresion = compresion
+
+        self.cola = DiskQueue(directorio, sync=sync)
+
+        # Lotes publicados y sin confirmar, en orden de envío: mid -> (posición, cantidad)
+        self._en_vuelo = collections.OrderedDict()
+        self._confirmados = set()
+        # PUBACK que llegan antes de registrar el mid (publish() corre sin el lock)
+        self._tempranos = set()
+        # Cambia en cada conexión: un lote leído antes de reconectar no se registra
+        self._generacion = 0
+        self._cond = threading.Condition(threading.RLock())
+        self._conectado = threading.Event()
+        self._hay_datos = threading.Event()
+        self._activo = False
+        self._pausado = False
+        self._hilo = None
+
+        self._stats = {"recibidos": 0, "lotes_enviados": 0, "mensajes_confirmados": 0,
+                       "bytes_crudos": 0, "bytes_enviados": 0, "reconexiones": 0,
+                       "errores_disco": 0}
+
+        self.cliente_local = crear_cliente(f"puente-{puente_id}-local")
+        self.cliente_local.on_connect = self._on_connect_local
+        self.cliente_local.on_message = self._on_message_local
+
+        self.cliente_nube = crear_cliente(f"puente-{puente_id}")
+        self.cliente_nube.on_connect = self._on_connect_nube
+        self.cliente_nube.on_disconnect = self._on_disconnect_nube
+        self.cliente_nube.on_publish = self._on_publish_nube
+        self.cliente_nube.max_inflight_messages_set(ventana)
+        if NUBE_TLS:
+            self.cliente_nube.tls_set()
+        if NUBE_USUARIO:
+            self.cliente_nube.username_pw_set(NUBE_USUARIO, NUBE_CLAVE)
+
+    # === LOCAL ===
+    def _on_connect_local(self, client, userdata, flags, rc):
+        print(f"✅ Conectado al broker local {self.local} (rc={rc})")
+        for topic in self.topics:
+            client.subscribe(topic.strip(), qos=1)
+
+    def _on_message_local(self, client, userdata, msg):
+        # Primero a disco: si la nube no está, el mensaje espera ahí
+        try:
+            self.cola.append(Mensaje(msg.topic, msg.payload, msg.qos, msg.retain))
+        except OSError as e:
+            # Disco lleno o sin permisos: el mensaje se pierde, pero el loop
+            # local sigue vivo (una excepción aquí lo detendría)
+            self._stats["errores_disco"] += 1
+            print(f"❌ No se pudo escribir en la cola: {e}")
+            return
+        self._stats["recibidos"] += 1
+        self._hay_datos.set()
+
+    # === NUBE ===
+    def _on_connect_nube(self, client, userdata, flags, rc):
+        if rc != 0:
+            print(f"❌ Falló la conexión a la nube, código: {rc}")
+            return
+        print(f"☁️ Conectado a la nube {self.nube}")
+        with self._cond:
+            # Lo que estaba en vuelo se reenvía desde lo último confirmado
+            self._en_vuelo.clear()
+            self._confirmados.clear()
+            self._tempranos.clear()
+            self._generacion += 1
+            self.cola.rebobinar()
+            self._cond.notify_all()
+        self._conectado.set()
+
+    def _on_disconnect_nube(self, client, userdata, rc):
+        self._conectado.clear()
+        self._stats["reconexiones"] += 1
+        print(f"⚠️ Desconectado de la nube (rc={rc}); {self.cola.pendientes} mensajes en cola")
+
+    def _on_publish_nube(self, client, userdata, mid):
+        # QoS 1: PUBACK del broker; QoS 0: el lote ya salió por el socket
+        with self._cond:
+            # Lotes de antes de una reconexión ya no se esperan: se reenvían desde la cola
+            if mid in self._en_vuelo:
+                self._confirmados.add(mid)
+                self._avanzar()
+            else:
+                # Puede llegar antes de que _reenviar registre el mid
+                self._tempranos.add(mid)
+
+    def _avanzar(self):
+        # Debe llamarse con el lock tomado. Solo se confirma en orden de envío
+        # para que el cursor de la cola nunca salte un lote pendiente.
+        posicion, cantidad = None, 0
+        while self._en_vuelo:
+            mid = next(iter(self._en_vuelo))
+            if mid not in self._confirmados:
+                break
+            self._confirmados.discard(mid)
+            posicion, n = self._en_vuelo.pop(mid)
+            cantidad += n
+        if posicion is not None:
+            self.cola.ack(posicion, cantidad)
+            self._stats["mensajes_confirmados"] += cantidad
+            self._cond.notify_all()
+
+    def _reenviar(self):
+        while self._activo:
+            if self._pausado or not self._conectado.wait(timeout=0.5):
+                time.sleep(0.1)
+                continue
+
+            with self._cond:
+                while len(self._en_vuelo) >= self.ventana and self._activo and self._conectado.is_set():
+                    self._cond.wait(timeout=1)
+                if not self._conectado.is_set():
+                    continue
+
+                # Se limpia antes de leer para no perder un aviso de append() concurrente
+                self._hay_datos.clear()
+                mensajes, posicion = self.cola.leer(self.max_lote, self.max_lote_bytes)
+                generacion = self._generacion
+
+            if mensajes:
+                lote = empaquetar(mensajes, (self.cola.epoca, *posicion), self.compresion)
+                # QoS del lote: el mayor de sus mensajes (QoS 2 se entrega como 1)
+                qos = min(max(m.qos for m in mensajes), 1)
+                # Sin el lock: paho llama a on_publish con su mutex de salida tomado,
+                # y publish() toma ese mismo mutex (orden inverso = deadlock)
+                info = self.cliente_nube.publish(self.topic_lote, lote, qos=qos)
+                with self._cond:
+                    # Un solo hilo publica: lo demás en _tempranos son PUBACK de
+                    # mensajes que paho reenvió tras una reconexión
+                    temprano = info.mid in self._tempranos
+                    self._tempranos.clear()
+                    # Tras una reconexión el lote se vuelve a leer desde lo confirmado
+                    if generacion == self._generacion:
+                        self._en_vuelo[info.mid] = (posicion, len(mensajes))
+                        if temprano:
+                            self._confirmados.add(info.mid)
+                        self._avanzar()
+                    self._stats["lotes_enviados"] += 1
+                    self._stats["bytes_crudos"] += sum(len(m.payload) for m in mensajes)
+                    self._stats["bytes_enviados"] += len(lote)
+
+            if not mensajes:
+                self._hay_datos.wait(timeout=0.5)
+
+    # === CONTROL ===
+    def start(self):
+        self._activo = True
+        self._hilo = threading.Thread(target=self._reenviar, name="puente-reenvio", daemon=True)
+        self._hilo.start()
+
+        self.cliente_nube.connect_async(*separar(self.nube), keepalive=30)
+        self.cliente_nube.loop_start()
+        self.cliente_local.connect(*separar(self.local), keepalive=60)
+        self.cliente_local.loop_start()
+
+    def pausar(self):
+        """Deja de reenviar (simula un corte de WAN); la cola sigue creciendo"""
+        self._pausado = True
+
+    def reanudar(self):
+        self._pausado = False
+
+    def stop(self):
+        self._activo = False
+        self.cliente_local.loop_stop()
+        self.cliente_local.disconnect()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+        self.cliente_nube.loop_stop()
+        self.cliente_nube.disconnect()
+        self.cola.close()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["en_cola"] = self.cola.pendientes
+            stats["lotes_en_vuelo"] = len(self._en_vuelo)
+        stats["bytes_en_disco"] = self.cola.bytes_en_disco()
+        stats["conectado"] = self._conectado.is_set()
+        stats["compresion"] = round(stats["bytes_enviados"] / stats["bytes_crudos"], 3) \
+            if stats["bytes_crudos"] else None
+        return stats
+
+
+def main():
+    puente = Bridge()
+    puente.start()
+    print(f"🌉 Puente {LOCAL} -> {NUBE} | topics: {', '.join(TOPICS)}")
+
+    detener = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: detener.set())
+    try:
+        while not detener.wait(REPORTE_CADA):
+            print("📊", json.dumps(puente.stats()))
+    except KeyboardInterrupt:
+        pass
+    print("🛑 Deteniendo puente...")
+    puente.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+"""
+Los módulos del puente se importan como scripts sueltos (from lotes import ...),
+así que la carpeta bridge/ va en sys.path.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,114 @@
+import os
+
+from cola import CABECERA, DiskQueue, Mensaje
+
+
+def _llenar(cola, n, inicio=0):
+    for i in range(inicio, inicio + n):
+        cola.append(Mensaje(f"state/telemetry/{i}", f"m{i}".encode(), qos=1))
+
+
+def _payloads(mensajes):
+    return [m.payload for m in mensajes]
+
+
+def test_reinicio_reanuda_desde_lo_confirmado(tmp_path):
+    cola = DiskQueue(tmp_path, sync="always")
+    _llenar(cola, 3)
+    mensajes, posicion = cola.leer(max_mensajes=2)
+    cola.ack(posicion, len(mensajes))
+    cola.close()
+
+    cola = DiskQueue(tmp_path)
+    assert cola.pendientes == 1
+    mensajes, _ = cola.leer()
+    assert _payloads(mensajes) == [b"m2"]
+    assert mensajes[0].topic == "state/telemetry/2" and mensajes[0].qos == 1
+    cola.close()
+
+
+def test_sin_ack_se_reenvia_todo(tmp_path):
+    cola = DiskQueue(tmp_path)
+    _llenar(cola, 2)
+    cola.leer()
+    cola.close()
+
+    cola = DiskQueue(tmp_path)
+    assert cola.pendientes == 2
+    assert _payloads(cola.leer()[0]) == [b"m0", b"m1"]
+    cola.close()
+
+
+def test_registro_incompleto_se_descarta(tmp_path):
+    cola = DiskQueue(tmp_path)
+    _llenar(cola, 2)
+    cola.close()
+    # Corte a mitad de escritura: cabecera sin el cuerpo
+    segmento = os.path.join(tmp_path, "0000000000.log")
+    tamaño = os.path.getsize(segmento)
+    with open(segmento, "ab") as f:
+        f.write(CABECERA.pack(0, 100, 0.0, 0, 0, 5) + b"par")
+
+    cola = DiskQueue(tmp_path)
+    assert cola.pendientes == 2
+    assert os.path.getsize(segmento) == tamaño
+    # Lo que se escribe después del corte se lee normalmente
+    _llenar(cola, 1, inicio=2)
+    assert _payloads(cola.leer()[0]) == [b"m0", b"m1", b"m2"]
+    cola.close()
+
+
+def test_registro_corrupto_se_descarta(tmp_path):
+    cola = DiskQueue(tmp_path)
+    _llenar(cola, 2)
+    cola.close()
+    segmento = os.path.join(tmp_path, "0000000000.log")
+    with open(segmento, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        f.write(b"X")
+
+    cola = DiskQueue(tmp_path)
+    assert cola.pendientes == 1
+    assert _payloads(cola.leer()[0]) == [b"m0"]
+    cola.close()
+
+
+def test_segmentos_confirmados_se_borran(tmp_path):
+    cola = DiskQueue(tmp_path, segmento_bytes=64)
+    _llenar(cola, 6)
+    assert len(cola._segmentos()) > 1
+
+    mensajes, posicion = cola.leer(max_mensajes=5)
+    cola.ack(posicion, len(mensajes))
+    assert cola._segmentos()[0] == posicion[0]
+    cola.close()
+
+    cola = DiskQueue(tmp_path, segmento_bytes=64)
+    assert cola.pendientes == 1
+    assert _payloads(cola.leer()[0]) == [b"m5"]
+    cola.close()
+
+
+def test_rebobinar_vuelve_a_lo_confirmado(tmp_path):
+    cola = DiskQueue(tmp_path)
+    _llenar(cola, 3)
+    mensajes, posicion = cola.leer(max_mensajes=1)
+    cola.ack(posicion, len(mensajes))
+    cola.leer()
+
+    cola.rebobinar()
+    assert _payloads(cola.leer()[0]) == [b"m1", b"m2"]
+    cola.close()
+
+
+def test_epoca_se_conserva_y_cambia_al_recrear(tmp_path):
+    cola = DiskQueue(tmp_path / "cola")
+    epoca = cola.epoca
+    cola.close()
+    cola = DiskQueue(tmp_path / "cola")
+    assert cola.epoca == epoca
+    cola.close()
+
+    otra = DiskQueue(tmp_path / "otra")
+    assert otra.epoca != epoca
+    otra.close()
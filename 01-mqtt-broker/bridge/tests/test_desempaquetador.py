@@ -0,0 +1,47 @@
+import types
+
+import pytest
+
+import desempaquetador
+from cola import Mensaje
+from lotes import empaquetar
+
+
+class FakeCliente:
+    def __init__(self, *args, **kwargs):
+        self.publicados = []
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        self.publicados.append((topic, payload))
+
+
+@pytest.fixture
+def unpacker(monkeypatch):
+    monkeypatch.setattr(desempaquetador, "crear_cliente", FakeCliente)
+    return desempaquetador.Unpacker()
+
+
+def _lote(unpacker, posicion, payload):
+    lote = empaquetar([Mensaje("state/telemetry/1", payload, qos=1)], posicion)
+    msg = types.SimpleNamespace(topic="bridge/invernadero/lote", payload=lote)
+    unpacker._on_message(unpacker.cliente, None, msg)
+
+
+def test_descarta_lotes_repetidos(unpacker):
+    _lote(unpacker, (7, 0, 100), b"a")
+    _lote(unpacker, (7, 0, 100), b"a")
+    _lote(unpacker, (7, 0, 50), b"viejo")
+    _lote(unpacker, (7, 1, 0), b"b")
+
+    assert [p for _, p in unpacker.cliente.publicados] == [b"a", b"b"]
+    assert unpacker.stats["repetidos"] == 2
+
+
+def test_cola_recreada_empieza_otra_epoca(unpacker):
+    _lote(unpacker, (7, 3, 500), b"a")
+    # El puente borró su cola: posiciones desde cero con una época nueva
+    _lote(unpacker, (2, 0, 40), b"b")
+    _lote(unpacker, (2, 0, 80), b"c")
+
+    assert [p for _, p in unpacker.cliente.publicados] == [b"a", b"b", b"c"]
+    assert unpacker.stats["repetidos"] == 0
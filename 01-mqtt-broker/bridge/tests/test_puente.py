@@ -0,0 +1,185 @@
+import threading
+import time
+import types
+
+import pytest
+
+import puente
+from lotes import desempaquetar
+
+
+class FakeCliente:
+    """
+    Cliente MQTT en memoria. Como paho, publish() toma el mutex de salida y
+    el hilo del loop llama a on_publish con ese mismo mutex tomado.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.publicados = []          # (mid, lote)
+        self.on_publish = None
+        self.auto_ack = False
+        self._mid = 0
+        self._mutex = threading.Lock()
+        self._pendientes = []
+        self._activo = True
+        self._loop = None
+
+    def max_inflight_messages_set(self, n):
+        pass
+
+    def tls_set(self):
+        pass
+
+    def username_pw_set(self, usuario, clave):
+        pass
+
+    def publish(self, topic, payload, qos=0):
+        with self._mutex:
+            self._mid += 1
+            self.publicados.append((self._mid, payload))
+            if self.auto_ack:
+                self._pendientes.append(self._mid)
+            return types.SimpleNamespace(mid=self._mid)
+
+    def iniciar_loop(self):
+        def loop():
+            while self._activo:
+                with self._mutex:
+                    while self._pendientes:
+                        self.on_publish(self, None, self._pendientes.pop(0))
+                time.sleep(0.0005)
+        self._loop = threading.Thread(target=loop, daemon=True)
+        self._loop.start()
+
+    def detener_loop(self):
+        self._activo = False
+        if self._loop is not None:
+            self._loop.join(timeout=2)
+
+
+def esperar(condicion, timeout=5):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if condicion():
+            return True
+        time.sleep(0.005)
+    return condicion()
+
+
+@pytest.fixture
+def crear_puente(tmp_path, monkeypatch):
+    monkeypatch.setattr(puente, "crear_cliente", FakeCliente)
+    creados = []
+
+    def crear(**opciones):
+        opciones.setdefault("ventana", 2)
+        opciones.setdefault("max_lote", 1)
+        bridge = puente.Bridge(directorio=str(tmp_path), **opciones)
+        bridge._activo = True
+        bridge._hilo = threading.Thread(target=bridge._reenviar, daemon=True)
+        bridge._hilo.start()
+        bridge._on_connect_nube(bridge.cliente_nube, None, {}, 0)
+        creados.append(bridge)
+        return bridge
+
+    yield crear
+    for bridge in creados:
+        bridge._activo = False
+        bridge.cliente_nube.detener_loop()
+        bridge._hilo.join(timeout=5)
+        bridge.cola.close()
+
+
+def _recibir(bridge, n, qos=1):
+    for i in range(n):
+        msg = types.SimpleNamespace(topic=f"state/telemetry/{i}", payload=f"m{i}".encode(),
+                                    qos=qos, retain=False)
+        bridge._on_message_local(None, None, msg)
+
+
+def _payloads(nube, desde=0):
+    return [m.payload for _, lote in nube.publicados[desde:] for m in desempaquetar(lote)[1]]
+
+
+def test_ventana_limita_lotes_en_vuelo(crear_puente):
+    bridge = crear_puente(ventana=2)
+    nube = bridge.cliente_nube
+    _recibir(bridge, 5)
+
+    assert esperar(lambda: len(nube.publicados) == 2)
+    time.sleep(0.1)
+    assert len(nube.publicados) == 2
+
+    bridge._on_publish_nube(nube, None, nube.publicados[0][0])
+    assert esperar(lambda: len(nube.publicados) == 3)
+    assert bridge.cola.pendientes == 4
+
+
+def test_confirma_en_orden_de_envio(crear_puente):
+    bridge = crear_puente(ventana=2)
+    nube = bridge.cliente_nube
+    _recibir(bridge, 2)
+    assert esperar(lambda: len(nube.publicados) == 2)
+
+    # El PUBACK del segundo lote no avanza la cola mientras falte el primero
+    bridge._on_publish_nube(nube, None, nube.publicados[1][0])
+    assert bridge.cola.pendientes == 2
+    bridge._on_publish_nube(nube, None, nube.publicados[0][0])
+    assert bridge.cola.pendientes == 0
+    assert _payloads(nube) == [b"m0", b"m1"]
+
+
+def test_reconexion_reenvia_desde_lo_confirmado(crear_puente):
+    bridge = crear_puente(ventana=2)
+    nube = bridge.cliente_nube
+    _recibir(bridge, 3)
+    assert esperar(lambda: len(nube.publicados) == 2)
+    bridge._on_publish_nube(nube, None, nube.publicados[0][0])
+    assert esperar(lambda: len(nube.publicados) == 3)
+
+    bridge._on_connect_nube(nube, None, {}, 0)
+    assert esperar(lambda: len(nube.publicados) == 5)
+    assert _payloads(nube, desde=3) == [b"m1", b"m2"]
+    # Los PUBACK de antes de reconectar ya no confirman nada
+    bridge._on_publish_nube(nube, None, nube.publicados[1][0])
+    assert bridge.cola.pendientes == 2
+
+
+def test_puback_antes_de_registrar_el_mid(crear_puente, monkeypatch):
+    bridge = crear_puente(ventana=1)
+    nube = bridge.cliente_nube
+    publicar = nube.publish
+
+    def publish_con_ack(topic, payload, qos=0):
+        # QoS 0 o un PUBACK muy rápido: on_publish antes de que publish() retorne
+        info = publicar(topic, payload, qos)
+        bridge._on_publish_nube(nube, None, info.mid)
+        return info
+
+    monkeypatch.setattr(nube, "publish", publish_con_ack)
+    _recibir(bridge, 3, qos=0)
+    assert esperar(lambda: bridge.cola.pendientes == 0)
+    assert _payloads(nube) == [b"m0", b"m1", b"m2"]
+
+
+def test_puback_desde_el_loop_no_bloquea(crear_puente):
+    bridge = crear_puente(ventana=4)
+    nube = bridge.cliente_nube
+    nube.auto_ack = True
+    nube.iniciar_loop()
+
+    _recibir(bridge, 300)
+    assert esperar(lambda: bridge.cola.pendientes == 0)
+    assert _payloads(nube) == [f"m{i}".encode() for i in range(300)]
+
+
+def test_error_de_disco_no_detiene_el_loop(crear_puente, monkeypatch):
+    bridge = crear_puente()
+
+    def disco_lleno(mensaje):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(bridge.cola, "append", disco_lleno)
+    _recibir(bridge, 2)
+    assert bridge.stats()["errores_disco"] == 2
+    assert bridge.stats()["recibidos"] == 0
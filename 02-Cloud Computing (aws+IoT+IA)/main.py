@@ -1,125 +1,274 @@
-import paho.mqtt.client as mqtt
-import requests
-import boto3
-import json
-
-# === CONFIGURACIÓN MQTT ===
-BROKER = "127.0.0.1"  # Cambia por la IP real de tu broker Mosquitto
-PORT = 1883
-TOPIC_SUBSCRIBE = "sensor/temp"
-TOPIC_VENTILADOR = "climate/fan/set"
-TOPIC_BOMBILLO = "climate/light/set"
-TOPIC_NOTIFICATION = "notifications/mobile"
-API_DB = "http://localhost:5000/api/data"  # API Flask de Yefer
-
-# === CONFIGURACIÓN AWS LAMBDA ===
-lambda_client = boto3.client('lambda', region_name='us-east-1')  # Cambia región si es necesario
-LAMBDA_NAME = "TempAlert"  # Cambia por el nombre real de tu función Lambda
-
-# === FUNCIONES AWS ===
-def invocar_lambda(temp, autorizado=True):
-    payload = {
-        'temp': temp,
-        'autorizado': autorizado
-    }
-
-    try:
-        response = lambda_client.invoke(
-            FunctionName=LAMBDA_NAME,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(payload)
-        )
-        # Decodificar correctamente la respuesta
-        result = json.loads(response['Payload'].read().decode('utf-8'))
-        print("🧠 Respuesta Lambda:", result)
-        return result
-    except Exception as e:
-        print("❌ Error al invocar Lambda:", e)
-        return {"accion": "error", "acceso": "desconocido"}
-
-# === CALLBACKS MQTT ===
-def on_connect(client, userdata, flags, rc):
-    if rc == 0:
-        print("✅ Conectado a Mosquitto con código:", rc)
-        client.subscribe(TOPIC_SUBSCRIBE)
-    else:
-        print(f"❌ Falló la conexión, código: {rc}")
-
-def on_message(client, userdata, msg):
-    payload = msg.payload.decode()
-    topic = msg.topic
-    print(f"[📩 {topic}] => {payload}")
-
-    if topic == TOPIC_SUBSCRIBE:
-        try:
-            temp = float(payload)
-            procesar_temp(temp, client)
-        except ValueError:
-            print("❌ Error: Payload no es número.")
-
-# === LÓGICA DE TEMPERATURA CON LAMBDA ===
-def procesar_temp(temp, client):
-    print(f"🌡️ Temperatura: {temp}°C")
-
-    # Guardar en BD
-    try:
-        response = requests.post(API_DB, json={"temp": temp})
-        response.raise_for_status()
-        print("🗂️ Enviado a API Flask")
-    except Exception as e:
-        print(f"⚠️ No se pudo enviar a la API: {e}")
-
-    # Lógica con Lambda
-    respuesta = invocar_lambda(temp, autorizado=True)
-
-    accion = respuesta.get("accion", "nada")
-
-    # ACTUAR SEGÚN RESPUESTA DE LAMBDA
-    if accion == "Encender ventilador":
-        client.publish(TOPIC_VENTILADOR, "ON")
-        client.publish(TOPIC_BOMBILLO, "OFF")
-        client.publish(TOPIC_NOTIFICATION, "🔥 Alta temperatura. Ventilador encendido.")
-        print("💨 Ventilador: ON")
-
-    elif accion == "Encender bombillo":
-        client.publish(TOPIC_BOMBILLO, "ON")
-        client.publish(TOPIC_VENTILADOR, "OFF")
-        client.publish(TOPIC_NOTIFICATION, "❄️ Temperatura baja. Bombillo encendido.")
-        print("💡 Bombillo: ON")
-
-    else:
-        client.publish(TOPIC_BOMBILLO, "OFF")
-        client.publish(TOPIC_VENTILADOR, "OFF")
-        print("🌤️ Temperatura normal o error. Todo apagado.")
-
-# === INICIAR MQTT ===
-def main():
-    # Crear cliente MQTT con versión de callback compatible
-    try:
-        client = mqtt.Client(client_id="", callback_api_version=mqtt.CallbackAPIVersion.VERSION1)
-    except AttributeError:
-        # Si la versión de paho no soporta callback_api_version, crear cliente normal
-        client = mqtt.Client()
-
-    client.on_connect = on_connect
-    client.on_message = on_message
-
-    print(f"🔌 Conectando a broker MQTT {BROKER}:{PORT}...")
-    client.connect(BROKER, PORT, 60)
-
-    # Usar loop_start para no bloquear el hilo principal
-    client.loop_start()
-
-    try:
-        while True:
-            # Aquí puedes hacer otras tareas si quieres
-            pass
-    except KeyboardInterrupt:
-        print("🛑 Deteniendo cliente MQTT...")
-    finally:
-        client.loop_stop()
-        client.disconnect()
-        print("Desconectado.")
-
-if __name__ == "__main__":
-    main()
+import paho.mqtt.client as mqtt
+import requests
+import boto3
+import json
+import os
+import queue
+import threading
+import time
+from botocore.config import Config
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from reglas import RuleEngine, load_rules
+import metricas
+
+# === CONFIGURACIÓN MQTT ===
+BROKER = "127.0.0.1"  # Cambia por la IP real de tu broker Mosquitto
+PORT = 1883
+TOPIC_SUBSCRIBE = "sensor/temp"
+TOPIC_VENTILADOR = "climate/fan/set"
+TOPIC_BOMBILLO = "climate/light/set"
+TOPIC_NOTIFICATION = "notifications/mobile"
+API_DB = "http://localhost:5000/api/data"  # API Flask de Yefer
+
+# === CONFIGURACIÓN DE REGLAS LOCALES ===
+REGLAS = os.getenv("REGLAS", "reglas.yaml")  # Mismo formato que automations.yaml de Home Assistant
+ENTIDAD_TEMP = os.getenv("ENTIDAD_TEMP", "sensor.temperatura")
+# Switch de las reglas -> topic MQTT del actuador
+ACTUADORES = {
+    "switch.ventilador": TOPIC_VENTILADOR,
+    "switch.bombillo": TOPIC_BOMBILLO
+}
+
+# === CONFIGURACIÓN DE TRABAJO EN SEGUNDO PLANO ===
+TIMEOUT_API = (3, 5)           # (conexión, lectura) en segundos
+REINTENTOS = 3                 # Reintentos acotados para la API y para Lambda
+WORKERS_API = int(os.getenv("WORKERS_API", "2"))
+MAX_COLA = int(os.getenv("MAX_COLA", "1000"))
+
+# Sesión HTTP compartida: reutiliza conexiones (keep-alive) y reintenta con backoff.
+# POST /api/data no es idempotente: solo se reintenta si la conexión no se
+# estableció; un 502/503/504 o un timeout de lectura pudo haber guardado el dato.
+# (status_forcelist con los allowed_methods por defecto no incluye POST)
+session = requests.Session()
+session.mount("http://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=WORKERS_API,
+    max_retries=Retry(total=REINTENTOS, connect=REINTENTOS, read=0, backoff_factor=0.5,
+                      status_forcelist=(502, 503, 504))
+))
+
+# === CONFIGURACIÓN AWS LAMBDA ===
+lambda_client = boto3.client(
+    'lambda',
+    region_name='us-east-1',  # Cambia región si es necesario
+    config=Config(connect_timeout=3, read_timeout=10,
+                  retries={'max_attempts': REINTENTOS, 'mode': 'standard'})
+)
+LAMBDA_NAME = "TempAlert"  # Cambia por el nombre real de tu función Lambda
+
+# Colas entre el callback de MQTT y los hilos de trabajo
+cola_api = queue.Queue(maxsize=MAX_COLA)
+cola_lambda = queue.Queue(maxsize=MAX_COLA)
+
+# === MÉTRICAS (Prometheus) ===
+METRICAS_PUERTO = int(os.getenv("METRICAS_PUERTO", "9102"))  # 0 = desactivado
+
+# === REGLAS LOCALES ===
+def cargar_motor():
+    """Carga el motor de reglas; sin reglas se consulta a Lambda en cada lectura"""
+    try:
+        reglas = load_rules(REGLAS)
+    except ImportError:
+        print("⚠️ PyYAML no está instalado, se usa Lambda para todas las lecturas")
+        return None
+    except OSError as e:
+        print(f"⚠️ No se pudieron leer las reglas ({e}), se usa Lambda para todas las lecturas")
+        return None
+    print(f"📏 {len(reglas)} reglas locales cargadas de {REGLAS}")
+    return RuleEngine(reglas)
+
+motor = cargar_motor()
+
+def ejecutar_acciones(client, acciones):
+    if acciones:
+        metricas.ACCIONES.labels(source="reglas").inc(len(acciones))
+    for tipo, destino, valor in acciones:
+        if tipo == "switch":
+            topic = ACTUADORES.get(destino)
+            if topic is None:
+                print(f"⚠️ Actuador sin topic configurado: {destino}")
+                continue
+            client.publish(topic, valor)
+            print(f"🔁 {destino}: {valor}")
+        else:
+            client.publish(destino, valor)
+
+# === FUNCIONES AWS ===
+def invocar_lambda(temp, autorizado=True):
+    payload = {
+        'temp': temp,
+        'autorizado': autorizado
+    }
+
+    inicio = time.perf_counter()
+    try:
+        response = lambda_client.invoke(
+            FunctionName=LAMBDA_NAME,
+            InvocationType='RequestResponse',
+            Payload=json.dumps(payload)
+        )
+        # Decodificar correctamente la respuesta
+        result = json.loads(response['Payload'].read().decode('utf-8'))
+        print("🧠 Respuesta Lambda:", result)
+        metricas.llamada("lambda", "ok", time.perf_counter() - inicio)
+        return result
+    except Exception as e:
+        print("❌ Error al invocar Lambda:", e)
+        metricas.llamada("lambda", "error", time.perf_counter() - inicio)
+        return {"accion": "error", "acceso": "desconocido"}
+
+# === CALLBACKS MQTT ===
+def on_connect(client, userdata, flags, rc):
+    if rc == 0:
+        print("✅ Conectado a Mosquitto con código:", rc)
+        client.subscribe(TOPIC_SUBSCRIBE)
+    else:
+        print(f"❌ Falló la conexión, código: {rc}")
+
+def on_message(client, userdata, msg):
+    with metricas.cronometrar(metricas.MANEJO.labels(topic=msg.topic)):
+        resultado = procesar_mensaje(client, msg)
+    metricas.MENSAJES.labels(topic=msg.topic, outcome=resultado).inc()
+
+def procesar_mensaje(client, msg):
+    """Devuelve el resultado para mqtt_messages_total ("processed" o "invalid")"""
+    payload = msg.payload.decode()
+    topic = msg.topic
+    print(f"[📩 {topic}] => {payload}")
+
+    if topic == TOPIC_SUBSCRIBE:
+        try:
+            temp = float(payload)
+        except ValueError:
+            print("❌ Error: Payload no es número.")
+            return "invalid"
+        # La API y Lambda se llaman desde los hilos de trabajo
+        encolar(cola_api, temp, "api")
+        if motor is None:
+            encolar(cola_lambda, temp, "lambda")
+            return "processed"
+
+        # Las reglas locales se evalúan aquí mismo (no hay red de por medio)
+        acciones, remotas = motor.evaluar(topic, ENTIDAD_TEMP, temp)
+        ejecutar_acciones(client, acciones)
+        if remotas:
+            encolar(cola_lambda, temp, "lambda")
+    return "processed"
+
+def encolar(cola, temp, nombre):
+    try:
+        cola.put_nowait(temp)
+    except queue.Full:
+        print(f"⚠️ Cola {nombre} llena, se descarta la lectura {temp}°C")
+        metricas.DESCARTES.labels(queue=nombre).inc()
+
+# === HILOS DE TRABAJO ===
+def trabajador_api():
+    while True:
+        temp = cola_api.get()
+        if temp is None:
+            return
+        guardar_en_bd(temp)
+
+def trabajador_lambda(client):
+    # Un solo hilo: los comandos a los actuadores salen en orden
+    while True:
+        temp = cola_lambda.get()
+        # Si hay lecturas acumuladas solo importa la más reciente
+        while temp is not None:
+            try:
+                siguiente = cola_lambda.get_nowait()
+            except queue.Empty:
+                break
+            temp = siguiente
+        if temp is None:
+            return
+        procesar_temp(temp, client)
+
+def guardar_en_bd(temp):
+    inicio = time.perf_counter()
+    try:
+        response = session.post(API_DB, json={"temp": temp}, timeout=TIMEOUT_API)
+        response.raise_for_status()
+        print("🗂️ Enviado a API Flask")
+        metricas.llamada("api", "ok", time.perf_counter() - inicio)
+    except Exception as e:
+        print(f"⚠️ No se pudo enviar a la API: {e}")
+        metricas.llamada("api", "error", time.perf_counter() - inicio)
+
+# === LÓGICA DE TEMPERATURA CON LAMBDA ===
+def procesar_temp(temp, client):
+    print(f"🌡️ Temperatura: {temp}°C")
+
+    # Lógica con Lambda
+    respuesta = invocar_lambda(temp, autorizado=True)
+
+    accion = respuesta.get("accion", "nada")
+    metricas.ACCIONES.labels(source="lambda").inc()
+
+    # ACTUAR SEGÚN RESPUESTA DE LAMBDA
+    if accion == "Encender ventilador":
+        ventilador, bombillo = "ON", "OFF"
+        client.publish(TOPIC_VENTILADOR, "ON")
+        client.publish(TOPIC_BOMBILLO, "OFF")
+        client.publish(TOPIC_NOTIFICATION, "🔥 Alta temperatura. Ventilador encendido.")
+        print("💨 Ventilador: ON")
+
+    elif accion == "Encender bombillo":
+        ventilador, bombillo = "OFF", "ON"
+        client.publish(TOPIC_BOMBILLO, "ON")
+        client.publish(TOPIC_VENTILADOR, "OFF")
+        client.publish(TOPIC_NOTIFICATION, "❄️ Temperatura baja. Bombillo encendido.")
+        print("💡 Bombillo: ON")
+
+    else:
+        ventilador, bombillo = "OFF", "OFF"
+        client.publish(TOPIC_BOMBILLO, "OFF")
+        client.publish(TOPIC_VENTILADOR, "OFF")
+        print("🌤️ Temperatura normal o error. Todo apagado.")
+
+    # Las reglas locales parten del estado que dejó Lambda
+    if motor is not None:
+        motor.marcar(TOPIC_SUBSCRIBE, "switch.ventilador", ventilador)
+        motor.marcar(TOPIC_SUBSCRIBE, "switch.bombillo", bombillo)
+
+# === INICIAR MQTT ===
+def main():
+    # Crear cliente MQTT con versión de callback compatible
+    try:
+        client = mqtt.Client(client_id="", callback_api_version=mqtt.CallbackAPIVersion.VERSION1)
+    except AttributeError:
+        # Si la versión de paho no soporta callback_api_version, crear cliente normal
+        client = mqtt.Client()
+
+    client.on_connect = on_connect
+    client.on_message = on_message
+
+    hilos = [threading.Thread(target=trabajador_api, daemon=True) for _ in range(WORKERS_API)]
+    hilos.append(threading.Thread(target=trabajador_lambda, args=(client,), daemon=True))
+    for hilo in hilos:
+        hilo.start()
+    metricas.iniciar(METRICAS_PUERTO, {"api": cola_api, "lambda": cola_lambda})
+
+    print(f"🔌 Conectando a broker MQTT {BROKER}:{PORT}...")
+    client.connect(BROKER, PORT, 60)
+
+    try:
+        # El hilo principal queda bloqueado en el socket (sin consumir CPU)
+        client.loop_forever()
+    except KeyboardInterrupt:
+        print("🛑 Deteniendo cliente MQTT...")
+    finally:
+        client.disconnect()
+        # Los trabajadores terminan lo que ya estaba en cola
+        for _ in range(WORKERS_API):
+            cola_api.put(None)
+        cola_lambda.put(None)
+        for hilo in hilos:
+            hilo.join(timeout=15)
+        session.close()
+        print("Desconectado.")
+
+if __name__ == "__main__":
+    main()
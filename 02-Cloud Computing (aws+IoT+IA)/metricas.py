@@ -0,0 +1,85 @@
+"""
+Métricas Prometheus del servicio de temperatura.
+
+    METRICAS_PUERTO=9102 python main.py
+    curl localhost:9102/metrics
+
+Los nombres y etiquetas son los mismos que usan 04-flask-api-ai
+(app/utils/metrics.py) y 06-ia_model (metricas.py), así un mismo panel
+sirve para los tres servicios. Si prometheus_client no está instalado
+todo sigue funcionando y las métricas no se exportan.
+"""
+
+import time
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram, start_http_server
+except ImportError:
+    Counter = Gauge = Histogram = start_http_server = None
+
+# Segundos: desde 1 ms (callback) hasta varios segundos (Lambda con reintentos)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class _Nulo:
+    """Métrica que no hace nada (sin prometheus_client)"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, *args):
+        pass
+
+    def observe(self, *args):
+        pass
+
+    def set_function(self, *args):
+        pass
+
+
+def _crear(tipo, *args, **kwargs):
+    return tipo(*args, **kwargs) if tipo is not None else _Nulo()
+
+
+MENSAJES = _crear(Counter, "mqtt_messages_total",
+                  "Mensajes MQTT por topic y resultado (processed, invalid)", ["topic", "outcome"])
+MANEJO = _crear(Histogram, "mqtt_handle_duration_seconds", "Tiempo dentro de on_message",
+                ["topic"], buckets=BUCKETS)
+COLA = _crear(Gauge, "queue_depth", "Lecturas esperando en cada cola interna", ["queue"])
+DESCARTES = _crear(Counter, "queue_dropped_total", "Lecturas descartadas por cola llena", ["queue"])
+LLAMADAS = _crear(Histogram, "dependency_duration_seconds",
+                  "Duración de las llamadas a la API y a Lambda", ["target", "outcome"],
+                  buckets=BUCKETS)
+ACCIONES = _crear(Counter, "actuator_commands_total", "Comandos enviados a los actuadores",
+                  ["source"])
+
+
+def iniciar(puerto, colas):
+    """Expone /metrics en `puerto` (0 = desactivado) y enlaza la profundidad de cada cola"""
+    if not puerto:
+        return
+    if start_http_server is None:
+        print("⚠️ prometheus_client no está instalado, no se exportan métricas")
+        return
+    for nombre, cola in colas.items():
+        COLA.labels(queue=nombre).set_function(cola.qsize)
+    start_http_server(puerto)
+    print(f"📈 Métricas en http://0.0.0.0:{puerto}/metrics")
+
+
+def llamada(destino, resultado, segundos):
+    LLAMADAS.labels(target=destino, outcome=resultado).observe(segundos)
+
+
+class cronometrar:
+    """Context manager que observa la duración en un histograma"""
+
+    def __init__(self, histograma):
+        self.histograma = histograma
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histograma.observe(time.perf_counter() - self.inicio)
@@ -0,0 +1,232 @@
+"""
+Motor de reglas local para los actuadores (ventilador, bombillo).
+
+Las reglas usan el mismo formato que las automatizaciones de Home Assistant
+(09-HomeAssistance.../automations.yaml): un disparador numeric_state con
+above/below, condiciones numeric_state opcionales y acciones
+switch.turn_on / switch.turn_off / mqtt.publish. La histéresis sale de
+usar dos reglas con umbrales distintos para encender y apagar:
+
+    - id: ventilador_encender
+      trigger:
+        - platform: numeric_state
+          entity_id: sensor.temperatura
+          above: 30
+      action:
+        - service: switch.turn_on
+          target: {entity_id: switch.ventilador}
+    - id: ventilador_apagar
+      trigger:
+        - platform: numeric_state
+          entity_id: sensor.temperatura
+          below: 28
+      action:
+        - service: switch.turn_off
+          target: {entity_id: switch.ventilador}
+
+Como en Home Assistant, una regla se dispara cuando su umbral se cruza
+(no en cada lectura). Las reglas con `remote: true` no se ejecutan aquí:
+se devuelven para que quien llama consulte a Lambda.
+"""
+
+import bisect
+import threading
+
+SERVICIOS_SWITCH = {"turn_on": "ON", "turn_off": "OFF"}
+
+
+class Rule:
+    def __init__(self, id, entidad, above=None, below=None, condiciones=(),
+                 acciones=(), remoto=False):
+        self.id = id
+        self.entidad = entidad
+        self.above = above
+        self.below = below
+        self.condiciones = list(condiciones)   # (entidad, above, below)
+        self.acciones = list(acciones)         # ("switch", entidad, "ON"/"OFF") o ("mqtt", topic, payload)
+        self.remoto = remoto
+
+    def cumple(self, valor):
+        if self.above is not None and not valor > self.above:
+            return False
+        if self.below is not None and not valor < self.below:
+            return False
+        return True
+
+    def __repr__(self):
+        return f"Rule({self.id!r}, {self.entidad}, above={self.above}, below={self.below})"
+
+
+def _leer_umbral(bloque):
+    above = bloque.get("above")
+    below = bloque.get("below")
+    return (float(above) if above is not None else None,
+            float(below) if below is not None else None)
+
+
+def _como_lista(valor):
+    if valor is None:
+        return []
+    return valor if isinstance(valor, list) else [valor]
+
+
+def parse_automations(automatizaciones):
+    """
+    Convierte una lista de automatizaciones (formato Home Assistant) en reglas.
+    Solo se usan los disparadores numeric_state; lo demás se ignora.
+
+    Returns:
+        lista de Rule (una por disparador y entidad)
+    """
+    reglas = []
+    for auto in automatizaciones or []:
+        condiciones = []
+        for cond in _como_lista(auto.get("condition")):
+            if cond.get("condition") != "numeric_state":
+                continue
+            above, below = _leer_umbral(cond)
+            for entidad in _como_lista(cond.get("entity_id")):
+                condiciones.append((entidad, above, below))
+
+        acciones = []
+        for accion in _como_lista(auto.get("action")):
+            servicio = accion.get("service", "")
+            dominio, _, nombre = servicio.partition(".")
+            if nombre in SERVICIOS_SWITCH:
+                objetivo = accion.get("target") or accion.get("data") or {}
+                for entidad in _como_lista(objetivo.get("entity_id")):
+                    acciones.append(("switch", entidad, SERVICIOS_SWITCH[nombre]))
+            elif servicio == "mqtt.publish":
+                datos = accion.get("data") or {}
+                acciones.append(("mqtt", datos.get("topic"), str(datos.get("payload", ""))))
+
+        for trigger in _como_lista(auto.get("trigger")):
+            if trigger.get("platform") != "numeric_state":
+                continue
+            above, below = _leer_umbral(trigger)
+            for entidad in _como_lista(trigger.get("entity_id")):
+                reglas.append(Rule(auto.get("id") or auto.get("alias"), entidad, above, below,
+                                   condiciones, acciones, remoto=bool(auto.get("remote"))))
+    return reglas
+
+
+def load_rules(ruta):
+    """Lee las reglas de un archivo YAML (lista de automatizaciones)"""
+    import yaml
+
+    with open(ruta, encoding="utf-8") as f:
+        return parse_automations(yaml.safe_load(f))
+
+
+class RuleEngine:
+    """
+    Evalúa las reglas por dispositivo. Para cada entidad los umbrales se
+    ordenan una sola vez y se precalcula qué reglas se cumplen en cada banda
+    entre umbrales; evaluar una lectura es un bisect y una consulta.
+    """
+
+    def __init__(self, reglas):
+        self.reglas = list(reglas)
+        self._bandas = {}
+        por_entidad = {}
+        for regla in self.reglas:
+            por_entidad.setdefault(regla.entidad, []).append(regla)
+        for entidad, reglas_entidad in por_entidad.items():
+            self._bandas[entidad] = self._precalcular(reglas_entidad)
+
+        self._dispositivos = {}   # dispositivo -> {"sensores", "switches", "bandas"}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _precalcular(reglas):
+        umbrales = sorted({u for r in reglas for u in (r.above, r.below) if u is not None})
+        if not umbrales:
+            return umbrales, [tuple(reglas)]
+
+        # Banda 2i: entre umbrales[i-1] y umbrales[i]; banda 2i+1: igual a umbrales[i]
+        representantes = []
+        for i, umbral in enumerate(umbrales):
+            anterior = umbrales[i - 1] if i else umbral - 1
+            representantes.append((anterior + umbral) / 2)
+            representantes.append(umbral)
+        representantes.append(umbrales[-1] + 1)
+
+        activas = [tuple(r for r in reglas if r.cumple(v)) for v in representantes]
+        return umbrales, activas
+
+    @staticmethod
+    def _banda(umbrales, valor):
+        return bisect.bisect_left(umbrales, valor) + bisect.bisect_right(umbrales, valor)
+
+    def _estado(self, dispositivo):
+        estado = self._dispositivos.get(dispositivo)
+        if estado is None:
+            estado = self._dispositivos[dispositivo] = {"sensores": {}, "switches": {}, "bandas": {}}
+        return estado
+
+    def evaluar(self, dispositivo, entidad, valor):
+        """
+        Registra una lectura y devuelve lo que hay que hacer
+
+        Args:
+            dispositivo: Identificador del dispositivo (el estado es por dispositivo)
+            entidad: Entidad del sensor, p. ej. "sensor.temperatura"
+            valor: Lectura numérica
+
+        Returns:
+            (acciones, remotas): acciones locales a ejecutar y reglas remotas
+            disparadas (hay que consultar a Lambda)
+        """
+        bandas = self._bandas.get(entidad)
+        with self._lock:
+            estado = self._estado(dispositivo)
+            estado["sensores"][entidad] = valor
+            if bandas is None:
+                return [], []
+
+            umbrales, activas = bandas
+            banda = self._banda(umbrales, valor)
+            anterior = estado["bandas"].get(entidad)
+            # Misma banda que la lectura anterior: ningún umbral se cruzó
+            if banda == anterior:
+                return [], []
+            estado["bandas"][entidad] = banda
+
+            antes = activas[anterior] if anterior is not None else ()
+            acciones, remotas = [], []
+            for regla in activas[banda]:
+                if regla in antes or not self._condiciones(estado, regla):
+                    continue
+                if regla.remoto:
+                    remotas.append(regla)
+                else:
+                    acciones.extend(self._aplicar(estado, regla))
+            return acciones, remotas
+
+    @staticmethod
+    def _condiciones(estado, regla):
+        for entidad, above, below in regla.condiciones:
+            valor = estado["sensores"].get(entidad)
+            if valor is None:
+                return False
+            if above is not None and not valor > above:
+                return False
+            if below is not None and not valor < below:
+                return False
+        return True
+
+    @staticmethod
+    def _aplicar(estado, regla):
+        # Si ningún switch cambia, la regla no produce acciones (evita repetir comandos)
+        switches = [a for a in regla.acciones if a[0] == "switch"]
+        cambios = [a for a in switches if estado["switches"].get(a[1]) != a[2]]
+        if switches and not cambios:
+            return []
+        for _, entidad, valor in cambios:
+            estado["switches"][entidad] = valor
+        return cambios + [a for a in regla.acciones if a[0] != "switch"]
+
+    def marcar(self, dispositivo, entidad, valor):
+        """Registra el estado de un switch cambiado desde fuera (p. ej. por Lambda)"""
+        with self._lock:
+            self._estado(dispositivo)["switches"][entidad] = valor
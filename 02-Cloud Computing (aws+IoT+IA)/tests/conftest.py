@@ -0,0 +1,9 @@
+"""
+reglas.py se importa como módulo suelto (igual que desde main.py),
+así que la carpeta del proyecto va en sys.path.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
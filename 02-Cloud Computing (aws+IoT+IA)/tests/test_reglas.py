@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from reglas import RuleEngine, load_rules, parse_automations
+
+REGLAS_YAML = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reglas.yaml")
+TEMP = "sensor.temperatura"
+
+
+@pytest.fixture
+def motor():
+    return RuleEngine(load_rules(REGLAS_YAML))
+
+
+def _switches(acciones):
+    return {(a[1], a[2]) for a in acciones if a[0] == "switch"}
+
+
+def test_ventilador_con_histeresis(motor):
+    # La primera lectura ya cumple las dos reglas de apagado (above 22, below 28)
+    assert _switches(motor.evaluar("esp32", TEMP, 25)[0]) == {("switch.bombillo", "OFF"),
+                                                               ("switch.ventilador", "OFF")}
+    assert _switches(motor.evaluar("esp32", TEMP, 31)[0]) == {("switch.ventilador", "ON")}
+    # Entre 28 y 30 el ventilador sigue encendido: no hay acciones
+    assert motor.evaluar("esp32", TEMP, 29)[0] == []
+    assert motor.evaluar("esp32", TEMP, 30.5)[0] == []
+    assert motor.evaluar("esp32", TEMP, 28.5)[0] == []
+    assert _switches(motor.evaluar("esp32", TEMP, 27.5)[0]) == {("switch.ventilador", "OFF")}
+
+
+def test_bombillo_con_histeresis(motor):
+    assert _switches(motor.evaluar("esp32", TEMP, 19)[0]) == {("switch.bombillo", "ON"),
+                                                               ("switch.ventilador", "OFF")}
+    assert motor.evaluar("esp32", TEMP, 21)[0] == []
+    assert motor.evaluar("esp32", TEMP, 19.5)[0] == []
+    assert _switches(motor.evaluar("esp32", TEMP, 23)[0]) == {("switch.bombillo", "OFF")}
+
+
+def test_umbral_exacto_no_dispara(motor):
+    # above/below son estrictos, como en Home Assistant
+    motor.evaluar("esp32", TEMP, 25)
+    assert motor.evaluar("esp32", TEMP, 30)[0] == []
+    assert _switches(motor.evaluar("esp32", TEMP, 30.1)[0]) == {("switch.ventilador", "ON")}
+
+
+def test_solo_dispara_al_cruzar(motor):
+    primera, _ = motor.evaluar("esp32", TEMP, 35)
+    assert ("mqtt", "notifications/mobile", "🔥 Alta temperatura. Ventilador encendido.") in primera
+    assert motor.evaluar("esp32", TEMP, 36)[0] == []
+
+
+def test_estado_por_dispositivo(motor):
+    motor.evaluar("a", TEMP, 35)
+    assert _switches(motor.evaluar("b", TEMP, 35)[0]) == {("switch.ventilador", "ON"),
+                                                           ("switch.bombillo", "OFF")}
+
+
+def test_no_repite_comandos_ya_aplicados(motor):
+    motor.marcar("esp32", "switch.ventilador", "ON")
+    motor.marcar("esp32", "switch.bombillo", "OFF")
+    acciones, _ = motor.evaluar("esp32", TEMP, 35)
+    assert _switches(acciones) == set()
+
+
+def test_regla_remota_y_condiciones():
+    reglas = parse_automations([{
+        "id": "extrema",
+        "remote": True,
+        "trigger": {"platform": "numeric_state", "entity_id": TEMP, "above": 40},
+        "condition": {"condition": "numeric_state", "entity_id": "sensor.humedad", "below": 50},
+    }])
+    motor = RuleEngine(reglas)
+    # Sin lectura de humedad la condición no se cumple
+    assert motor.evaluar("esp32", TEMP, 41) == ([], [])
+    motor.evaluar("esp32", TEMP, 35)
+    motor.evaluar("esp32", "sensor.humedad", 30)
+    acciones, remotas = motor.evaluar("esp32", TEMP, 41)
+    assert acciones == [] and [r.id for r in remotas] == ["extrema"]
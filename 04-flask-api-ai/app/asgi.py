@@ -0,0 +1,81 @@
+"""
+Modo ASGI de la API de imágenes.
+
+    pip install -r requirements.txt
+    cd 04-flask-api-ai/app
+    PYTHONPATH=.. hypercorn asgi:app --bind 0.0.0.0:5000 --workers 1
+
+PYTHONPATH=.. hace falta porque los módulos importan tanto desde la
+carpeta app/ (utils., routes.) como desde el paquete app (app.utils.).
+
+Sirve las mismas rutas que routes/images.py (subida, lotes, descarga
+con Range/ETag y derivados, listado, búsqueda y borrado), además de
+/status y /metrics, con Quart y el driver asíncrono de PyMongo. Cada
+transferencia es una corrutina en vez de un hilo, así un solo proceso
+mantiene miles de descargas y subidas abiertas; el límite lo pone el
+pool de conexiones (Config.ASYNC_MONGO_*).
+
+La ingesta MQTT y la telemetría siguen en run.py (Flask); los dos
+procesos pueden correr a la vez sobre la misma base de datos.
+"""
+
+from quart import Quart, Response, g, jsonify, request
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+import time
+from utils.config import Config
+from utils.cache import init_cache
+from utils.metrics import Metrics
+from utils.mongo_async import init_async_mongo, close_async_mongo
+from services.derivatives_async import init_derivatives_async
+from routes.images_async import images_async
+
+
+def create_asgi_app():
+    app = Quart(__name__)
+    app.config.from_object(Config)
+
+    metrics = Metrics()
+    app.config['METRICS'] = metrics
+    init_cache(app)
+
+    @app.before_serving
+    async def startup():
+        # El cliente asíncrono se crea dentro del event loop del servidor
+        await init_async_mongo(app)
+        init_derivatives_async(app)
+
+    @app.after_serving
+    async def shutdown():
+        derivatives = app.config.pop('DERIVATIVES', None)
+        if derivatives:
+            derivatives.close()
+        await close_async_mongo(app)
+
+    @app.before_request
+    async def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    async def record_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            metrics.observe_request(request.method, route, response.status_code,
+                                    time.perf_counter() - started)
+        return response
+
+    @app.route('/status', methods=['GET'])
+    async def get_status():
+        return jsonify({"status": "running", "mode": "asgi"})
+
+    @app.route('/metrics', methods=['GET'])
+    async def get_metrics():
+        """Métricas en formato Prometheus"""
+        return Response(generate_latest(metrics.registry), content_type=CONTENT_TYPE_LATEST)
+
+    app.register_blueprint(images_async)
+
+    return app
+
+
+app = create_asgi_app()
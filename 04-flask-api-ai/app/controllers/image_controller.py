@@ -1,8 +1,102 @@
-from flask import jsonify, send_file, Response
-from io import BytesIO
+from flask import jsonify, Response
 from bson.objectid import ObjectId
 import json
-from app.models.image_model import ImageModel
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.models.image_model import ImageModel, ImageTooLargeError
+from app.utils.streaming import image_info, is_not_modified, send_image
+
+# Campos de fs.files por los que se puede ordenar una búsqueda
+SORTABLE_FIELDS = ("uploadDate", "length", "filename")
+
+
+def parse_datetime(value):
+    """Convierte una fecha ISO 8601 a datetime en UTC"""
+    parsed = datetime.datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.astimezone(datetime.timezone.utc)
+
+def parse_metadata(raw):
+    """
+    Convierte el campo 'metadata' de una carga en un dict
+    
+    Args:
+        raw: Texto JSON recibido (None si no se envió)
+        
+    Returns:
+        dict: Metadatos adicionales
+        
+    Raises:
+        ValueError: Si no es JSON o no es un objeto
+    """
+    if raw is None:
+        return {}
+    try:
+        metadata = json.loads(raw)
+    except json.JSONDecodeError:
+        raise ValueError("El formato del JSON de metadatos es inválido")
+    if not isinstance(metadata, dict):
+        raise ValueError("metadata debe ser un objeto JSON")
+    return metadata
+
+def parse_batch_metadata(raw, count):
+    """
+    Convierte el campo 'metadata' de una carga por lotes en un dict por imagen
+    
+    Args:
+        raw: Texto JSON recibido (None si no se envió)
+        count: Cantidad de imágenes del lote
+        
+    Returns:
+        list: Un dict de metadatos por imagen, en orden
+        
+    Raises:
+        ValueError: Si no es JSON, ni un objeto, ni una lista de objetos con
+                    un elemento por imagen
+    """
+    if raw is None:
+        return [{} for _ in range(count)]
+    try:
+        metadata = json.loads(raw)
+    except json.JSONDecodeError:
+        raise ValueError("El formato del JSON de metadatos es inválido")
+    
+    if isinstance(metadata, dict):
+        return [metadata for _ in range(count)]
+    # Se valida aquí: un elemento que no es objeto fallaría dentro del hilo (500)
+    if isinstance(metadata, list) and len(metadata) == count \
+            and all(isinstance(entry, dict) for entry in metadata):
+        return metadata
+    raise ValueError("metadata debe ser un objeto o una lista con un objeto por imagen")
+
+def batch_summary(results, server_error=False):
+    """
+    Resumen de una carga por lotes según cuántas imágenes se guardaron
+    
+    Args:
+        results: Resultado por imagen (status "success" o "error")
+        server_error: True si algún fallo no fue culpa de la solicitud
+        
+    Returns:
+        tuple: (cuerpo de la respuesta, 201 todas, 207 algunas, 400/500 ninguna)
+    """
+    stored = sum(1 for r in results if r["status"] == "success")
+    
+    if stored == len(results):
+        status, code = "success", 201
+    elif stored:
+        status, code = "partial", 207
+    else:
+        status, code = "error", 500 if server_error else 400
+    
+    return {
+        "status": status,
+        "stored": stored,
+        "failed": len(results) - stored,
+        "results": results
+    }, code
 
 class ImageController:
     def __init__(self, app):
@@ -19,6 +113,11 @@ class ImageController:
         Returns:
             tuple: (respuesta JSON, código de estado)
         """
+        # Rechazar cuerpos demasiado grandes antes de leerlos
+        max_body = self.app.config['MAX_UPLOAD_SIZE'] + self.app.config['MULTIPART_OVERHEAD']
+        if request.content_length and request.content_length > max_body:
+            return jsonify({"error": "La imagen supera el tamaño máximo permitido"}), 413
+        
         # Verificar si se envió una imagen
         if 'image' not in request.files:
             return jsonify({"error": "No se envió ninguna imagen"}), 400
@@ -30,20 +129,20 @@ class ImageController:
             return jsonify({"error": "El archivo no tiene nombre"}), 400
         
         # Obtener metadatos adicionales si se proporcionaron
-        additional_metadata = {}
-        if 'metadata' in request.form:
-            try:
-                additional_metadata = json.loads(request.form['metadata'])
-            except json.JSONDecodeError:
-                return jsonify({"error": "El formato del JSON de metadatos es inválido"}), 400
+        try:
+            additional_metadata = parse_metadata(request.form.get('metadata'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         try:
-            # Usar el modelo para guardar la imagen
-            file_id = self.model.save_image(
-                image.read(),
+            # Copiar el stream a GridFS por bloques
+            file_id = self.model.save_image_stream(
+                image.stream,
                 filename=image.filename,
                 content_type=image.content_type,
-                additional_metadata=additional_metadata
+                additional_metadata=additional_metadata,
+                max_size=self.app.config.get('MAX_UPLOAD_SIZE'),
+                chunk_size=self.app.config.get('UPLOAD_CHUNK_SIZE')
             )
             
             return jsonify({
@@ -51,33 +150,135 @@ class ImageController:
                 "message": "Imagen almacenada exitosamente",
                 "file_id": file_id
             }), 201
+        except ImageTooLargeError as e:
+            return jsonify({"error": str(e)}), 413
         except Exception as e:
             return jsonify({
                 "status": "error",
                 "message": f"Error al guardar la imagen: {str(e)}"
             }), 500
     
-    def get_image(self, file_id) -> tuple[Response, int]:
+    def upload_batch(self, request) -> tuple[Response, int]:
+        """
+        Procesa la carga de varias imágenes en una sola solicitud
+        
+        Las imágenes llegan en el campo 'images' (repetido). El campo
+        'metadata' puede ser una lista JSON con un objeto por imagen
+        (en el mismo orden) o un único objeto aplicado a todas.
+        
+        Args:
+            request: Objeto request de Flask
+            
+        Returns:
+            tuple: (respuesta JSON con el resultado por imagen, código de estado)
+        """
+        files = request.files.getlist('images')
+        if not files:
+            return jsonify({"error": "No se envió ninguna imagen"}), 400
+        
+        max_files = self.app.config['BATCH_MAX_FILES']
+        if len(files) > max_files:
+            return jsonify({"error": f"Se permiten máximo {max_files} imágenes por lote"}), 400
+        
+        # Metadatos por imagen
+        try:
+            metadata_list = parse_batch_metadata(request.form.get('metadata'), len(files))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # self.app suele ser el proxy current_app, que no existe en los hilos
+        # del pool: cada hilo abre su propio contexto de la aplicación
+        app = self.app._get_current_object() if hasattr(self.app, '_get_current_object') else self.app
+        server_errors = []
+        
+        def save(index, image, additional_metadata):
+            result = {"index": index, "filename": image.filename}
+            if image.filename == '':
+                return {**result, "status": "error", "error": "El archivo no tiene nombre"}
+            try:
+                with app.app_context():
+                    file_id = self.model.save_image_stream(
+                        image.stream,
+                        filename=image.filename,
+                        content_type=image.content_type,
+                        additional_metadata=additional_metadata,
+                        max_size=app.config.get('MAX_UPLOAD_SIZE'),
+                        chunk_size=app.config.get('UPLOAD_CHUNK_SIZE')
+                    )
+                return {**result, "status": "success", "file_id": file_id}
+            except ValueError as e:
+                # Imagen inválida o demasiado grande: error del cliente
+                return {**result, "status": "error", "error": str(e)}
+            except Exception as e:
+                server_errors.append(index)
+                return {**result, "status": "error", "error": str(e)}
+        
+        # Escribir las imágenes en GridFS de forma concurrente
+        workers = min(app.config['BATCH_UPLOAD_WORKERS'], len(files))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(save, index, image, metadata_list[index])
+                for index, image in enumerate(files)
+            ]
+            results = [future.result() for future in futures]
+        
+        body, code = batch_summary(results, server_error=bool(server_errors))
+        return jsonify(body), code
+    
+    def get_image(self, file_id, request) -> Response:
         """
         Obtiene una imagen por su ID
         
+        Las imágenes pequeñas y los metadatos de todas se guardan en la
+        caché en memoria, así las lecturas repetidas y las peticiones
+        condicionales no consultan MongoDB. Las imágenes grandes se
+        envían por bloques desde GridFS.
+        
         Args:
             file_id: ID de la imagen a obtener
+            request: Objeto request de Flask (Range e If-* opcionales;
+                     w, h, format y q piden un derivado redimensionado)
             
         Returns:
-            tuple: (respuesta, código de estado)
+            Response: respuesta de la imagen (200, 206, 304 o 416)
         """
         try:
-            # Usar el modelo para obtener la imagen y sus metadatos
-            image_data, metadata = self.model.get_image(file_id)
-            
-            # Enviar el archivo
-            return send_file(
-                BytesIO(image_data),
-                mimetype=metadata.get('content_type', 'image/jpeg'),
-                download_name=metadata.get('filename', 'image.jpg'),
-                as_attachment=False
-            )
+            derivatives = self.app.config.get('DERIVATIVES')
+            params = derivatives.parse_params(request.args) if derivatives else None
+            if params is not None:
+                return self._get_derivative(file_id, params, request)
+            
+            cache = self.app.config.get('IMAGE_CACHE')
+            cached = cache.get(file_id) if cache else None
+            
+            if cached is not None:
+                info, data = cached
+                if data is not None or is_not_modified(request, info):
+                    return send_image(request, info, data=data)
+            
+            metrics = self.app.config.get('METRICS')
+            
+            # Abrir el archivo sin cargarlo en memoria
+            grid_out, metadata = self.model.open_image(file_id)
+            info = image_info(grid_out, metadata)
+            
+            if cache and info["length"] <= cache.max_item_bytes:
+                started = time.perf_counter()
+                data = grid_out.read()
+                grid_out.close()
+                if metrics:
+                    metrics.observe_gridfs("read", len(data), time.perf_counter() - started)
+                cache.put(file_id, info, data)
+                return send_image(request, info, data=data)
+            
+            if cache:
+                # Solo metadatos: sirve para responder 304 sin consultar la base
+                cache.put(file_id, info)
+            
+            # Enviar el archivo chunk por chunk
+            on_read = (lambda sent, seconds: metrics.observe_gridfs("read", sent, seconds)) \
+                if metrics else None
+            return send_image(request, info, grid_out=grid_out, on_read=on_read)
         except ValueError as e:
             return jsonify({"error": str(e)}), 400
         except Exception as e:
@@ -86,9 +287,34 @@ class ImageController:
                 "message": f"Error al obtener la imagen: {str(e)}"
             }), 404
     
+    def _get_derivative(self, file_id, params, request) -> Response:
+        """
+        Responde un derivado (miniatura o recodificación) de una imagen
+        
+        Args:
+            file_id: ID de la imagen original
+            params: Parámetros del derivado (w, h, format, q)
+            request: Objeto request de Flask
+            
+        Returns:
+            Response: respuesta del derivado
+        """
+        derivatives = self.app.config['DERIVATIVES']
+        cache = self.app.config.get('IMAGE_CACHE')
+        cache_key = (file_id, derivatives.make_key(file_id, params))
+        
+        cached = cache.get(cache_key) if cache else None
+        if cached is None:
+            cached = derivatives.get(file_id, params)
+            if cache:
+                cache.put(cache_key, *cached)
+        
+        info, data = cached
+        return send_image(request, info, data=data)
+    
     def list_images(self, request) -> tuple[Response, int]:
         """
-        Lista todas las imágenes con paginación
+        Lista todas las imágenes con paginación por cursor
         
         Args:
             request: Objeto request de Flask
@@ -100,29 +326,99 @@ class ImageController:
             # Obtener parámetros de paginación
             limit = int(request.args.get('limit', 10))
             skip = int(request.args.get('skip', 0))
+            cursor = request.args.get('cursor')
+            count = request.args.get('count', 'estimated')
             
             # Validar parámetros
             if limit < 1 or limit > 100:
                 limit = 10
             if skip < 0:
                 skip = 0
+            if count not in ('estimated', 'exact', 'none'):
+                count = 'estimated'
             
             # Usar el modelo para listar las imágenes
-            images, total = self.model.list_images(limit, skip)
+            images, total, next_cursor = self.model.list_images(limit, skip, cursor, count)
             
             return jsonify({
                 "status": "success",
                 "total": total,
                 "limit": limit,
                 "skip": skip,
+                "next": next_cursor,
                 "data": images
             }), 200
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
             return jsonify({
                 "status": "error",
                 "message": f"Error al listar las imágenes: {str(e)}"
             }), 500
     
+    def search_images(self, request) -> tuple[Response, int]:
+        """
+        Busca imágenes por rango de fechas, etiquetas, autor, dispositivo
+        y tipo de contenido
+        
+        Args:
+            request: Objeto request de Flask
+            
+        Returns:
+            tuple: (respuesta JSON, código de estado)
+        """
+        try:
+            args = request.args
+            
+            filters = {
+                "uploader": args.get('uploader'),
+                "device_id": args.get('device_id'),
+                "content_type": args.get('content_type'),
+                "tags": [tag.strip() for tag in args.get('tags', '').split(',') if tag.strip()]
+            }
+            try:
+                if args.get('from'):
+                    filters["date_from"] = parse_datetime(args['from'])
+                if args.get('to'):
+                    filters["date_to"] = parse_datetime(args['to'])
+            except ValueError:
+                return jsonify({"error": "Las fechas deben estar en formato ISO 8601"}), 400
+            
+            # Orden: campo con prefijo "-" para descendente
+            sort = args.get('sort', '-uploadDate')
+            direction = -1 if sort.startswith('-') else 1
+            sort_field = sort.lstrip('-+')
+            if sort_field not in SORTABLE_FIELDS:
+                return jsonify({
+                    "error": f"sort debe ser uno de: {', '.join(SORTABLE_FIELDS)}"
+                }), 400
+            
+            limit = int(args.get('limit', 10))
+            if limit < 1 or limit > 100:
+                limit = 10
+            
+            images, next_cursor = self.model.search_images(
+                filters,
+                sort_field=sort_field,
+                direction=direction,
+                limit=limit,
+                cursor=args.get('cursor')
+            )
+            
+            return jsonify({
+                "status": "success",
+                "limit": limit,
+                "next": next_cursor,
+                "data": images
+            }), 200
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({
+                "status": "error",
+                "message": f"Error al buscar las imágenes: {str(e)}"
+            }), 500
+    
     def delete_image(self, file_id) -> tuple[Response, int]:
         """
         Elimina una imagen por su ID
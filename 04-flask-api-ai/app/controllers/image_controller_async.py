@@ -0,0 +1,387 @@
+from quart import jsonify, Response
+from werkzeug.exceptions import RequestEntityTooLarge
+import time
+from app.controllers.image_controller import (
+    SORTABLE_FIELDS, parse_datetime, parse_metadata, parse_batch_metadata, batch_summary
+)
+from app.models.image_model import ImageTooLargeError
+from app.models.image_model_async import AsyncImageModel
+from app.utils.multipart_async import iter_multipart
+from app.utils.streaming import image_info, is_not_modified
+from app.utils.streaming_async import send_image_async
+
+
+class AsyncImageController:
+    def __init__(self, app):
+        self.app = app
+        self.model = AsyncImageModel(app)
+
+    async def upload_image(self, request) -> tuple[Response, int]:
+        """
+        Procesa la solicitud de carga de imagen
+
+        La imagen se copia a GridFS a medida que llega el cuerpo; el
+        campo 'metadata' puede venir antes o después del archivo.
+
+        Args:
+            request: Objeto request de Quart
+
+        Returns:
+            tuple: (respuesta JSON, código de estado)
+        """
+        max_body = self.app.config['MAX_UPLOAD_SIZE'] + self.app.config['MULTIPART_OVERHEAD']
+        if request.content_length and request.content_length > max_body:
+            return jsonify({"error": "La imagen supera el tamaño máximo permitido"}), 413
+
+        upload = None
+        receiving = False
+        metadata_field = None
+        try:
+            async for event in iter_multipart(request, self.app.config['MULTIPART_OVERHEAD']):
+                if event[0] == "file":
+                    _, name, filename, content_type = event
+                    # Solo se guarda el primer archivo del campo 'image'
+                    receiving = name == 'image' and upload is None
+                    if receiving:
+                        if not filename:
+                            return jsonify({"error": "El archivo no tiene nombre"}), 400
+                        upload = self.model.begin_upload(
+                            filename, content_type, max_size=self.app.config.get('MAX_UPLOAD_SIZE')
+                        )
+                elif event[0] == "data" and receiving:
+                    await upload.write(event[1])
+                elif event[0] == "file_end":
+                    receiving = False
+                elif event[0] == "field" and event[1] == 'metadata':
+                    metadata_field = event[2]
+
+            if upload is None:
+                return jsonify({"error": "No se envió ninguna imagen"}), 400
+
+            # ValueError (JSON inválido o no es un objeto) responde 400 más abajo
+            additional_metadata = parse_metadata(metadata_field)
+
+            file_id = await upload.finish(additional_metadata)
+
+            return jsonify({
+                "status": "success",
+                "message": "Imagen almacenada exitosamente",
+                "file_id": file_id
+            }), 201
+        except (ImageTooLargeError, RequestEntityTooLarge) as e:
+            return jsonify({"error": str(e)}), 413
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({
+                "status": "error",
+                "message": f"Error al guardar la imagen: {str(e)}"
+            }), 500
+        finally:
+            # Sin finish() (error o respuesta anticipada) se descartan los chunks
+            if upload is not None:
+                await upload.abort()
+
+    async def upload_batch(self, request) -> tuple[Response, int]:
+        """
+        Procesa la carga de varias imágenes en una sola solicitud
+
+        Mismo formato que ImageController.upload_batch: campo 'images'
+        repetido y 'metadata' como objeto o lista. Cada imagen se copia
+        a GridFS mientras llega; los metadatos se aplican al final.
+
+        Args:
+            request: Objeto request de Quart
+
+        Returns:
+            tuple: (respuesta JSON con el resultado por imagen, código de estado)
+        """
+        max_files = self.app.config['BATCH_MAX_FILES']
+        max_size = self.app.config.get('MAX_UPLOAD_SIZE')
+
+        # (resultado, subida en curso o None) por imagen, en orden de llegada
+        entries = []
+        current = None
+        metadata_field = None
+        try:
+            async for event in iter_multipart(request, self.app.config['MULTIPART_OVERHEAD']):
+                if event[0] == "file":
+                    _, name, filename, content_type = event
+                    current = None
+                    if name != 'images':
+                        continue
+                    if len(entries) == max_files:
+                        return jsonify({"error": f"Se permiten máximo {max_files} imágenes por lote"}), 400
+                    result = {"index": len(entries), "filename": filename}
+                    if not filename:
+                        entries.append(({**result, "status": "error", "error": "El archivo no tiene nombre"}, None))
+                        continue
+                    current = [result, self.model.begin_upload(filename, content_type, max_size)]
+                    entries.append(current)
+                elif event[0] == "data" and current is not None:
+                    try:
+                        await current[1].write(event[1])
+                    except ImageTooLargeError as e:
+                        # Se descarta esta imagen y se siguen leyendo las demás
+                        await current[1].abort()
+                        current[0] = {**current[0], "status": "error", "error": str(e)}
+                        current[1] = None
+                        current = None
+                elif event[0] == "file_end":
+                    current = None
+                elif event[0] == "field" and event[1] == 'metadata':
+                    metadata_field = event[2]
+
+            if not entries:
+                return jsonify({"error": "No se envió ninguna imagen"}), 400
+
+            # ValueError responde 400; finally descarta los chunks ya escritos
+            metadata_list = parse_batch_metadata(metadata_field, len(entries))
+
+            results = []
+            server_error = False
+            for index, (result, upload) in enumerate(entries):
+                if upload is None:
+                    results.append(result)
+                    continue
+                try:
+                    file_id = await upload.finish(metadata_list[index])
+                    results.append({**result, "status": "success", "file_id": file_id})
+                except Exception as e:
+                    server_error = True
+                    results.append({**result, "status": "error", "error": str(e)})
+        except RequestEntityTooLarge as e:
+            return jsonify({"error": str(e)}), 413
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({
+                "status": "error",
+                "message": f"Error al guardar las imágenes: {str(e)}"
+            }), 500
+        finally:
+            for _, upload in entries:
+                if upload is not None:
+                    await upload.abort()
+
+        body, code = batch_summary(results, server_error=server_error)
+        return jsonify(body), code
+
+    async def get_image(self, file_id, request) -> Response:
+        """
+        Obtiene una imagen por su ID
+
+        Misma caché y mismos derivados que ImageController.get_image;
+        las imágenes grandes se transmiten desde GridFS sin bloquear el
+        event loop.
+
+        Args:
+            file_id: ID de la imagen a obtener
+            request: Objeto request de Quart (Range e If-* opcionales;
+                     w, h, format y q piden un derivado redimensionado)
+
+        Returns:
+            Response: respuesta de la imagen (200, 206, 304 o 416)
+        """
+        try:
+            derivatives = self.app.config.get('DERIVATIVES')
+            params = derivatives.parse_params(request.args) if derivatives else None
+            if params is not None:
+                return await self._get_derivative(file_id, params, request)
+
+            cache = self.app.config.get('IMAGE_CACHE')
+            cached = cache.get(file_id) if cache else None
+
+            if cached is not None:
+                info, data = cached
+                if data is not None or is_not_modified(request, info):
+                    return await send_image_async(request, info, data=data)
+
+            metrics = self.app.config.get('METRICS')
+
+            # Abrir el archivo sin cargarlo en memoria
+            grid_out, metadata = await self.model.open_image(file_id)
+            info = image_info(grid_out, metadata)
+
+            if cache and info["length"] <= cache.max_item_bytes:
+                started = time.perf_counter()
+                try:
+                    data = await grid_out.read()
+                finally:
+                    await grid_out.close()
+                if metrics:
+                    metrics.observe_gridfs("read", len(data), time.perf_counter() - started)
+                cache.put(file_id, info, data)
+                return await send_image_async(request, info, data=data)
+
+            if cache:
+                # Solo metadatos: sirve para responder 304 sin consultar la base
+                cache.put(file_id, info)
+
+            # Enviar el archivo chunk por chunk
+            on_read = (lambda sent, seconds: metrics.observe_gridfs("read", sent, seconds)) \
+                if metrics else None
+            return await send_image_async(request, info, grid_out=grid_out, on_read=on_read)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({
+                "status": "error",
+                "message": f"Error al obtener la imagen: {str(e)}"
+            }), 404
+
+    async def _get_derivative(self, file_id, params, request) -> Response:
+        """
+        Responde un derivado (miniatura o recodificación) de una imagen
+
+        Args:
+            file_id: ID de la imagen original
+            params: Parámetros del derivado (w, h, format, q)
+            request: Objeto request de Quart
+
+        Returns:
+            Response: respuesta del derivado
+        """
+        derivatives = self.app.config['DERIVATIVES']
+        cache = self.app.config.get('IMAGE_CACHE')
+        cache_key = (file_id, derivatives.make_key(file_id, params))
+
+        cached = cache.get(cache_key) if cache else None
+        if cached is None:
+            cached = await derivatives.get(file_id, params)
+            if cache:
+                cache.put(cache_key, *cached)
+
+        info, data = cached
+        return await send_image_async(request, info, data=data)
+
+    async def list_images(self, request) -> tuple[Response, int]:
+        """
+        Lista todas las imágenes con paginación por cursor
+
+        Args:
+            request: Objeto request de Quart
+
+        Returns:
+            tuple: (respuesta JSON, código de estado)
+        """
+        try:
+            limit = int(request.args.get('limit', 10))
+            skip = int(request.args.get('skip', 0))
+            cursor = request.args.get('cursor')
+            count = request.args.get('count', 'estimated')
+
+            if limit < 1 or limit > 100:
+                limit = 10
+            if skip < 0:
+                skip = 0
+            if count not in ('estimated', 'exact', 'none'):
+                count = 'estimated'
+
+            images, total, next_cursor = await self.model.list_images(limit, skip, cursor, count)
+
+            return jsonify({
+                "status": "success",
+                "total": total,
+                "limit": limit,
+                "skip": skip,
+                "next": next_cursor,
+                "data": images
+            }), 200
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({
+                "status": "error",
+                "message": f"Error al listar las imágenes: {str(e)}"
+            }), 500
+
+    async def search_images(self, request) -> tuple[Response, int]:
+        """
+        Busca imágenes por rango de fechas, etiquetas, autor, dispositivo
+        y tipo de contenido
+
+        Args:
+            request: Objeto request de Quart
+
+        Returns:
+            tuple: (respuesta JSON, código de estado)
+        """
+        try:
+            args = request.args
+
+            filters = {
+                "uploader": args.get('uploader'),
+                "device_id": args.get('device_id'),
+                "content_type": args.get('content_type'),
+                "tags": [tag.strip() for tag in args.get('tags', '').split(',') if tag.strip()]
+            }
+            try:
+                if args.get('from'):
+                    filters["date_from"] = parse_datetime(args['from'])
+                if args.get('to'):
+                    filters["date_to"] = parse_datetime(args['to'])
+            except ValueError:
+                return jsonify({"error": "Las fechas deben estar en formato ISO 8601"}), 400
+
+            sort = args.get('sort', '-uploadDate')
+            direction = -1 if sort.startswith('-') else 1
+            sort_field = sort.lstrip('-+')
+            if sort_field not in SORTABLE_FIELDS:
+                return jsonify({
+                    "error": f"sort debe ser uno de: {', '.join(SORTABLE_FIELDS)}"
+                }), 400
+
+            limit = int(args.get('limit', 10))
+            if limit < 1 or limit > 100:
+                limit = 10
+
+            images, next_cursor = await self.model.search_images(
+                filters,
+                sort_field=sort_field,
+                direction=direction,
+                limit=limit,
+                cursor=args.get('cursor')
+            )
+
+            return jsonify({
+                "status": "success",
+                "limit": limit,
+                "next": next_cursor,
+                "data": images
+            }), 200
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({
+                "status": "error",
+                "message": f"Error al buscar las imágenes: {str(e)}"
+            }), 500
+
+    async def delete_image(self, file_id) -> tuple[Response, int]:
+        """
+        Elimina una imagen por su ID
+
+        Args:
+            file_id: ID de la imagen a eliminar
+
+        Returns:
+            tuple: (respuesta JSON, código de estado)
+        """
+        try:
+            await self.model.delete_image(file_id)
+
+            return jsonify({
+                "status": "success",
+                "message": "Imagen eliminada exitosamente",
+                "file_id": file_id
+            }), 200
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except FileNotFoundError:
+            return jsonify({"error": "No se encontró la imagen"}), 404
+        except Exception as e:
+            return jsonify({
+                "status": "error",
+                "message": f"Error al eliminar la imagen: {str(e)}"
+            }), 500
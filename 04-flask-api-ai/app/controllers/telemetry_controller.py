@@ -0,0 +1,121 @@
+from flask import jsonify, Response
+import datetime
+from app.models.telemetry_model import TelemetryModel, RESOLUTIONS
+from app.services.telemetry import parse_reading
+from app.controllers.image_controller import parse_datetime
+
+
+class TelemetryController:
+    def __init__(self, app):
+        self.app = app
+        self.model = TelemetryModel(app)
+        self.ingestor = app.config['TELEMETRY_INGESTOR']
+
+    def ingest(self, request) -> tuple[Response, int]:
+        """
+        Recibe una lectura o un lote de lecturas
+
+        Acepta {"temp": 24.5} (formato de main.py), una lista de lecturas
+        o {"device_id": ..., "readings": [...]}. Las lecturas se encolan y
+        se escriben por lotes.
+
+        Args:
+            request: Objeto request de Flask
+
+        Returns:
+            tuple: (respuesta JSON, código de estado)
+        """
+        body = request.get_json(silent=True)
+        if body is None:
+            return jsonify({"error": "Se esperaba un cuerpo JSON"}), 400
+
+        default_device = "default"
+        if isinstance(body, dict) and "readings" in body:
+            default_device = body.get("device_id") or default_device
+            items = body["readings"]
+        elif isinstance(body, list):
+            items = body
+        else:
+            items = [body]
+
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "No se enviaron lecturas"}), 400
+
+        max_batch = self.app.config['TELEMETRY_MAX_HTTP_BATCH']
+        if len(items) > max_batch:
+            return jsonify({"error": f"Máximo {max_batch} lecturas por solicitud"}), 413
+
+        try:
+            readings = [parse_reading(item, default_device=default_device) for item in items]
+        except (ValueError, TypeError) as e:
+            return jsonify({"error": f"Lectura inválida: {e}"}), 400
+
+        accepted = self.ingestor.add(readings)
+        if accepted < len(readings):
+            return jsonify({
+                "status": "partial",
+                "accepted": accepted,
+                "message": "La cola de telemetría está llena"
+            }), 503
+
+        return jsonify({"status": "accepted", "accepted": accepted}), 202
+
+    def query(self, device_id, request) -> tuple[Response, int]:
+        """
+        Serie de un dispositivo para gráficas
+
+        Query string: metric (por defecto temperatura), from y to (ISO 8601,
+        por defecto las últimas 24 horas) y resolution (raw, 1m o 1h; si no
+        se indica se elige según el rango para no devolver puntos crudos
+        de meses)
+
+        Args:
+            device_id: ID del dispositivo
+            request: Objeto request de Flask
+
+        Returns:
+            tuple: (respuesta JSON, código de estado)
+        """
+        args = request.args
+        try:
+            end = parse_datetime(args['to']) if args.get('to') else \
+                datetime.datetime.now(datetime.timezone.utc)
+            start = parse_datetime(args['from']) if args.get('from') else \
+                end - datetime.timedelta(days=1)
+        except ValueError:
+            return jsonify({"error": "Formato de fecha inválido, use ISO 8601"}), 400
+
+        if start >= end:
+            return jsonify({"error": "from debe ser anterior a to"}), 400
+
+        resolution = args.get('resolution')
+        if resolution is not None and resolution not in RESOLUTIONS:
+            return jsonify({"error": f"resolution debe ser uno de: {', '.join(RESOLUTIONS)}"}), 400
+
+        # Sin límite, pedir puntos crudos de un rango largo devolvería millones de puntos
+        max_raw = self.app.config['TELEMETRY_MAX_RAW_RANGE']
+        if resolution == "raw" and (end - start).total_seconds() > max_raw:
+            return jsonify({"error": f"El rango máximo para resolution=raw es {max_raw} segundos"}), 400
+
+        try:
+            used, points = self.model.query(
+                device_id,
+                args.get('metric', 'temperatura'),
+                start,
+                end,
+                resolution=resolution
+            )
+        except Exception as e:
+            return jsonify({
+                "status": "error",
+                "message": f"Error al consultar la telemetría: {str(e)}"
+            }), 500
+
+        return jsonify({
+            "device_id": device_id,
+            "metric": args.get('metric', 'temperatura'),
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "resolution": used,
+            "points": points
+        }), 200
@@ -1,8 +1,14 @@
 from flask import Flask
 from utils.mongo import init_mongo
+from utils.cache import init_cache
 from utils.config import Config
+from utils.metrics import init_metrics
 from mqtt.client import init_mqtt
+from services.derivatives import init_derivatives
+from services.telemetry import init_telemetry
 from routes.images import images
+from routes.control import control
+from routes.telemetry import telemetry
 
 def create_app():
     # Validar configuración antes de iniciar
@@ -16,11 +22,17 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
-    # Inicializar servicios
+    # Inicializar servicios (las métricas primero: los demás las registran)
+    init_metrics(app)
     init_mongo(app)
+    init_cache(app)
+    init_derivatives(app)
+    init_telemetry(app)
     init_mqtt(app)
 
     # Registrar blueprints
     app.register_blueprint(images)
+    app.register_blueprint(control)
+    app.register_blueprint(telemetry)
 
     return app
@@ -1,5 +1,28 @@
+from bson.binary import Binary
 from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError
+from app.utils.image_processing import perceptual_hash, hamming_distance
+from app.utils.pagination import encode_cursor, decode_cursor, keyset_filter
 import datetime
+import hashlib
+import io
+import time
+import gridfs
+from gridfs.errors import FileExists
+
+# Campos de fs.files que se devuelven en los listados
+FILE_PROJECTION = {
+    "filename": 1,
+    "contentType": 1,
+    "length": 1,
+    "uploadDate": 1,
+    "metadata": 1
+}
+
+
+class ImageTooLargeError(ValueError):
+    """La imagen supera el tamaño máximo permitido"""
+
 
 class ImageModel:
     def __init__(self, app):
@@ -12,19 +35,22 @@ class ImageModel:
         self.app = app
         self.fs = app.config['MONGO_FS']
         self.db = app.config['MONGO_DB']
-    
-    def save_image(self, image_data, filename, content_type, additional_metadata=None):
+        # None, "sha256" (duplicados exactos) o "phash" (también casi-duplicados)
+        self.dedup_mode = app.config.get('IMAGE_DEDUP_MODE')
+        self.metrics = app.config.get('METRICS')
+
+    @staticmethod
+    def _build_metadata(filename, content_type, additional_metadata=None):
         """
-        Guarda una imagen en GridFS
+        Construye los metadatos que se guardan junto a la imagen
         
         Args:
-            image_data: Bytes de la imagen
             filename: Nombre del archivo
             content_type: Tipo MIME del archivo
             additional_metadata: Metadatos adicionales (opcional)
             
         Returns:
-            str: ID del archivo guardado
+            dict: Metadatos de la imagen
         """
         # Crear metadatos base
         metadata = {
@@ -37,70 +63,470 @@ class ImageModel:
         if additional_metadata:
             metadata.update(additional_metadata)
         
-        # Guardar la imagen en GridFS
-        file_id = self.fs.put(
-            image_data,
+        return metadata
+    
+    def save_image(self, image_data, filename, content_type, additional_metadata=None):
+        """
+        Guarda una imagen en GridFS
+        
+        Args:
+            image_data: Bytes de la imagen
+            filename: Nombre del archivo
+            content_type: Tipo MIME del archivo
+            additional_metadata: Metadatos adicionales (opcional)
+            
+        Returns:
+            str: ID del archivo guardado (o del existente si es duplicado)
+        """
+        return self.save_image_stream(
+            io.BytesIO(image_data),
+            filename=filename,
+            content_type=content_type,
+            additional_metadata=additional_metadata
+        )
+    
+    def save_image_stream(self, stream, filename, content_type, additional_metadata=None,
+                          max_size=None, chunk_size=None):
+        """
+        Guarda una imagen en GridFS leyendo el stream por bloques,
+        sin cargar el archivo completo en memoria
+        
+        Si IMAGE_DEDUP_MODE está activo y el stream permite seek, primero se
+        calcula el hash del contenido; si ya existe una imagen igual (o casi
+        igual en modo "phash") se devuelve su ID sin escribir chunks nuevos.
+        
+        Args:
+            stream: Objeto tipo archivo con método read()
+            filename: Nombre del archivo
+            content_type: Tipo MIME del archivo
+            additional_metadata: Metadatos adicionales (opcional)
+            max_size: Tamaño máximo permitido en bytes (opcional)
+            chunk_size: Tamaño de cada lectura (por defecto el de GridFS)
+            
+        Returns:
+            str: ID del archivo guardado (o del existente si es duplicado)
+            
+        Raises:
+            ImageTooLargeError: Si el stream supera max_size
+        """
+        metadata = self._build_metadata(filename, content_type, additional_metadata)
+        chunk_size = chunk_size or gridfs.DEFAULT_CHUNK_SIZE
+        
+        if self.dedup_mode and stream.seekable():
+            digest, phash = self._fingerprint(stream, max_size, chunk_size)
+            existing = self._find_duplicate(digest, phash, metadata.get("device_id"))
+            if existing:
+                return existing
+            
+            metadata["sha256"] = digest
+            if phash:
+                metadata["phash"] = phash
+            stream.seek(0)
+        
+        grid_in = self.fs.new_file(
             filename=filename,
             content_type=content_type,
             metadata=metadata
         )
         
-        return str(file_id)
+        started = time.perf_counter()
+        written = 0
+        try:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                written += len(chunk)
+                # Abortar en cuanto se supera el límite
+                if max_size is not None and written > max_size:
+                    raise ImageTooLargeError(
+                        f"La imagen supera el tamaño máximo de {max_size} bytes"
+                    )
+                grid_in.write(chunk)
+        except BaseException:
+            # Eliminar los chunks ya escritos
+            grid_in.abort()
+            raise
+        
+        try:
+            grid_in.close()
+        except FileExists:
+            # Una subida concurrente guardó el mismo contenido primero
+            # (GridIn convierte el DuplicateKeyError del índice en FileExists)
+            self.db.fs.chunks.delete_many({"files_id": grid_in._id})
+            if "sha256" not in metadata:
+                raise
+            return self._find_duplicate(metadata["sha256"])
+        
+        if self.metrics:
+            self.metrics.observe_gridfs("write", written, time.perf_counter() - started)
+        return str(grid_in._id)
     
-    def get_image(self, file_id):
+    def save_images_batch(self, items):
         """
-        Recupera una imagen y sus metadatos de GridFS
+        Guarda varias imágenes en GridFS con dos inserciones en bloque
+        (todos los chunks y luego todos los documentos de fs.files)
         
         Args:
-            file_id: ID del archivo a recuperar
+            items: Lista de dicts con data, filename, content_type y
+                   additional_metadata (opcional)
             
         Returns:
-            tuple: (datos de la imagen, metadatos)
+            list: IDs guardados, en el mismo orden de items (el existente
+                  si la imagen era un duplicado)
+        """
+        chunk_size = gridfs.DEFAULT_CHUNK_SIZE
+        upload_date = datetime.datetime.now(datetime.timezone.utc)
+        
+        ids = [None] * len(items)
+        files_docs = []
+        
+        for index, item in enumerate(items):
+            metadata = self._build_metadata(
+                item["filename"], item["content_type"], item.get("additional_metadata")
+            )
+            if self.dedup_mode:
+                metadata["sha256"] = hashlib.sha256(item["data"]).hexdigest()
+            files_docs.append((index, {
+                "_id": ObjectId(),
+                "length": len(item["data"]),
+                "chunkSize": chunk_size,
+                "uploadDate": upload_date,
+                "filename": item["filename"],
+                "contentType": item["content_type"],
+                "metadata": metadata
+            }))
+        
+        if self.dedup_mode:
+            # Una sola consulta para todos los hashes del lote
+            digests = [doc["metadata"]["sha256"] for _, doc in files_docs]
+            existing = {
+                doc["metadata"]["sha256"]: doc["_id"]
+                for doc in self.db.fs.files.find(
+                    {"metadata.sha256": {"$in": digests}},
+                    {"metadata.sha256": 1}
+                )
+            }
+            pending = []
+            for index, doc in files_docs:
+                if doc["metadata"]["sha256"] in existing:
+                    ids[index] = self._find_duplicate(doc["metadata"]["sha256"])
+                else:
+                    pending.append((index, doc))
+            files_docs = pending
+        
+        chunk_docs = []
+        for index, doc in files_docs:
+            data = items[index]["data"]
+            for n, offset in enumerate(range(0, len(data), chunk_size)):
+                chunk_docs.append({
+                    "files_id": doc["_id"],
+                    "n": n,
+                    "data": Binary(data[offset:offset + chunk_size])
+                })
+        
+        started = time.perf_counter()
+        
+        # Primero los chunks: el archivo solo es visible cuando existe en fs.files
+        if chunk_docs:
+            self.db.fs.chunks.insert_many(chunk_docs, ordered=False)
+        
+        for index, doc in files_docs:
+            ids[index] = str(doc["_id"])
+        
+        if files_docs:
+            try:
+                self.db.fs.files.insert_many([doc for _, doc in files_docs], ordered=False)
+            except BulkWriteError as e:
+                failed = False
+                for error in e.details["writeErrors"]:
+                    index, doc = files_docs[error["index"]]
+                    self.db.fs.chunks.delete_many({"files_id": doc["_id"]})
+                    # Duplicado dentro del mismo lote o de una escritura concurrente
+                    if error["code"] == 11000 and "sha256" in doc["metadata"]:
+                        ids[index] = self._find_duplicate(doc["metadata"]["sha256"])
+                    else:
+                        failed = True
+                # Se limpian los chunks de todos los fallidos antes de propagar
+                if failed:
+                    raise
+        
+        if self.metrics and files_docs:
+            self.metrics.observe_gridfs(
+                "write_batch",
+                sum(doc["length"] for _, doc in files_docs),
+                time.perf_counter() - started
+            )
+        return ids
+    
+    def _fingerprint(self, stream, max_size, chunk_size):
+        """
+        Calcula el hash SHA-256 (y el perceptual en modo "phash") del stream
+        
+        Args:
+            stream: Objeto tipo archivo con método read()
+            max_size: Tamaño máximo permitido en bytes
+            chunk_size: Tamaño de cada lectura
+            
+        Returns:
+            tuple: (sha256 en hexadecimal, phash en hexadecimal o None)
+        """
+        hasher = hashlib.sha256()
+        # El hash perceptual necesita decodificar la imagen completa
+        buffer = bytearray() if self.dedup_mode == "phash" else None
+        
+        read = 0
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            read += len(chunk)
+            if max_size is not None and read > max_size:
+                raise ImageTooLargeError(
+                    f"La imagen supera el tamaño máximo de {max_size} bytes"
+                )
+            hasher.update(chunk)
+            if buffer is not None:
+                buffer.extend(chunk)
+        
+        phash = None
+        if buffer is not None:
+            try:
+                phash = perceptual_hash(bytes(buffer))
+            except Exception:
+                # No es una imagen que Pillow pueda abrir
+                phash = None
+        
+        return hasher.hexdigest(), phash
+    
+    def _find_duplicate(self, digest, phash=None, device_id=None):
+        """
+        Busca una imagen ya almacenada con el mismo contenido
+        
+        Args:
+            digest: Hash SHA-256 del contenido
+            phash: Hash perceptual (opcional, para casi-duplicados)
+            device_id: Limita la búsqueda de casi-duplicados a un dispositivo
+            
+        Returns:
+            str: ID de la imagen existente o None
+        """
+        files = self.db.fs.files
+        doc = files.find_one({"metadata.sha256": digest}, {"_id": 1})
+        
+        if doc is None and phash:
+            # Comparar contra las últimas imágenes con hash perceptual
+            query = {"metadata.phash": {"$exists": True}}
+            if device_id is not None:
+                query["metadata.device_id"] = device_id
+            recent = files.find(query, {"metadata.phash": 1}) \
+                .sort("uploadDate", -1) \
+                .limit(self.app.config.get('PHASH_WINDOW', 50))
+            max_distance = self.app.config.get('PHASH_MAX_DISTANCE', 5)
+            for candidate in recent:
+                if hamming_distance(phash, candidate["metadata"]["phash"]) <= max_distance:
+                    doc = candidate
+                    break
+        
+        if doc is None:
+            return None
+        
+        # Registrar la repetición sin escribir chunks
+        files.update_one({"_id": doc["_id"]}, {
+            "$inc": {"metadata.duplicates": 1},
+            "$set": {"metadata.last_seen": datetime.datetime.now(datetime.timezone.utc).isoformat()}
+        })
+        
+        return str(doc["_id"])
+    
+    def open_image(self, file_id):
+        """
+        Abre una imagen de GridFS sin leer su contenido
+        
+        Args:
+            file_id: ID del archivo a abrir
+            
+        Returns:
+            tuple: (GridOut abierto, metadatos)
         """
         # Validar el formato del ID
         if not ObjectId.is_valid(file_id):
             raise ValueError("ID de archivo inválido")
         
-        # Obtener el archivo
+        # Obtener el archivo (solo el documento de fs.files)
         file = self.fs.get(ObjectId(file_id))
         
         # Extraer metadatos
         metadata = {
             "filename": file.filename,
             "content_type": file.content_type,
-            **file.metadata
+            **(file.metadata or {})
         }
         
+        return file, metadata
+    
+    def get_image(self, file_id):
+        """
+        Recupera una imagen y sus metadatos de GridFS
+        
+        Args:
+            file_id: ID del archivo a recuperar
+            
+        Returns:
+            tuple: (datos de la imagen, metadatos)
+        """
+        file, metadata = self.open_image(file_id)
+        
         return file.read(), metadata
     
-    def list_images(self, limit=10, skip=0):
+    def list_images(self, limit=10, skip=0, cursor=None, count="estimated"):
         """
-        Lista todas las imágenes con paginación
+        Lista todas las imágenes, de la más reciente a la más antigua
+        
+        La paginación por cursor recorre el índice (uploadDate, _id), por lo
+        que el costo de cada página no depende de la profundidad. skip se
+        mantiene por compatibilidad cuando no se envía cursor.
         
         Args:
             limit: Número máximo de resultados
-            skip: Número de resultados a omitir
+            skip: Número de resultados a omitir (solo sin cursor)
+            cursor: Token devuelto como "next" en la página anterior (opcional)
+            count: "estimated" (metadatos de la colección), "exact" o "none"
             
         Returns:
-            tuple: (lista de imágenes, total de imágenes)
-        """
-        # Obtener archivos con paginación
-        files = self.fs.find().sort("uploadDate", -1).skip(skip).limit(limit)
-        total = self.db.fs.files.count_documents({})
-        
-        # Formatear resultados
-        images = []
-        for file in files:
-            images.append({
-                "file_id": str(file._id),
-                "filename": file.filename,
-                "content_type": file.content_type,
-                "size": file.length,
-                "upload_date": file.upload_date.isoformat() if hasattr(file, 'upload_date') else None,
-                "metadata": file.metadata
-            })
-        
-        return images, total
+            tuple: (lista de imágenes, total de imágenes o None, cursor siguiente o None)
+        """
+        files = self.db.fs.files
+        
+        query = {}
+        if cursor:
+            query = keyset_filter("uploadDate", -1, decode_cursor(cursor))
+        
+        # Se pide un documento extra para saber si hay otra página
+        docs = files.find(query, FILE_PROJECTION) \
+            .sort([("uploadDate", -1), ("_id", -1)]) \
+            .limit(limit + 1)
+        if skip and not cursor:
+            docs = docs.skip(skip)
+        docs = list(docs)
+        
+        docs, next_cursor = self._split_page(docs, limit, "uploadDate")
+        
+        if count == "exact":
+            total = files.count_documents({})
+        elif count == "estimated":
+            total = files.estimated_document_count()
+        else:
+            total = None
+        
+        return [self._format_file(doc) for doc in docs], total, next_cursor
+    
+    def search_images(self, filters, sort_field="uploadDate", direction=-1, limit=10, cursor=None):
+        """
+        Busca imágenes filtrando por los metadatos de fs.files
+        
+        Args:
+            filters: dict con las claves opcionales date_from, date_to (datetime),
+                     tags (lista, deben estar todas), uploader, device_id, content_type
+            sort_field: Campo de orden ("uploadDate", "length" o "filename")
+            direction: 1 ascendente, -1 descendente
+            limit: Número máximo de resultados
+            cursor: Token devuelto como "next" en la página anterior (opcional)
+            
+        Returns:
+            tuple: (lista de imágenes, cursor siguiente o None)
+        """
+        query = self._search_query(filters, sort_field, direction, cursor)
+        
+        # La proyección deja fuera todo lo que no se devuelve
+        docs = list(
+            self.db.fs.files.find(query, FILE_PROJECTION)
+            .sort([(sort_field, direction), ("_id", direction)])
+            .limit(limit + 1)
+        )
+        
+        docs, next_cursor = self._split_page(docs, limit, sort_field)
+        
+        return [self._format_file(doc) for doc in docs], next_cursor
+    
+    @staticmethod
+    def _search_query(filters, sort_field="uploadDate", direction=-1, cursor=None):
+        """
+        Construye el filtro de fs.files para search_images
+        
+        Args:
+            filters: Filtros descritos en search_images
+            sort_field: Campo de orden
+            direction: 1 ascendente, -1 descendente
+            cursor: Token de la página anterior (opcional)
+            
+        Returns:
+            dict: Filtro de MongoDB
+        """
+        query = {}
+        
+        date_range = {}
+        if filters.get("date_from"):
+            date_range["$gte"] = filters["date_from"]
+        if filters.get("date_to"):
+            date_range["$lt"] = filters["date_to"]
+        if date_range:
+            query["uploadDate"] = date_range
+        
+        if filters.get("tags"):
+            query["metadata.tags"] = {"$all": filters["tags"]}
+        if filters.get("uploader"):
+            query["metadata.uploader"] = filters["uploader"]
+        if filters.get("device_id"):
+            query["metadata.device_id"] = filters["device_id"]
+        if filters.get("content_type"):
+            query["contentType"] = filters["content_type"]
+        
+        if cursor:
+            query = {"$and": [query, keyset_filter(sort_field, direction, decode_cursor(cursor))]}
+        
+        return query
+    
+    @staticmethod
+    def _split_page(docs, limit, sort_field):
+        """
+        Quita el documento extra pedido para saber si hay otra página
+        
+        Args:
+            docs: Lista con hasta limit + 1 documentos
+            limit: Tamaño de la página
+            sort_field: Campo de orden (para el cursor)
+            
+        Returns:
+            tuple: (documentos de la página, cursor siguiente o None)
+        """
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            last = docs[-1]
+            next_cursor = encode_cursor(last.get(sort_field), last["_id"])
+        return docs, next_cursor
+    
+    @staticmethod
+    def _format_file(doc):
+        """
+        Convierte un documento de fs.files en la respuesta pública
+        
+        Args:
+            doc: Documento de fs.files
+            
+        Returns:
+            dict: Datos de la imagen
+        """
+        upload_date = doc.get("uploadDate")
+        return {
+            "file_id": str(doc["_id"]),
+            "filename": doc.get("filename"),
+            "content_type": doc.get("contentType"),
+            "size": doc.get("length"),
+            "upload_date": upload_date.isoformat() if upload_date else None,
+            "metadata": doc.get("metadata")
+        }
     
     def delete_image(self, file_id):
         """
@@ -122,4 +548,14 @@ class ImageModel:
             raise FileNotFoundError("No se encontró la imagen")
         
         # Eliminar el archivo
-        self.fs.delete(ObjectId(file_id))
\ No newline at end of file
+        self.fs.delete(ObjectId(file_id))
+        
+        # Eliminar miniaturas y otros derivados
+        derivatives = self.app.config.get('DERIVATIVES')
+        if derivatives:
+            derivatives.delete_for(file_id)
+        
+        # Descartar las copias en caché
+        cache = self.app.config.get('IMAGE_CACHE')
+        if cache:
+            cache.invalidate(file_id)
\ No newline at end of file
@@ -0,0 +1,255 @@
+"""
+Modelo de imágenes para el modo ASGI, sobre el driver asíncrono de
+PyMongo. Guarda los mismos documentos que ImageModel (fs.files con
+contentType y metadata), así las dos versiones de la API comparten
+la base de datos.
+"""
+
+from bson.objectid import ObjectId
+from gridfs import AsyncGridIn, NoFile
+from gridfs.errors import FileExists
+from app.models.image_model import ImageModel, ImageTooLargeError, FILE_PROJECTION
+from app.utils.pagination import decode_cursor, keyset_filter
+import datetime
+import hashlib
+import time
+
+
+class AsyncUpload:
+    def __init__(self, model, filename, content_type, max_size=None):
+        """
+        Subida en curso a GridFS; los chunks se escriben a medida que
+        llegan los datos y el documento de fs.files al llamar finish()
+
+        Args:
+            model: AsyncImageModel que crea la subida
+            filename: Nombre del archivo
+            content_type: Tipo MIME del archivo
+            max_size: Tamaño máximo permitido en bytes (opcional)
+        """
+        self.model = model
+        self.filename = filename
+        self.content_type = content_type
+        self.max_size = max_size
+        self.written = 0
+        self.grid_in = AsyncGridIn(model.db.fs, filename=filename, content_type=content_type)
+        # Sin un stream con seek el hash se calcula al vuelo y el duplicado
+        # se detecta al final (los chunks ya escritos se descartan)
+        self._hasher = hashlib.sha256() if model.dedup_mode else None
+        self._started = time.perf_counter()
+        self._open = True
+
+    async def write(self, data):
+        """
+        Escribe un bloque de la imagen
+
+        Raises:
+            ImageTooLargeError: Si la imagen supera max_size
+        """
+        self.written += len(data)
+        if self.max_size is not None and self.written > self.max_size:
+            raise ImageTooLargeError(
+                f"La imagen supera el tamaño máximo de {self.max_size} bytes"
+            )
+        if self._hasher is not None:
+            self._hasher.update(data)
+        await self.grid_in.write(data)
+
+    async def finish(self, additional_metadata=None):
+        """
+        Guarda los metadatos y cierra el archivo
+
+        Args:
+            additional_metadata: Metadatos adicionales (opcional)
+
+        Returns:
+            str: ID del archivo guardado (o del existente si es duplicado)
+        """
+        model = self.model
+        metadata = ImageModel._build_metadata(self.filename, self.content_type, additional_metadata)
+
+        if self._hasher is not None:
+            digest = self._hasher.hexdigest()
+            existing = await model._find_duplicate(digest)
+            if existing:
+                await self.abort()
+                return existing
+            metadata["sha256"] = digest
+
+        await self.grid_in.set("metadata", metadata)
+        try:
+            await self.grid_in.close()
+        except FileExists:
+            # Una subida concurrente guardó el mismo contenido primero
+            # (GridIn convierte el DuplicateKeyError del índice en FileExists)
+            await model.db.fs.chunks.delete_many({"files_id": self.grid_in._id})
+            self._open = False
+            if "sha256" not in metadata:
+                raise
+            return await model._find_duplicate(metadata["sha256"])
+        # Si close() falla por otra razón, abort() todavía borra los chunks
+        self._open = False
+
+        if model.metrics:
+            model.metrics.observe_gridfs("write", self.written, time.perf_counter() - self._started)
+        return str(self.grid_in._id)
+
+    async def abort(self):
+        """Elimina los chunks ya escritos (no hace nada si ya se cerró)"""
+        if self._open:
+            self._open = False
+            await self.grid_in.abort()
+
+
+class AsyncImageModel:
+    def __init__(self, app):
+        """
+        Inicializa el modelo con la aplicación Quart
+
+        Args:
+            app: Instancia de Quart con MongoDB asíncrono inicializado
+        """
+        self.app = app
+        self.fs = app.config['ASYNC_MONGO_FS']
+        self.db = app.config['ASYNC_MONGO_DB']
+        # En modo async "phash" se trata como "sha256": el hash perceptual
+        # obligaría a juntar la imagen completa en memoria
+        self.dedup_mode = app.config.get('IMAGE_DEDUP_MODE')
+        self.metrics = app.config.get('METRICS')
+
+    def begin_upload(self, filename, content_type, max_size=None):
+        """
+        Empieza una subida por bloques
+
+        Args:
+            filename: Nombre del archivo
+            content_type: Tipo MIME del archivo
+            max_size: Tamaño máximo permitido en bytes (opcional)
+
+        Returns:
+            AsyncUpload: Subida en curso (write, finish, abort)
+        """
+        return AsyncUpload(self, filename, content_type, max_size)
+
+    async def _find_duplicate(self, digest):
+        """
+        Busca una imagen ya almacenada con el mismo hash SHA-256
+
+        Args:
+            digest: Hash SHA-256 del contenido
+
+        Returns:
+            str: ID de la imagen existente o None
+        """
+        # Registrar la repetición sin escribir chunks
+        doc = await self.db.fs.files.find_one_and_update(
+            {"metadata.sha256": digest},
+            {
+                "$inc": {"metadata.duplicates": 1},
+                "$set": {"metadata.last_seen": datetime.datetime.now(datetime.timezone.utc).isoformat()}
+            },
+            projection={"_id": 1}
+        )
+        return str(doc["_id"]) if doc else None
+
+    async def open_image(self, file_id):
+        """
+        Abre una imagen de GridFS sin leer su contenido
+
+        Args:
+            file_id: ID del archivo a abrir
+
+        Returns:
+            tuple: (AsyncGridOut abierto, metadatos)
+
+        Raises:
+            ValueError: Si el ID no es válido
+            FileNotFoundError: Si el archivo no existe
+        """
+        if not ObjectId.is_valid(file_id):
+            raise ValueError("ID de archivo inválido")
+
+        try:
+            file = await self.fs.open_download_stream(ObjectId(file_id))
+        except NoFile:
+            raise FileNotFoundError("No se encontró la imagen")
+
+        # content_type ya se guarda en metadata al subir la imagen
+        metadata = {
+            "filename": file.filename,
+            **(file.metadata or {})
+        }
+
+        return file, metadata
+
+    async def list_images(self, limit=10, skip=0, cursor=None, count="estimated"):
+        """
+        Lista todas las imágenes, de la más reciente a la más antigua
+        (mismos parámetros y resultado que ImageModel.list_images)
+        """
+        files = self.db.fs.files
+
+        query = {}
+        if cursor:
+            query = keyset_filter("uploadDate", -1, decode_cursor(cursor))
+
+        docs = files.find(query, FILE_PROJECTION) \
+            .sort([("uploadDate", -1), ("_id", -1)]) \
+            .limit(limit + 1)
+        if skip and not cursor:
+            docs = docs.skip(skip)
+        docs = await docs.to_list()
+
+        docs, next_cursor = ImageModel._split_page(docs, limit, "uploadDate")
+
+        if count == "exact":
+            total = await files.count_documents({})
+        elif count == "estimated":
+            total = await files.estimated_document_count()
+        else:
+            total = None
+
+        return [ImageModel._format_file(doc) for doc in docs], total, next_cursor
+
+    async def search_images(self, filters, sort_field="uploadDate", direction=-1, limit=10, cursor=None):
+        """
+        Busca imágenes filtrando por los metadatos de fs.files
+        (mismos parámetros y resultado que ImageModel.search_images)
+        """
+        query = ImageModel._search_query(filters, sort_field, direction, cursor)
+
+        docs = await self.db.fs.files.find(query, FILE_PROJECTION) \
+            .sort([(sort_field, direction), ("_id", direction)]) \
+            .limit(limit + 1) \
+            .to_list()
+
+        docs, next_cursor = ImageModel._split_page(docs, limit, sort_field)
+
+        return [ImageModel._format_file(doc) for doc in docs], next_cursor
+
+    async def delete_image(self, file_id):
+        """
+        Elimina una imagen de GridFS junto con sus derivados
+
+        Args:
+            file_id: ID del archivo a eliminar
+
+        Raises:
+            ValueError: Si el ID no es válido
+            FileNotFoundError: Si el archivo no existe
+        """
+        if not ObjectId.is_valid(file_id):
+            raise ValueError("ID de archivo inválido")
+
+        try:
+            await self.fs.delete(ObjectId(file_id))
+        except NoFile:
+            raise FileNotFoundError("No se encontró la imagen")
+
+        derivatives = self.app.config.get('DERIVATIVES')
+        if derivatives:
+            await derivatives.delete_for(file_id)
+
+        cache = self.app.config.get('IMAGE_CACHE')
+        if cache:
+            cache.invalidate(file_id)
@@ -0,0 +1,159 @@
+from pymongo import UpdateOne
+import datetime
+
+# Resoluciones de los agregados: nombre -> (colección, segundos por punto)
+ROLLUPS = {
+    "1m": ("telemetry_1m", 60),
+    "1h": ("telemetry_1h", 3600)
+}
+RESOLUTIONS = ("raw",) + tuple(ROLLUPS)
+
+
+def _floor(ts, seconds):
+    """Inicio de la ventana de `seconds` segundos que contiene a ts"""
+    epoch = int(ts.timestamp())
+    return datetime.datetime.fromtimestamp(epoch - epoch % seconds, tz=datetime.timezone.utc)
+
+
+class TelemetryModel:
+    def __init__(self, app):
+        """
+        Inicializa el modelo con la aplicación Flask
+
+        Los puntos crudos se guardan en "telemetry", un documento por
+        dispositivo, métrica y ventana de TELEMETRY_BUCKET_SECONDS. Los
+        agregados min/max/suma/conteo por minuto y por hora se mantienen
+        en "telemetry_1m" y "telemetry_1h" con cada inserción.
+
+        Args:
+            app: Instancia de Flask
+        """
+        self.app = app
+        self.db = app.config['MONGO_DB']
+        self.buckets = self.db.telemetry
+        self.bucket_seconds = app.config['TELEMETRY_BUCKET_SECONDS']
+
+    def insert_readings(self, readings):
+        """
+        Guarda un lote de lecturas con una escritura por colección
+
+        Args:
+            readings: Lista de dicts con device_id, metric, value y ts (datetime UTC)
+
+        Returns:
+            int: Número de lecturas guardadas
+        """
+        if not readings:
+            return 0
+
+        # Puntos crudos agrupados por bucket
+        buckets = {}
+        for reading in readings:
+            key = (reading["device_id"], reading["metric"], _floor(reading["ts"], self.bucket_seconds))
+            buckets.setdefault(key, []).append(reading)
+
+        operations = []
+        for (device_id, metric, start), points in buckets.items():
+            values = [p["value"] for p in points]
+            operations.append(UpdateOne(
+                {"device_id": device_id, "metric": metric, "start": start},
+                {
+                    "$push": {"points": {"$each": [{"ts": p["ts"], "v": p["value"]} for p in points]}},
+                    "$min": {"min": min(values)},
+                    "$max": {"max": max(values)},
+                    "$inc": {"count": len(values), "sum": sum(values)}
+                },
+                upsert=True
+            ))
+        self.buckets.bulk_write(operations, ordered=False)
+
+        # Agregados: un upsert por ventana de cada resolución
+        for collection, seconds in ROLLUPS.values():
+            windows = {}
+            for reading in readings:
+                key = (reading["device_id"], reading["metric"], _floor(reading["ts"], seconds))
+                windows.setdefault(key, []).append(reading["value"])
+
+            self.db[collection].bulk_write([
+                UpdateOne(
+                    {"device_id": device_id, "metric": metric, "start": start},
+                    {
+                        "$min": {"min": min(values)},
+                        "$max": {"max": max(values)},
+                        "$inc": {"count": len(values), "sum": sum(values)}
+                    },
+                    upsert=True
+                )
+                for (device_id, metric, start), values in windows.items()
+            ], ordered=False)
+
+        return len(readings)
+
+    def choose_resolution(self, start, end):
+        """
+        Resolución para un rango de fechas: crudo hasta la ventana de un
+        bucket, minutos hasta TELEMETRY_MINUTE_RANGE y horas después
+
+        Returns:
+            str: "raw", "1m" o "1h"
+        """
+        span = (end - start).total_seconds()
+        if span <= self.bucket_seconds:
+            return "raw"
+        if span <= self.app.config['TELEMETRY_MINUTE_RANGE']:
+            return "1m"
+        return "1h"
+
+    def query(self, device_id, metric, start, end, resolution=None):
+        """
+        Serie de un dispositivo entre dos fechas
+
+        Args:
+            device_id: ID del dispositivo
+            metric: Nombre de la métrica (p. ej. "temperatura")
+            start: Fecha inicial (datetime UTC, inclusiva)
+            end: Fecha final (datetime UTC, exclusiva)
+            resolution: "raw", "1m", "1h" o None para elegirla según el rango
+
+        Returns:
+            tuple: (resolución usada, lista de puntos)
+        """
+        resolution = resolution or self.choose_resolution(start, end)
+
+        if resolution == "raw":
+            cursor = self.buckets.find(
+                {
+                    "device_id": device_id,
+                    "metric": metric,
+                    "start": {"$gte": _floor(start, self.bucket_seconds), "$lt": end}
+                },
+                {"points": 1, "_id": 0}
+            ).sort("start", 1)
+            points = [
+                {"ts": point["ts"].replace(tzinfo=datetime.timezone.utc).isoformat(), "value": point["v"]}
+                for bucket in cursor
+                for point in sorted(bucket["points"], key=lambda p: p["ts"])
+                if start <= point["ts"].replace(tzinfo=datetime.timezone.utc) < end
+            ]
+            return resolution, points
+
+        collection, seconds = ROLLUPS[resolution]
+        cursor = self.db[collection].find(
+            {
+                "device_id": device_id,
+                "metric": metric,
+                "start": {"$gte": _floor(start, seconds), "$lt": end}
+            },
+            {"_id": 0, "device_id": 0, "metric": 0}
+        ).sort("start", 1)
+        points = [
+            {
+                "ts": doc["start"].replace(tzinfo=datetime.timezone.utc).isoformat(),
+                "min": doc["min"],
+                "max": doc["max"],
+                "avg": doc["sum"] / doc["count"],
+                "count": doc["count"]
+            }
+            for doc in cursor
+        ]
+        return resolution, points
@@ -1,11 +1,39 @@
 import paho.mqtt.client as mqtt
 import threading
-from mqtt.handler import on_connect, on_message
+from functools import partial
+from mqtt.handler import on_connect, on_message, handle_message
+from mqtt.dispatcher import MessageDispatcher
+from mqtt.ingest import ImageIngestor
 
-mqtt_client = mqtt.Client()
+try:
+    # paho-mqtt 2.x exige indicar la versión de los callbacks
+    mqtt_client = mqtt.Client(callback_api_version=mqtt.CallbackAPIVersion.VERSION1)
+except AttributeError:
+    mqtt_client = mqtt.Client()
 
 def init_mqtt(app):
+    # Requiere init_mongo: el ingestor usa el MongoClient y GridFS ya creados
+    app.config['MQTT_INGESTOR'] = ImageIngestor(app, mqtt_client.publish)
+    metrics = app.config.get('METRICS')
+
+    # El loop de paho solo encola; los mensajes se procesan en el pool
+    dispatcher = MessageDispatcher(
+        partial(handle_message, app),
+        workers=app.config['MQTT_WORKERS'],
+        max_queue=app.config['MQTT_QUEUE_SIZE'],
+        overflow=app.config['MQTT_OVERFLOW_POLICY'],
+        priorities=app.config['MQTT_TOPIC_PRIORITIES'],
+        observer=metrics.observe_mqtt if metrics else None
+    )
+    dispatcher.start()
+    app.config['MQTT_DISPATCHER'] = dispatcher
+
+    if metrics:
+        metrics.track_queue("mqtt_dispatcher", dispatcher.depth)
+        metrics.track_queue("mqtt_image_batch", app.config['MQTT_INGESTOR'].pending)
+
     def start():
+        mqtt_client.user_data_set(app)
         mqtt_client.on_connect = on_connect
         mqtt_client.on_message = on_message
         mqtt_client.connect(app.config['MQTT_BROKER'], app.config['MQTT_PORT'], 60)
@@ -0,0 +1,211 @@
+"""
+Despacho de mensajes MQTT a un pool de hilos.
+El callback de paho solo encola el mensaje, así una escritura lenta en
+MongoDB o una inferencia no bloquea el loop de red. La cola es acotada,
+tiene prioridad por topic (la telemetría no espera detrás de imágenes)
+y una política explícita para cuando se llena.
+"""
+
+from collections import deque
+import threading
+import time
+import paho.mqtt.client as mqtt
+
+# Políticas cuando la cola está llena
+DROP_OLDEST = "drop_oldest"   # Descarta el mensaje más viejo de menor prioridad
+DROP_NEWEST = "drop_newest"   # Descarta el mensaje que llega
+BLOCK = "block"               # Bloquea el loop de paho hasta que haya espacio
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class MessageDispatcher:
+    def __init__(self, handler, workers=4, max_queue=500, overflow=DROP_OLDEST,
+                 priorities=None, default_priority=10, observer=None):
+        """
+        Inicializa el despachador
+
+        Args:
+            handler: Función que procesa un mensaje: handler(msg)
+            workers: Número de hilos de trabajo
+            max_queue: Mensajes máximos en espera
+            overflow: Política cuando la cola está llena (OVERFLOW_POLICIES)
+            priorities: dict filtro de topic -> prioridad (menor número, mayor prioridad)
+            default_priority: Prioridad de los topics sin entrada en priorities
+            observer: Función opcional observer(topic, outcome, wait_time, handle_time)
+                      que recibe cada mensaje procesado ("processed"/"error") o
+                      descartado ("dropped"), p. ej. para métricas
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Política de desborde inválida: {overflow}")
+
+        self.handler = handler
+        self.workers = workers
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.priorities = priorities or {}
+        self.default_priority = default_priority
+        self.observer = observer
+
+        self._queues = {}              # prioridad -> deque de (encolado, msg)
+        self._size = 0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._running = False
+
+        # Métricas
+        self._stats = {
+            "received": 0,
+            "processed": 0,
+            "dropped": 0,
+            "errors": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "handle_time_total": 0.0,
+            "handle_time_max": 0.0
+        }
+        self._topics = {}              # topic -> contadores
+
+    def start(self):
+        """Inicia los hilos de trabajo"""
+        self._running = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"mqtt-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        """Detiene los hilos después de vaciar la cola"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def priority_for(self, topic):
+        """Prioridad de un topic según los filtros configurados (admite + y #)"""
+        for topic_filter, priority in self.priorities.items():
+            if mqtt.topic_matches_sub(topic_filter, topic):
+                return priority
+        return self.default_priority
+
+    def submit(self, msg):
+        """
+        Encola un mensaje; se llama desde el callback de paho
+
+        Args:
+            msg: MQTTMessage recibido
+
+        Returns:
+            bool: True si el mensaje quedó en cola
+        """
+        priority = self.priority_for(msg.topic)
+
+        with self._cond:
+            self._stats["received"] += 1
+            self._topic_stats(msg.topic)["received"] += 1
+
+            if self._size >= self.max_queue:
+                if self.overflow == BLOCK:
+                    while self._size >= self.max_queue and self._running:
+                        self._cond.wait()
+                elif self.overflow == DROP_NEWEST or not self._evict_oldest(priority):
+                    self._drop(msg.topic)
+                    return False
+
+            self._queues.setdefault(priority, deque()).append((time.monotonic(), msg))
+            self._size += 1
+            self._cond.notify()
+            return True
+
+    def depth(self):
+        """Mensajes en espera"""
+        return self._size
+
+    def stats(self):
+        """
+        Métricas de la cola y del procesamiento
+
+        Returns:
+            dict: profundidad, contadores y tiempos (segundos)
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats["depth"] = self._size
+            stats["depth_by_priority"] = {p: len(q) for p, q in sorted(self._queues.items())}
+            stats["max_queue"] = self.max_queue
+            stats["overflow"] = self.overflow
+            stats["topics"] = {topic: dict(counts) for topic, counts in self._topics.items()}
+
+        processed = stats["processed"] or 1
+        stats["wait_time_avg"] = stats["wait_time_total"] / processed
+        stats["handle_time_avg"] = stats["handle_time_total"] / processed
+        return stats
+
+    def _evict_oldest(self, incoming_priority):
+        # Solo se desaloja un mensaje de prioridad igual o menor que el entrante
+        for priority in sorted(self._queues, reverse=True):
+            if priority < incoming_priority:
+                break
+            queue = self._queues[priority]
+            if queue:
+                _, evicted = queue.popleft()
+                self._size -= 1
+                self._drop(evicted.topic)
+                return True
+        return False
+
+    def _drop(self, topic):
+        self._stats["dropped"] += 1
+        self._topic_stats(topic)["dropped"] += 1
+        if self.observer:
+            self.observer(topic, "dropped")
+
+    def _topic_stats(self, topic):
+        counts = self._topics.get(topic)
+        if counts is None:
+            counts = self._topics[topic] = {"received": 0, "processed": 0, "dropped": 0}
+        return counts
+
+    def _next(self):
+        # Debe llamarse con el lock tomado
+        for priority in sorted(self._queues):
+            queue = self._queues[priority]
+            if queue:
+                self._size -= 1
+                return queue.popleft()
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while self._size == 0 and self._running:
+                    self._cond.wait()
+                if self._size == 0:
+                    return
+                enqueued_at, msg = self._next()
+                self._cond.notify_all()
+
+            started = time.monotonic()
+            try:
+                self.handler(msg)
+                failed = False
+            except Exception as e:
+                print(f"[MQTT] Error procesando mensaje de {msg.topic}: {e}")
+                failed = True
+            finished = time.monotonic()
+
+            wait_time = started - enqueued_at
+            handle_time = finished - started
+            with self._cond:
+                stats = self._stats
+                stats["processed"] += 1
+                stats["errors"] += failed
+                stats["wait_time_total"] += wait_time
+                stats["wait_time_max"] = max(stats["wait_time_max"], wait_time)
+                stats["handle_time_total"] += handle_time
+                stats["handle_time_max"] = max(stats["handle_time_max"], handle_time)
+                self._topic_stats(msg.topic)["processed"] += 1
+
+            if self.observer:
+                self.observer(msg.topic, "error" if failed else "processed", wait_time, handle_time)
@@ -1,6 +1,5 @@
-from flask import current_app
-from services.face_recognition import process_face_image
-from utils.mongo import save_image_to_gridfs
+import json
+from services.telemetry import parse_reading
 
 
 def on_connect(client, userdata, flags, rc):
@@ -10,7 +9,26 @@ def on_connect(client, userdata, flags, rc):
 
 
 def on_message(client, userdata, msg):
+    # Se ejecuta en el hilo de red: solo encolar (userdata es la app de Flask)
+    if not userdata.config['MQTT_DISPATCHER'].submit(msg):
+        print(f"[MQTT] Cola llena, mensaje descartado | Topic: {msg.topic}")
+
+
+def handle_message(app, msg):
     print(f"[MQTT] Topic: {msg.topic} | Payload size: {len(msg.payload)} bytes")
     if msg.topic == "camara/foto":
-        image_id = save_image_to_gridfs(current_app, msg.payload)
-        process_face_image(current_app, image_id)
\ No newline at end of file
+        # Se escribe por lotes con los handles de init_mongo
+        app.config['MQTT_INGESTOR'].add(msg.payload, msg.topic)
+    elif msg.topic == "sensor/temperatura":
+        handle_reading(app, msg)
+
+
+def handle_reading(app, msg):
+    # Acepta un número ("24.5") o JSON ({"temp": 24.5, "device_id": "esp32"})
+    try:
+        data = json.loads(msg.payload)
+        reading = parse_reading(data, default_device=msg.topic)
+    except (ValueError, TypeError):
+        # Por este topic también llegan comandos de Home Assistant ({'bombilla':'ON'})
+        return
+    app.config['TELEMETRY_INGESTOR'].add([reading])
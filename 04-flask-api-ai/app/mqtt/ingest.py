@@ -0,0 +1,227 @@
+"""
+Ingesta de imágenes recibidas por MQTT (camara/foto).
+Las imágenes se acumulan y se escriben en GridFS por lotes usando los
+handles que creó init_mongo; por cada imagen se publica en el topic de
+respuesta la confirmación de guardado y el resultado del procesamiento,
+y los resultados del lote se guardan en la colección "resultados".
+
+Cada imagen lleva un trace_id (el del sobre binario de 06-ia_model si
+viene, o uno nuevo) que se guarda en sus metadatos, en su resultado y en
+las respuestas MQTT, junto con la duración de cada etapa.
+"""
+
+import datetime
+import json
+import struct
+import threading
+import time
+import uuid
+from bson.objectid import ObjectId
+from models.image_model import ImageModel
+from services.face_recognition import process_face_image
+
+# Sobre binario de 06-ia_model/utils.py:
+#   "IAF1" | versión (1 byte) | flags (1 byte) | largo metadatos (2 bytes) | metadatos JSON | JPEG
+ENVELOPE_MAGIC = b"IAF1"
+ENVELOPE_HEADER = struct.Struct("!4sBBH")
+
+
+def split_envelope(payload):
+    """
+    Separa los metadatos del JPEG si el payload viene en el sobre binario
+
+    Args:
+        payload: Bytes recibidos por MQTT
+
+    Returns:
+        tuple: (bytes del JPEG, dict de metadatos; vacío para un JPEG crudo)
+    """
+    if payload[:4] != ENVELOPE_MAGIC or len(payload) < ENVELOPE_HEADER.size:
+        return bytes(payload), {}
+    _, _, _, meta_len = ENVELOPE_HEADER.unpack_from(payload)
+    start = ENVELOPE_HEADER.size + meta_len
+    try:
+        metadata = json.loads(bytes(payload[ENVELOPE_HEADER.size:start])) if meta_len else {}
+    except ValueError:
+        metadata = {}
+    return bytes(payload[start:]), metadata
+
+
+class ImageIngestor:
+    def __init__(self, app, publish):
+        """
+        Inicializa el ingestor
+
+        Args:
+            app: Instancia de Flask ya inicializada (MONGO_FS, MONGO_DB)
+            publish: Función publish(topic, payload) del cliente MQTT
+        """
+        self.app = app
+        self.publish = publish
+        self.model = ImageModel(app)
+        self.results = app.config['MONGO_DB'].resultados
+        self.batch_size = app.config['MQTT_IMAGE_BATCH_SIZE']
+        self.max_wait = app.config['MQTT_IMAGE_BATCH_WAIT']
+        self.response_topic = app.config['MQTT_RESPONSE_TOPIC']
+        self.metrics = app.config.get('METRICS')
+
+        self._batch = []
+        self._first_at = None
+        self._lock = threading.Lock()
+        self._running = True
+        self._stats = {"batches": 0, "errors": 0}
+
+        # Escribe los lotes incompletos cuando pasa max_wait
+        self._timer = threading.Thread(target=self._flush_stale, name="mqtt-ingest", daemon=True)
+        self._timer.start()
+
+    def add(self, payload, topic):
+        """
+        Agrega una imagen al lote actual; escribe el lote si se llenó
+
+        Args:
+            payload: Bytes de la imagen (JPEG crudo o sobre binario con metadatos)
+            topic: Topic de origen
+        """
+        received_at = datetime.datetime.now(datetime.timezone.utc)
+        data, envelope = split_envelope(payload)
+        trace_id = str(envelope.get("trace_id") or uuid.uuid4().hex)
+
+        additional_metadata = {"source": "mqtt", "topic": topic, "trace_id": trace_id}
+        if envelope.get("camera_id"):
+            additional_metadata["device_id"] = str(envelope["camera_id"])
+
+        item = {
+            "data": data,
+            "filename": f"{topic.replace('/', '_')}_{received_at:%Y%m%dT%H%M%S%f}.jpg",
+            "content_type": "image/jpeg",
+            "additional_metadata": additional_metadata,
+            "trace_id": trace_id,
+            "received": time.monotonic()
+        }
+
+        with self._lock:
+            if not self._batch:
+                self._first_at = time.monotonic()
+            self._batch.append(item)
+            batch = self._take() if len(self._batch) >= self.batch_size else None
+
+        if batch:
+            self._write(batch)
+
+    def pending(self):
+        """Imágenes esperando a completar un lote"""
+        return len(self._batch)
+
+    def stats(self):
+        """Lotes escritos e imágenes que fallaron al guardar o procesar"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._batch)
+        return stats
+
+    def stop(self):
+        """Escribe lo pendiente y detiene el hilo del temporizador"""
+        self._running = False
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._write(batch)
+
+    def _take(self):
+        # Debe llamarse con el lock tomado
+        batch, self._batch = self._batch, []
+        self._first_at = None
+        return batch
+
+    def _flush_stale(self):
+        while self._running:
+            time.sleep(self.max_wait / 2)
+            with self._lock:
+                stale = self._first_at is not None and \
+                    time.monotonic() - self._first_at >= self.max_wait
+                batch = self._take() if stale else None
+            if not batch:
+                continue
+            try:
+                self._write(batch)
+            except Exception as e:
+                # Si el hilo muere, los lotes incompletos no se vuelven a escribir
+                print(f"[MQTT] Error escribiendo un lote pendiente: {e}")
+                with self._lock:
+                    self._stats["errors"] += len(batch)
+
+    def _write(self, batch):
+        started = time.monotonic()
+        try:
+            ids = self.model.save_images_batch(batch)
+        except Exception as e:
+            print(f"[MQTT] Error guardando lote de {len(batch)} imágenes: {e}")
+            with self._lock:
+                self._stats["errors"] += len(batch)
+            for item in batch:
+                try:
+                    self._respond(item, None, str(e))
+                except Exception as publish_error:
+                    print(f"[MQTT] Error publicando la respuesta de {item['trace_id']}: {publish_error}")
+            return
+        stored = time.monotonic()
+
+        print(f"[MQTT] Lote de {len(ids)} imágenes guardado en GridFS")
+        results = []
+        errors = 0
+        for item, image_id in zip(batch, ids):
+            # Un error en una imagen no detiene el resto del lote (ni el hilo
+            # del temporizador, que también llama a _write)
+            try:
+                if image_id is None:
+                    # ObjectId(None) generaría un id nuevo que no apunta a ningún archivo
+                    errors += 1
+                    self._respond(item, None, "La imagen no se guardó")
+                    continue
+                self._respond(item, image_id)
+                process_started = time.monotonic()
+                result = process_face_image(self.app, image_id, item["data"])
+
+                # Dónde se fue el tiempo de esta imagen (segundos)
+                stages = {
+                    "batch_wait": started - item["received"],
+                    "store": stored - started,
+                    "process": time.monotonic() - process_started
+                }
+                if self.metrics:
+                    for stage, seconds in stages.items():
+                        self.metrics.observe_stage(stage, seconds)
+                latency_ms = {stage: round(seconds * 1000, 1) for stage, seconds in stages.items()}
+                print(f"[TRACE {item['trace_id']}] {latency_ms}")
+
+                result = {**result, "trace_id": item["trace_id"], "latency_ms": latency_ms}
+                results.append({**result, "file_id": ObjectId(image_id)})
+                self.publish(self.response_topic, json.dumps({"status": "processed", **result}))
+            except Exception as e:
+                errors += 1
+                print(f"[MQTT] Error procesando la imagen {image_id} ({item['trace_id']}): {e}")
+
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["errors"] += errors
+
+        if not results:
+            return
+        # Resultados del lote en una sola inserción, enlazados a fs.files por file_id
+        try:
+            self.results.insert_many(results, ordered=False)
+        except Exception as e:
+            print(f"[MQTT] Error guardando {len(results)} resultados: {e}")
+
+    def _respond(self, item, image_id, error=None):
+        response = {
+            "status": "stored" if error is None else "error",
+            "file_id": image_id,
+            "filename": item["filename"],
+            "topic": item["additional_metadata"]["topic"],
+            "trace_id": item["trace_id"]
+        }
+        if error is not None:
+            response["error"] = error
+        self.publish(self.response_topic, json.dumps(response))
@@ -1,7 +1,20 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, current_app
 
 control = Blueprint('control', __name__)
 
 @control.route('/status', methods=['GET'])
 def get_status():
-    return jsonify({"status": "running"})
\ No newline at end of file
+    return jsonify({"status": "running"})
+
+@control.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Métricas en formato Prometheus"""
+    return current_app.config['METRICS'].render()
+
+@control.route('/api/mqtt/stats', methods=['GET'])
+def get_mqtt_stats():
+    """Profundidad de la cola MQTT, descartes y tiempos de espera/proceso"""
+    dispatcher = current_app.config.get('MQTT_DISPATCHER')
+    if dispatcher is None:
+        return jsonify({"error": "MQTT no está inicializado"}), 503
+    return jsonify(dispatcher.stats())
\ No newline at end of file
@@ -9,11 +9,17 @@ def upload():
     controller = ImageController(current_app)
     return controller.upload_image(request)
 
+@images.route('/api/upload/batch', methods=['POST'])
+def upload_batch():
+    """Endpoint para subir varias imágenes en una sola solicitud"""
+    controller = ImageController(current_app)
+    return controller.upload_batch(request)
+
 @images.route('/api/image/<file_id>', methods=['GET'])
 def get_image(file_id):
     """Endpoint para obtener una imagen por su ID"""
     controller = ImageController(current_app)
-    return controller.get_image(file_id)
+    return controller.get_image(file_id, request)
 
 @images.route('/api/images', methods=['GET'])
 def list_images():
@@ -21,6 +27,12 @@ def list_images():
     controller = ImageController(current_app)
     return controller.list_images(request)
 
+@images.route('/api/images/search', methods=['GET'])
+def search_images():
+    """Endpoint para buscar imágenes por sus metadatos"""
+    controller = ImageController(current_app)
+    return controller.search_images(request)
+
 @images.route('/api/image/<file_id>', methods=['DELETE'])
 def delete_image(file_id):
     """Endpoint para eliminar una imagen por su ID"""
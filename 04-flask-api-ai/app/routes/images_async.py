@@ -0,0 +1,41 @@
+from quart import Blueprint, request, current_app
+from controllers.image_controller_async import AsyncImageController
+
+# Mismas rutas que routes/images.py para el modo ASGI (asgi.py)
+images_async = Blueprint('images', __name__)
+
+@images_async.route('/api/upload', methods=['POST'])
+async def upload():
+    """Endpoint para subir una imagen"""
+    controller = AsyncImageController(current_app)
+    return await controller.upload_image(request)
+
+@images_async.route('/api/upload/batch', methods=['POST'])
+async def upload_batch():
+    """Endpoint para subir varias imágenes en una sola solicitud"""
+    controller = AsyncImageController(current_app)
+    return await controller.upload_batch(request)
+
+@images_async.route('/api/image/<file_id>', methods=['GET'])
+async def get_image(file_id):
+    """Endpoint para obtener una imagen por su ID"""
+    controller = AsyncImageController(current_app)
+    return await controller.get_image(file_id, request)
+
+@images_async.route('/api/images', methods=['GET'])
+async def list_images():
+    """Endpoint para listar todas las imágenes"""
+    controller = AsyncImageController(current_app)
+    return await controller.list_images(request)
+
+@images_async.route('/api/images/search', methods=['GET'])
+async def search_images():
+    """Endpoint para buscar imágenes por sus metadatos"""
+    controller = AsyncImageController(current_app)
+    return await controller.search_images(request)
+
+@images_async.route('/api/image/<file_id>', methods=['DELETE'])
+async def delete_image(file_id):
+    """Endpoint para eliminar una imagen por su ID"""
+    controller = AsyncImageController(current_app)
+    return await controller.delete_image(file_id)
@@ -0,0 +1,27 @@
+from flask import Blueprint, request, jsonify, current_app
+from controllers.telemetry_controller import TelemetryController
+
+telemetry = Blueprint('telemetry', __name__)
+
+@telemetry.route('/api/data', methods=['POST'])
+def post_data():
+    """Endpoint de main.py para una lectura ({"temp": 24.5})"""
+    controller = TelemetryController(current_app)
+    return controller.ingest(request)
+
+@telemetry.route('/api/telemetry', methods=['POST'])
+def post_telemetry():
+    """Endpoint para enviar lecturas por lotes"""
+    controller = TelemetryController(current_app)
+    return controller.ingest(request)
+
+@telemetry.route('/api/telemetry/stats', methods=['GET'])
+def telemetry_stats():
+    """Lecturas recibidas, escritas, descartadas y pendientes"""
+    return jsonify(current_app.config['TELEMETRY_INGESTOR'].stats())
+
+@telemetry.route('/api/telemetry/<device_id>', methods=['GET'])
+def get_telemetry(device_id):
+    """Endpoint para consultar la serie de un dispositivo"""
+    controller = TelemetryController(current_app)
+    return controller.query(device_id, request)
@@ -1,6 +1,119 @@
-def decide_actuators(temp):
-    if temp > 30:
+"""
+Control de actuadores (ventilador, bombillo) por temperatura con histéresis.
+
+Los umbrales salen del mismo archivo de reglas que usa 02-Cloud Computing
+(reglas.yaml, formato automations.yaml de Home Assistant), así las dos
+aplicaciones no mantienen copias distintas. Si el archivo no está, se
+usan los umbrales de Config (ACTUATOR_*), que deben coincidir con él.
+"""
+
+import os
+
+FAN_ENTITY = "switch.ventilador"
+LIGHT_ENTITY = "switch.bombillo"
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def parse_thresholds(automations):
+    """
+    Extrae los umbrales de encendido y apagado de una lista de automatizaciones
+
+    Se usan los disparadores numeric_state cuyas acciones encienden o
+    apagan FAN_ENTITY o LIGHT_ENTITY. Si varias reglas hacen lo mismo (p. ej.
+    bombillo_encender también apaga el ventilador) vale la primera que se
+    cruza: el "above" más bajo y el "below" más alto.
+
+    Args:
+        automations: Lista de automatizaciones (formato Home Assistant)
+
+    Returns:
+        dict: fan_on, fan_off, light_on, light_off (solo los encontrados)
+    """
+    keys = {
+        ("above", "turn_on", FAN_ENTITY): "fan_on",
+        ("below", "turn_off", FAN_ENTITY): "fan_off",
+        ("below", "turn_on", LIGHT_ENTITY): "light_on",
+        ("above", "turn_off", LIGHT_ENTITY): "light_off",
+    }
+    thresholds = {}
+    for automation in automations or []:
+        services = []
+        for action in _as_list(automation.get("action")):
+            _, _, name = action.get("service", "").partition(".")
+            target = action.get("target") or action.get("data") or {}
+            for entity in _as_list(target.get("entity_id")):
+                services.append((name, entity))
+
+        for trigger in _as_list(automation.get("trigger")):
+            if trigger.get("platform") != "numeric_state":
+                continue
+            for bound in ("above", "below"):
+                if trigger.get(bound) is None:
+                    continue
+                for name, entity in services:
+                    key = keys.get((bound, name, entity))
+                    if key is None:
+                        continue
+                    value = float(trigger[bound])
+                    first = min if bound == "above" else max
+                    thresholds[key] = first(thresholds.get(key, value), value)
+    return thresholds
+
+
+def load_thresholds(config):
+    """
+    Umbrales de los actuadores: los del archivo de reglas si existe,
+    completados con los de Config
+
+    Args:
+        config: Config de la aplicación (objeto o dict)
+
+    Returns:
+        dict: fan_on, fan_off, light_on, light_off
+    """
+    get = config.get if isinstance(config, dict) else lambda key: getattr(config, key, None)
+    thresholds = {
+        "fan_on": get('ACTUATOR_FAN_ON'),
+        "fan_off": get('ACTUATOR_FAN_OFF'),
+        "light_on": get('ACTUATOR_LIGHT_ON'),
+        "light_off": get('ACTUATOR_LIGHT_OFF'),
+    }
+
+    path = get('ACTUATOR_RULES_FILE')
+    if path and os.path.exists(path):
+        import yaml
+
+        with open(path, encoding="utf-8") as f:
+            thresholds.update(parse_thresholds(yaml.safe_load(f)))
+    return thresholds
+
+
+def decide_actuators(temp, current, thresholds):
+    """
+    Decide el estado de los actuadores según la temperatura, con histéresis:
+    un actuador encendido solo se apaga cuando la temperatura cruza su
+    umbral de apagado, así el relé no oscila cuando la lectura ronda el
+    límite (mismas reglas que reglas.yaml).
+
+    Args:
+        temp: Temperatura leída (°C)
+        current: Decisión anterior ("ventilador_on", "bombillo_on" o "nada")
+        thresholds: Umbrales devueltos por load_thresholds
+
+    Returns:
+        str: "ventilador_on", "bombillo_on" o "nada"
+    """
+    if temp > thresholds["fan_on"]:
         return "ventilador_on"
-    elif temp < 20:
+    elif temp < thresholds["light_on"]:
         return "bombillo_on"
-    return "nada"
\ No newline at end of file
+    if current == "ventilador_on" and not temp < thresholds["fan_off"]:
+        return "ventilador_on"
+    if current == "bombillo_on" and not temp > thresholds["light_off"]:
+        return "bombillo_on"
+    return "nada"
@@ -0,0 +1,188 @@
+"""
+Servicio de derivados de imágenes (miniaturas y recodificaciones).
+Cada derivado se genera una sola vez en un pool de hilos y se guarda
+en un bucket de GridFS aparte ("derivatives"), identificado por el
+ID de la imagen original y los parámetros usados.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import datetime
+from bson.objectid import ObjectId
+from gridfs.errors import FileExists
+from app.utils.image_processing import make_derivative, DERIVATIVE_FORMATS
+
+
+class DerivativeService:
+    def __init__(self, app):
+        """
+        Inicializa el servicio con la aplicación Flask
+
+        Args:
+            app: Instancia de Flask con MongoDB ya inicializado
+        """
+        self.app = app
+        self.fs = app.config['MONGO_FS']
+        self.derivatives_fs = app.config['MONGO_DERIVATIVES_FS']
+        self.files = app.config['MONGO_DB'].derivatives.files
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config['DERIVATIVE_WORKERS'],
+            thread_name_prefix="derivatives"
+        )
+        # Derivados en generación: key -> Future, para no generar dos veces
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def parse_params(self, args):
+        """
+        Lee los parámetros del derivado desde la query string
+
+        Args:
+            args: request.args (w, h, format, q)
+
+        Returns:
+            dict: Parámetros normalizados, o None si no se pidió derivado
+
+        Raises:
+            ValueError: Si algún parámetro es inválido
+        """
+        if not any(name in args for name in ('w', 'h', 'format', 'q')):
+            return None
+
+        max_size = self.app.config['DERIVATIVE_MAX_SIZE']
+        try:
+            width = int(args['w']) if args.get('w') else None
+            height = int(args['h']) if args.get('h') else None
+            quality = int(args.get('q', self.app.config['DERIVATIVE_DEFAULT_QUALITY']))
+        except ValueError:
+            raise ValueError("w, h y q deben ser números enteros")
+
+        for value in (width, height):
+            if value is not None and not 1 <= value <= max_size:
+                raise ValueError(f"w y h deben estar entre 1 y {max_size}")
+        if not 1 <= quality <= 95:
+            raise ValueError("q debe estar entre 1 y 95")
+
+        fmt = args.get('format', 'jpeg').lower().replace('jpg', 'jpeg')
+        if fmt not in DERIVATIVE_FORMATS:
+            raise ValueError(f"format debe ser uno de: {', '.join(DERIVATIVE_FORMATS)}")
+
+        return {"w": width, "h": height, "format": fmt, "q": quality}
+
+    @staticmethod
+    def make_key(file_id, params):
+        """Clave única del derivado para una imagen y unos parámetros"""
+        return f"{file_id}:w{params['w'] or ''}:h{params['h'] or ''}:{params['format']}:q{params['q']}"
+
+    def get(self, file_id, params):
+        """
+        Obtiene un derivado, generándolo si todavía no existe
+
+        Args:
+            file_id: ID de la imagen original
+            params: Parámetros devueltos por parse_params
+
+        Returns:
+            tuple: (info para send_image, bytes del derivado)
+        """
+        if not ObjectId.is_valid(file_id):
+            raise ValueError("ID de archivo inválido")
+
+        key = self.make_key(file_id, params)
+
+        stored = self._load(key)
+        if stored is not None:
+            return stored
+
+        # Si otra petición ya lo está generando se espera el mismo resultado
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self.executor.submit(self._generate, file_id, params, key)
+                self._pending[key] = future
+                future.add_done_callback(lambda _: self._forget(key))
+
+        return future.result(timeout=self.app.config['DERIVATIVE_TIMEOUT'])
+
+    def delete_for(self, file_id):
+        """
+        Elimina todos los derivados de una imagen
+
+        Args:
+            file_id: ID de la imagen original
+        """
+        for doc in self.files.find({"metadata.source_id": ObjectId(file_id)}, {"_id": 1}):
+            self.derivatives_fs.delete(doc["_id"])
+
+    def _forget(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def _load(self, key):
+        grid_out = self.derivatives_fs.find_one({"metadata.key": key})
+        if grid_out is None:
+            return None
+        with grid_out:
+            return self._info(grid_out, key), grid_out.read()
+
+    def _generate(self, file_id, params, key):
+        with self.fs.get(ObjectId(file_id)) as source:
+            original = source.read()
+            filename = source.filename or "image"
+
+        data, mimetype = make_derivative(
+            original,
+            width=params['w'],
+            height=params['h'],
+            fmt=params['format'],
+            quality=params['q']
+        )
+
+        name = filename.rsplit('.', 1)[0]
+        derivative_name = f"{name}_{params['w'] or ''}x{params['h'] or ''}.{params['format']}"
+        derivative_id = ObjectId()
+        try:
+            self.derivatives_fs.put(
+                data,
+                _id=derivative_id,
+                filename=derivative_name,
+                content_type=mimetype,
+                metadata={
+                    "key": key,
+                    "source_id": ObjectId(file_id),
+                    "params": params,
+                    "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat()
+                }
+            )
+        except FileExists:
+            # Otro proceso lo guardó primero (índice único en metadata.key):
+            # descartar los chunks huérfanos
+            self.app.config['MONGO_DB'].derivatives.chunks.delete_many({"files_id": derivative_id})
+            return self._load(key)
+
+        info = {
+            "etag": key,
+            "last_modified": derivative_id.generation_time.replace(microsecond=0),
+            "length": len(data),
+            "mimetype": mimetype,
+            "download_name": derivative_name
+        }
+        return info, data
+
+    @staticmethod
+    def _info(grid_out, key):
+        last_modified = grid_out.upload_date
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=datetime.timezone.utc)
+        return {
+            "etag": key,
+            "last_modified": last_modified.replace(microsecond=0),
+            "length": grid_out.length,
+            "mimetype": grid_out.content_type,
+            "download_name": grid_out.filename
+        }
+
+
+def init_derivatives(app):
+    """Crea el servicio de derivados compartido por todas las peticiones"""
+    app.config['DERIVATIVES'] = DerivativeService(app)
\ No newline at end of file
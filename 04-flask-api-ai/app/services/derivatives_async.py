@@ -0,0 +1,164 @@
+"""
+Derivados de imágenes para el modo ASGI.
+Mismo bucket y mismas claves que DerivativeService: el redimensionado
+(Pillow) corre en un pool de hilos y la lectura y escritura en GridFS
+con el driver asíncrono. Peticiones simultáneas del mismo derivado
+esperan la misma tarea.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import datetime
+from bson.objectid import ObjectId
+from gridfs import AsyncGridIn
+from gridfs.errors import FileExists
+from app.services.derivatives import DerivativeService
+from app.utils.image_processing import make_derivative
+
+
+class AsyncDerivativeService(DerivativeService):
+    # parse_params y make_key se heredan sin cambios
+
+    def __init__(self, app):
+        """
+        Inicializa el servicio con la aplicación Quart
+
+        Args:
+            app: Instancia de Quart con MongoDB asíncrono inicializado
+        """
+        self.app = app
+        self.db = app.config['ASYNC_MONGO_DB']
+        self.fs = app.config['ASYNC_MONGO_FS']
+        self.derivatives_fs = app.config['ASYNC_MONGO_DERIVATIVES_FS']
+        self.files = self.db.derivatives.files
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config['DERIVATIVE_WORKERS'],
+            thread_name_prefix="derivatives"
+        )
+        # Derivados en generación: key -> Task, para no generar dos veces
+        self._pending = {}
+
+    async def get(self, file_id, params):
+        """
+        Obtiene un derivado, generándolo si todavía no existe
+
+        Args:
+            file_id: ID de la imagen original
+            params: Parámetros devueltos por parse_params
+
+        Returns:
+            tuple: (info para send_image_async, bytes del derivado)
+        """
+        if not ObjectId.is_valid(file_id):
+            raise ValueError("ID de archivo inválido")
+
+        key = self.make_key(file_id, params)
+
+        stored = await self._load(key)
+        if stored is not None:
+            return stored
+
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._generate(file_id, params, key))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+
+        # shield: si esta petición se cancela las demás siguen esperando la tarea
+        return await asyncio.wait_for(
+            asyncio.shield(task), timeout=self.app.config['DERIVATIVE_TIMEOUT']
+        )
+
+    async def delete_for(self, file_id):
+        """
+        Elimina todos los derivados de una imagen
+
+        Args:
+            file_id: ID de la imagen original
+        """
+        async for doc in self.files.find({"metadata.source_id": ObjectId(file_id)}, {"_id": 1}):
+            await self.derivatives_fs.delete(doc["_id"])
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    async def _load(self, key):
+        doc = await self.files.find_one({"metadata.key": key})
+        if doc is None:
+            return None
+        grid_out = await self.derivatives_fs.open_download_stream(doc["_id"])
+        try:
+            data = await grid_out.read()
+        finally:
+            await grid_out.close()
+
+        upload_date = doc["uploadDate"]
+        if upload_date.tzinfo is None:
+            upload_date = upload_date.replace(tzinfo=datetime.timezone.utc)
+        info = {
+            "etag": key,
+            "last_modified": upload_date.replace(microsecond=0),
+            "length": doc["length"],
+            "mimetype": doc.get("contentType"),
+            "download_name": doc.get("filename")
+        }
+        return info, data
+
+    async def _generate(self, file_id, params, key):
+        source = await self.fs.open_download_stream(ObjectId(file_id))
+        try:
+            original = await source.read()
+            filename = source.filename or "image"
+        finally:
+            await source.close()
+
+        data, mimetype = await asyncio.get_running_loop().run_in_executor(
+            self.executor,
+            partial(
+                make_derivative,
+                original,
+                width=params['w'],
+                height=params['h'],
+                fmt=params['format'],
+                quality=params['q']
+            )
+        )
+
+        name = filename.rsplit('.', 1)[0]
+        derivative_name = f"{name}_{params['w'] or ''}x{params['h'] or ''}.{params['format']}"
+        derivative_id = ObjectId()
+        grid_in = AsyncGridIn(
+            self.db.derivatives,
+            _id=derivative_id,
+            filename=derivative_name,
+            content_type=mimetype,
+            metadata={
+                "key": key,
+                "source_id": ObjectId(file_id),
+                "params": params,
+                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat()
+            }
+        )
+        try:
+            await grid_in.write(data)
+            await grid_in.close()
+        except FileExists:
+            # Otro proceso lo guardó primero (índice único en metadata.key):
+            # descartar los chunks huérfanos
+            await self.db.derivatives.chunks.delete_many({"files_id": derivative_id})
+            return await self._load(key)
+
+        info = {
+            "etag": key,
+            "last_modified": derivative_id.generation_time.replace(microsecond=0),
+            "length": len(data),
+            "mimetype": mimetype,
+            "download_name": derivative_name
+        }
+        return info, data
+
+
+def init_derivatives_async(app):
+    """Crea el servicio de derivados; requiere init_async_mongo"""
+    app.config['DERIVATIVES'] = AsyncDerivativeService(app)
@@ -1,8 +1,33 @@
+import time
 from app.utils.mongo import get_image_from_gridfs
 
-def process_face_image(app, image_id):
-    image_data = get_image_from_gridfs(app, image_id)
+def process_face_image(app, image_id, image_data=None):
+    """
+    Procesa una imagen guardada y arma el resultado estructurado
+    (mismo esquema que publica 06-ia_model en result/{device_id})
+    
+    Args:
+        app: Instancia de Flask ya inicializada
+        image_id: ID de la imagen en GridFS
+        image_data: Bytes de la imagen si ya están en memoria (opcional)
+    
+    Returns:
+        dict: Resultado de la inferencia
+    """
+    start = time.perf_counter()
+    if image_data is None:
+        image_data = get_image_from_gridfs(app, image_id)
     # Simulamos inferencia
     print("[AI] Procesando imagen desde MongoDB... (simulado)")
     # TODO: añadir modelo de reconocimiento facial
-    # Publicar resultado al topic MQTT (por ejemplo 'autenticacion/respuesta')
\ No newline at end of file
+    return {
+        "v": 1,
+        "file_id": image_id,
+        "ts": round(time.time(), 3),
+        "simulado": True,
+        "autorizado": False,
+        "identidad": None,
+        "rostros": [],
+        "detecciones": [],
+        "latencia_ms": {"total": round((time.perf_counter() - start) * 1000, 1)}
+    }
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""
+Ingesta de telemetría de sensores.
+Las lecturas llegan por MQTT (sensor/temperatura) o por HTTP y se
+acumulan en memoria; se escriben por lotes (un bulk_write por
+colección) cuando se junta TELEMETRY_BATCH_SIZE lecturas o pasa
+TELEMETRY_BATCH_WAIT desde la primera del lote.
+"""
+
+import datetime
+import numbers
+import threading
+import time
+from app.models.telemetry_model import TelemetryModel
+
+# Claves aceptadas para el valor de una lectura en JSON
+VALUE_KEYS = ("value", "temp", "temperatura")
+
+
+def parse_reading(data, default_device="default", default_metric="temperatura"):
+    """
+    Normaliza una lectura recibida por HTTP o MQTT
+
+    Args:
+        data: Número, o dict con value/temp/temperatura y opcionalmente
+              device_id, metric y ts (ISO 8601 o segundos epoch)
+        default_device: Dispositivo si la lectura no lo indica
+        default_metric: Métrica si la lectura no la indica
+
+    Returns:
+        dict: device_id, metric, value y ts (datetime UTC)
+
+    Raises:
+        ValueError: Si la lectura no tiene un valor numérico o la fecha es inválida
+    """
+    if isinstance(data, dict):
+        value = next((data[key] for key in VALUE_KEYS if key in data), None)
+        device_id = str(data.get("device_id") or default_device)
+        metric = str(data.get("metric") or default_metric)
+        ts = data.get("ts")
+    else:
+        value, device_id, metric, ts = data, default_device, default_metric, None
+
+    if isinstance(value, bool) or not isinstance(value, numbers.Number):
+        raise ValueError("La lectura no tiene un valor numérico")
+
+    if ts is None:
+        ts = datetime.datetime.now(datetime.timezone.utc)
+    elif isinstance(ts, numbers.Number):
+        ts = datetime.datetime.fromtimestamp(ts, tz=datetime.timezone.utc)
+    else:
+        ts = datetime.datetime.fromisoformat(str(ts))
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=datetime.timezone.utc)
+        ts = ts.astimezone(datetime.timezone.utc)
+
+    return {"device_id": device_id, "metric": metric, "value": float(value), "ts": ts}
+
+
+class TelemetryIngestor:
+    def __init__(self, app):
+        """
+        Inicializa el ingestor
+
+        Args:
+            app: Instancia de Flask con MongoDB ya inicializado
+        """
+        self.model = TelemetryModel(app)
+        self.batch_size = app.config['TELEMETRY_BATCH_SIZE']
+        self.max_wait = app.config['TELEMETRY_BATCH_WAIT']
+        self.max_pending = app.config['TELEMETRY_MAX_PENDING']
+
+        self._batch = []
+        self._first_at = None
+        self._lock = threading.Lock()
+        self._running = True
+        self._stats = {"received": 0, "written": 0, "dropped": 0, "batches": 0, "errors": 0}
+
+        # Escribe los lotes incompletos cuando pasa max_wait
+        self._timer = threading.Thread(target=self._flush_stale, name="telemetry-ingest", daemon=True)
+        self._timer.start()
+
+    def add(self, readings):
+        """
+        Agrega lecturas al lote actual; escribe el lote si se llenó
+
+        Args:
+            readings: Lista de lecturas normalizadas con parse_reading
+
+        Returns:
+            int: Lecturas aceptadas (las que exceden TELEMETRY_MAX_PENDING se descartan)
+        """
+        with self._lock:
+            self._stats["received"] += len(readings)
+            room = max(self.max_pending - len(self._batch), 0)
+            accepted = readings[:room]
+            self._stats["dropped"] += len(readings) - len(accepted)
+            if accepted and not self._batch:
+                self._first_at = time.monotonic()
+            self._batch.extend(accepted)
+            batch = self._take() if len(self._batch) >= self.batch_size else None
+
+        if batch:
+            self._write(batch)
+        return len(accepted)
+
+    def stop(self):
+        """Escribe lo pendiente y detiene el hilo del temporizador"""
+        self._running = False
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._write(batch)
+
+    def stats(self):
+        """Contadores de lecturas recibidas, escritas y descartadas"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._batch)
+        return stats
+
+    def _take(self):
+        # Debe llamarse con el lock tomado
+        batch, self._batch = self._batch, []
+        self._first_at = None
+        return batch
+
+    def _flush_stale(self):
+        while self._running:
+            time.sleep(self.max_wait / 2)
+            with self._lock:
+                stale = self._first_at is not None and \
+                    time.monotonic() - self._first_at >= self.max_wait
+                batch = self._take() if stale else None
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        try:
+            written = self.model.insert_readings(batch)
+        except Exception as e:
+            print(f"[TELEMETRY] Error guardando lote de {len(batch)} lecturas: {e}")
+            with self._lock:
+                self._stats["errors"] += 1
+            return
+        with self._lock:
+            self._stats["written"] += written
+            self._stats["batches"] += 1
+
+
+def init_telemetry(app):
+    """Crea el ingestor de telemetría compartido por HTTP y MQTT"""
+    ingestor = TelemetryIngestor(app)
+    app.config['TELEMETRY_INGESTOR'] = ingestor
+    if app.config.get('METRICS'):
+        app.config['METRICS'].track_queue("telemetry", lambda: ingestor.stats()["pending"])
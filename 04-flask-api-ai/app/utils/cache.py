@@ -0,0 +1,113 @@
+"""
+Caché LRU en memoria para imágenes y sus metadatos.
+Las imágenes no cambian una vez guardadas, así que las lecturas
+repetidas se atienden sin consultar MongoDB. El tamaño total se
+limita por bytes y cada entrada expira después de un TTL.
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+
+class ImageCache:
+    # Costo aproximado de guardar solo los metadatos de una entrada
+    ENTRY_OVERHEAD = 512
+
+    def __init__(self, max_bytes, max_item_bytes, ttl):
+        """
+        Inicializa la caché
+
+        Args:
+            max_bytes: Presupuesto total en bytes
+            max_item_bytes: Tamaño máximo de una imagen para guardar su contenido
+            ttl: Segundos que vive cada entrada
+        """
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expira, info, data, tamaño)
+        self._by_file = {}              # file_id -> claves que dependen de él
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Obtiene una entrada y la marca como usada recientemente
+
+        Args:
+            key: Clave de la entrada (file_id o tupla que empieza por file_id)
+
+        Returns:
+            tuple: (info, data) o None; data es None si solo se guardaron metadatos
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, info, data, _ = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return info, data
+
+    def put(self, key, info, data=None):
+        """
+        Guarda una entrada, descartando las menos usadas si hace falta espacio
+
+        Args:
+            key: Clave de la entrada
+            info: Metadatos de la imagen (dict)
+            data: Contenido en bytes; se omite si supera max_item_bytes
+        """
+        if data is not None and len(data) > self.max_item_bytes:
+            data = None
+        size = self.ENTRY_OVERHEAD + (len(data) if data is not None else 0)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, info, data, size)
+            self._by_file.setdefault(self._file_id(key), set()).add(key)
+            self._size += size
+
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate(self, file_id):
+        """
+        Elimina todas las entradas asociadas a una imagen
+
+        Args:
+            file_id: ID de la imagen
+        """
+        with self._lock:
+            for key in list(self._by_file.get(file_id, ())):
+                self._remove(key)
+
+    def _remove(self, key):
+        _, _, _, size = self._entries.pop(key)
+        self._size -= size
+        file_id = self._file_id(key)
+        keys = self._by_file.get(file_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_file[file_id]
+
+    @staticmethod
+    def _file_id(key):
+        return key[0] if isinstance(key, tuple) else key
+
+
+def init_cache(app):
+    """Crea la caché de imágenes según la configuración de la aplicación"""
+    app.config['IMAGE_CACHE'] = ImageCache(
+        max_bytes=app.config['IMAGE_CACHE_MAX_BYTES'],
+        max_item_bytes=app.config['IMAGE_CACHE_MAX_ITEM_BYTES'],
+        ttl=app.config['IMAGE_CACHE_TTL']
+    )
@@ -1,4 +1,85 @@
+import os
+
+
 class Config:
     MONGO_URI = "mongodb://localhost:27017/invernadero"
+    MONGODB_DB = "invernadero"
+    # Pool de conexiones compartido por la API y el hilo MQTT
+    MONGO_MAX_POOL_SIZE = 50
+    MONGO_MIN_POOL_SIZE = 5
+    MONGO_WRITE_CONCERN = 1                 # w: 1 confirma en el primario
     MQTT_BROKER = "localhost"
-    MQTT_PORT = 1883
\ No newline at end of file
+    MQTT_PORT = 1883
+
+    # Procesamiento de mensajes MQTT
+    MQTT_WORKERS = 4                        # Hilos que procesan mensajes
+    MQTT_QUEUE_SIZE = 500                   # Mensajes máximos en espera
+    MQTT_OVERFLOW_POLICY = "drop_oldest"    # "drop_oldest", "drop_newest" o "block"
+    # Filtro de topic -> prioridad (menor número se atiende primero)
+    MQTT_TOPIC_PRIORITIES = {
+        "sensor/#": 0,
+        "camara/#": 10
+    }
+    # Ingesta de imágenes de camara/foto por lotes
+    MQTT_IMAGE_BATCH_SIZE = 8               # Imágenes por inserción
+    MQTT_IMAGE_BATCH_WAIT = 0.2             # Segundos máximos antes de escribir un lote incompleto
+    MQTT_RESPONSE_TOPIC = "autenticacion/respuesta"
+
+    # Subida de imágenes
+    MAX_UPLOAD_SIZE = 16 * 1024 * 1024      # Tamaño máximo por imagen (bytes)
+    UPLOAD_CHUNK_SIZE = 255 * 1024          # Igual al chunk por defecto de GridFS
+    MULTIPART_OVERHEAD = 64 * 1024          # Margen para cabeceras del multipart
+
+    # Subida por lotes (/api/upload/batch)
+    BATCH_MAX_FILES = 32
+    BATCH_MAX_TOTAL_SIZE = 128 * 1024 * 1024
+    BATCH_UPLOAD_WORKERS = 4                # Inserciones concurrentes en GridFS
+
+    # Flask rechaza con 413 antes de leer el cuerpo
+    MAX_CONTENT_LENGTH = BATCH_MAX_TOTAL_SIZE + MULTIPART_OVERHEAD
+
+    # Deduplicación de imágenes: None, "sha256" o "phash" (casi-duplicados)
+    IMAGE_DEDUP_MODE = None
+    PHASH_MAX_DISTANCE = 5                  # Bits distintos para considerar casi-duplicado
+    PHASH_WINDOW = 50                       # Imágenes recientes comparadas por dispositivo
+
+    # Caché en memoria de imágenes (LRU por bytes)
+    IMAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    IMAGE_CACHE_MAX_ITEM_BYTES = 2 * 1024 * 1024   # Imágenes mayores solo cachean metadatos
+    IMAGE_CACHE_TTL = 300                          # Segundos
+
+    # Derivados de imágenes (?w=320&format=webp&q=70)
+    DERIVATIVE_WORKERS = 2
+    DERIVATIVE_MAX_SIZE = 2048              # Lado máximo en píxeles
+    DERIVATIVE_DEFAULT_QUALITY = 80
+    DERIVATIVE_TIMEOUT = 30                 # Segundos de espera por la generación
+
+    # Telemetría de sensores (/api/data, /api/telemetry, MQTT sensor/temperatura)
+    TELEMETRY_BUCKET_SECONDS = 3600         # Un documento de puntos crudos por dispositivo y hora
+    TELEMETRY_BATCH_SIZE = 200              # Lecturas por escritura
+    TELEMETRY_BATCH_WAIT = 1.0              # Segundos máximos antes de escribir un lote incompleto
+    TELEMETRY_MAX_PENDING = 10000           # Lecturas en memoria antes de descartar
+    TELEMETRY_MAX_HTTP_BATCH = 5000         # Lecturas por solicitud HTTP
+    TELEMETRY_MINUTE_RANGE = 2 * 24 * 3600  # Rangos mayores se consultan por hora
+    TELEMETRY_MAX_RAW_RANGE = 24 * 3600     # Rango máximo con resolution=raw
+
+    # Modo ASGI (asgi.py): cliente asíncrono de MongoDB para las rutas de imágenes.
+    # Una descarga solo ocupa una conexión mientras pide el siguiente chunk,
+    # así que unos cientos de conexiones atienden miles de transferencias.
+    ASYNC_MONGO_MAX_POOL_SIZE = 200         # Operaciones simultáneas en MongoDB
+    ASYNC_MONGO_MIN_POOL_SIZE = 10
+    ASYNC_MONGO_MAX_CONNECTING = 10         # Conexiones nuevas abriéndose a la vez
+    ASYNC_MONGO_WAIT_QUEUE_TIMEOUT_MS = 10000   # Espera máxima por una conexión libre
+    # Timeouts de Quart: las transferencias lentas no se cortan a los 60 s
+    BODY_TIMEOUT = 600                      # Segundos para recibir el cuerpo de una subida
+    RESPONSE_TIMEOUT = None                 # Sin límite para enviar una descarga
+
+    # Actuadores por temperatura (services/actuator_control.py). Los umbrales
+    # se leen del archivo de reglas de 02-Cloud Computing; estos valores solo
+    # se usan si el archivo no existe y deben coincidir con él
+    ACTUATOR_RULES_FILE = os.environ.get("ACTUATOR_RULES_FILE", os.path.join(
+        os.path.dirname(__file__), "..", "..", "..", "02-Cloud Computing (aws+IoT+IA)", "reglas.yaml"))
+    ACTUATOR_FAN_ON = 30.0                  # Enciende el ventilador por encima
+    ACTUATOR_FAN_OFF = 28.0                 # Lo apaga por debajo
+    ACTUATOR_LIGHT_ON = 20.0                # Enciende el bombillo por debajo
+    ACTUATOR_LIGHT_OFF = 22.0               # Lo apaga por encima
@@ -1,2 +1,93 @@
+from PIL import Image, ImageOps
+import io
+
+# Formatos de salida permitidos para los derivados: formato -> (Pillow, MIME)
+DERIVATIVE_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+    "png": ("PNG", "image/png")
+}
+
+
 def preprocess_image(image_bytes):
-    return image_bytes
\ No newline at end of file
+    return image_bytes
+
+
+def perceptual_hash(image_bytes, hash_size=8):
+    """
+    Calcula el hash perceptual (dHash) de una imagen.
+    Imágenes que solo difieren en ruido producen hashes cercanos.
+
+    Args:
+        image_bytes: Bytes de la imagen
+        hash_size: Lado de la cuadrícula (hash de hash_size² bits)
+
+    Returns:
+        str: Hash en hexadecimal
+    """
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        # draft permite que el decodificador JPEG reduzca la imagen al leerla
+        image.draft('L', (hash_size * 8, hash_size * 8))
+        small = image.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+        pixels = list(small.getdata())
+
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+def hamming_distance(hash_a, hash_b):
+    """
+    Número de bits distintos entre dos hashes hexadecimales
+
+    Args:
+        hash_a: Primer hash
+        hash_b: Segundo hash
+
+    Returns:
+        int: Distancia de Hamming
+    """
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+def make_derivative(image_bytes, width=None, height=None, fmt="jpeg", quality=80):
+    """
+    Genera una versión redimensionada y/o recodificada de una imagen,
+    conservando la proporción
+
+    Args:
+        image_bytes: Bytes de la imagen original
+        width: Ancho máximo en píxeles (opcional)
+        height: Alto máximo en píxeles (opcional)
+        fmt: Formato de salida ("jpeg", "webp" o "png")
+        quality: Calidad de compresión (1-95, no aplica a PNG)
+
+    Returns:
+        tuple: (bytes del derivado, tipo MIME)
+    """
+    pil_format, mimetype = DERIVATIVE_FORMATS[fmt]
+
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        if width or height:
+            size = (width or image.width, height or image.height)
+            # El decodificador JPEG puede reducir la imagen al leerla
+            image.draft("RGB", size)
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail(size, Image.LANCZOS)
+        else:
+            image = ImageOps.exif_transpose(image)
+
+        if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        output = io.BytesIO()
+        options = {"optimize": True}
+        if pil_format != "PNG":
+            options["quality"] = quality
+        image.save(output, pil_format, **options)
+
+    return output.getvalue(), mimetype
\ No newline at end of file
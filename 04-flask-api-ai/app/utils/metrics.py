@@ -0,0 +1,106 @@
+"""
+Métricas en formato Prometheus para la API, GridFS y la ingesta MQTT.
+Cada aplicación tiene su propio registro (app.config['METRICS']); el
+endpoint /metrics lo expone para que Prometheus lo consulte.
+"""
+
+from flask import Response, g, request
+import time
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+)
+
+# Segundos: desde 1 ms (caché) hasta varios segundos (subidas grandes)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Metrics:
+    def __init__(self):
+        """Crea las métricas en un registro propio"""
+        self.registry = CollectorRegistry()
+        r = self.registry
+
+        self.http_requests = Counter(
+            "http_requests_total", "Peticiones HTTP atendidas",
+            ["method", "route", "status"], registry=r)
+        self.http_latency = Histogram(
+            "http_request_duration_seconds", "Duración de las peticiones HTTP por ruta",
+            ["method", "route"], buckets=LATENCY_BUCKETS, registry=r)
+
+        self.gridfs_bytes = Counter(
+            "gridfs_bytes_total", "Bytes leídos y escritos en GridFS",
+            ["operation"], registry=r)
+        self.gridfs_duration = Histogram(
+            "gridfs_operation_duration_seconds", "Duración de lecturas y escrituras en GridFS",
+            ["operation"], buckets=LATENCY_BUCKETS, registry=r)
+
+        self.mqtt_messages = Counter(
+            "mqtt_messages_total", "Mensajes MQTT por topic y resultado (processed, error, dropped)",
+            ["topic", "outcome"], registry=r)
+        self.mqtt_wait = Histogram(
+            "mqtt_queue_wait_seconds", "Espera en la cola del despachador MQTT",
+            ["topic"], buckets=LATENCY_BUCKETS, registry=r)
+        self.mqtt_handle = Histogram(
+            "mqtt_handle_duration_seconds", "Tiempo del handler por mensaje MQTT",
+            ["topic"], buckets=LATENCY_BUCKETS, registry=r)
+
+        self.stage_duration = Histogram(
+            "stage_duration_seconds", "Duración de cada etapa de la ingesta de imágenes",
+            ["stage"], buckets=LATENCY_BUCKETS, registry=r)
+        self.queue_depth = Gauge(
+            "queue_depth", "Elementos esperando en cada cola interna",
+            ["queue"], registry=r)
+
+    def observe_request(self, method, route, status, seconds):
+        self.http_requests.labels(method, route, status).inc()
+        self.http_latency.labels(method, route).observe(seconds)
+
+    def observe_gridfs(self, operation, nbytes, seconds):
+        self.gridfs_bytes.labels(operation).inc(nbytes)
+        self.gridfs_duration.labels(operation).observe(seconds)
+
+    def observe_mqtt(self, topic, outcome, wait_time=None, handle_time=None):
+        """Se pasa como observer al MessageDispatcher"""
+        self.mqtt_messages.labels(topic, outcome).inc()
+        if wait_time is not None:
+            self.mqtt_wait.labels(topic).observe(wait_time)
+        if handle_time is not None:
+            self.mqtt_handle.labels(topic).observe(handle_time)
+
+    def observe_stage(self, stage, seconds):
+        self.stage_duration.labels(stage).observe(seconds)
+
+    def track_queue(self, name, depth):
+        """
+        Expone la profundidad de una cola; depth() se evalúa en cada consulta
+
+        Args:
+            name: Nombre de la cola (etiqueta queue)
+            depth: Función sin argumentos que devuelve la profundidad
+        """
+        self.queue_depth.labels(name).set_function(depth)
+
+    def render(self):
+        return Response(generate_latest(self.registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    """Crea las métricas y mide cada petición por ruta (la regla, no la URL)"""
+    metrics = Metrics()
+    app.config['METRICS'] = metrics
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            # /api/image/<file_id> en vez de un valor por imagen
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            metrics.observe_request(request.method, route, response.status_code,
+                                    time.perf_counter() - started)
+        return response
+
+    return metrics
@@ -5,6 +5,7 @@ establecer la conexión a MongoDB y configurar GridFS.
 """
 
 from pymongo import MongoClient
+from bson.objectid import ObjectId
 import gridfs
 import sys
 
@@ -28,7 +29,12 @@ def get_database_connection():
     try:
         # Establecer conexión a MongoDB
         print(f"Conectando a la base de datos: {database_url}, DB: {database_name}")
-        client = MongoClient(database_url)
+        client = MongoClient(
+            database_url,
+            maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+            minPoolSize=Config.MONGO_MIN_POOL_SIZE,
+            w=Config.MONGO_WRITE_CONCERN
+        )
         
         # Verificar la conexión
         client.admin.command('ping')
@@ -46,12 +52,84 @@ def get_database_connection():
         print(f"Error al conectar a la base de datos: {str(e)}")
         sys.exit(1)
 
+# Índices que usa la aplicación: (colección, claves, opciones de create_index)
+INDEXES = [
+    # Hash de contenido único (solo para archivos que lo tienen)
+    ("fs.files", "metadata.sha256",
+     {"unique": True, "partialFilterExpression": {"metadata.sha256": {"$exists": True}}}),
+    # Listado paginado por cursor (más recientes primero)
+    ("fs.files", [("uploadDate", -1), ("_id", -1)], {}),
+    # Búsqueda por metadatos (metadata.tags es multikey)
+    ("fs.files", [("metadata.device_id", 1), ("uploadDate", -1)], {}),
+    ("fs.files", [("metadata.tags", 1), ("uploadDate", -1)], {}),
+    ("fs.files", [("metadata.uploader", 1), ("uploadDate", -1)], {}),
+    ("fs.files", [("contentType", 1), ("uploadDate", -1)], {}),
+    # Derivados (miniaturas): uno por imagen y parámetros
+    ("derivatives.files", "metadata.key", {"unique": True}),
+    ("derivatives.files", "metadata.source_id", {}),
+    # Resultados de inferencia por imagen
+    ("resultados", "file_id", {}),
+] + [
+    # Telemetría: un documento por dispositivo, métrica y ventana
+    (collection, [("device_id", 1), ("metric", 1), ("start", 1)], {"unique": True})
+    for collection in ("telemetry", "telemetry_1m", "telemetry_1h")
+]
+
+def ensure_indexes(db):
+    """
+    Crea los índices de INDEXES.
+    create_index no hace nada si el índice ya existe.
+    
+    Args:
+        db: Base de datos MongoDB
+    """
+    for collection, keys, options in INDEXES:
+        db[collection].create_index(keys, **options)
+
 def init_mongo(app):
     """Inicializa la conexión a MongoDB y configura GridFS"""
     client, db, fs = get_database_connection()
+    ensure_indexes(db)
     app.config['MONGO_CLIENT'] = client
     app.config['MONGO_DB'] = db
     app.config['MONGO_FS'] = fs
+    app.config['MONGO_DERIVATIVES_FS'] = gridfs.GridFS(db, collection='derivatives')
+
+def save_image_to_gridfs(app, image_data, filename="camara.jpg", content_type="image/jpeg", metadata=None):
+    """
+    Guarda una imagen en GridFS con los handles creados por init_mongo.
+    
+    Args:
+        app: Instancia de Flask ya inicializada
+        image_data: Bytes de la imagen
+        filename: Nombre del archivo
+        content_type: Tipo MIME del archivo
+        metadata: Metadatos adicionales (opcional)
+    
+    Returns:
+        str: ID del archivo guardado
+    """
+    file_id = app.config['MONGO_FS'].put(
+        image_data,
+        filename=filename,
+        content_type=content_type,
+        metadata=metadata or {}
+    )
+    return str(file_id)
+
+def get_image_from_gridfs(app, image_id):
+    """
+    Lee una imagen completa de GridFS.
+    
+    Args:
+        app: Instancia de Flask ya inicializada
+        image_id: ID del archivo (str u ObjectId)
+    
+    Returns:
+        bytes: Contenido de la imagen
+    """
+    with app.config['MONGO_FS'].get(ObjectId(image_id)) as file:
+        return file.read()
 
 def close_connection(client):
     """
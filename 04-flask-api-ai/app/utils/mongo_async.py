@@ -0,0 +1,61 @@
+"""
+Conexión asíncrona a MongoDB para el modo ASGI (asgi.py).
+Usa el driver asíncrono de PyMongo (AsyncMongoClient y
+AsyncGridFSBucket): las operaciones no bloquean el event loop ni
+ocupan un hilo, así un solo proceso atiende miles de transferencias.
+El tamaño del pool se configura en Config (ASYNC_MONGO_*).
+"""
+
+from pymongo import AsyncMongoClient
+from gridfs import AsyncGridFSBucket
+from app.utils.mongo import INDEXES
+
+
+async def get_async_database_connection(config):
+    """
+    Crea el cliente asíncrono y verifica la conexión
+
+    Args:
+        config: Configuración de la aplicación (app.config)
+
+    Returns:
+        tuple: (client, db, fs) con fs como AsyncGridFSBucket del bucket "fs"
+    """
+    print(f"Conectando a la base de datos (async): {config['MONGO_URI']}, DB: {config['MONGODB_DB']}")
+    client = AsyncMongoClient(
+        config['MONGO_URI'],
+        maxPoolSize=config['ASYNC_MONGO_MAX_POOL_SIZE'],
+        minPoolSize=config['ASYNC_MONGO_MIN_POOL_SIZE'],
+        maxConnecting=config['ASYNC_MONGO_MAX_CONNECTING'],
+        waitQueueTimeoutMS=config['ASYNC_MONGO_WAIT_QUEUE_TIMEOUT_MS'],
+        w=config['MONGO_WRITE_CONCERN']
+    )
+    await client.admin.command('ping')
+    print("Conexión asíncrona a MongoDB establecida correctamente")
+
+    db = client[config['MONGODB_DB']]
+    return client, db, AsyncGridFSBucket(db)
+
+
+async def ensure_indexes_async(db):
+    """Crea los mismos índices que ensure_indexes con el cliente asíncrono"""
+    for collection, keys, options in INDEXES:
+        await db[collection].create_index(keys, **options)
+
+
+async def init_async_mongo(app):
+    """Inicializa MongoDB asíncrono; se llama dentro del event loop (before_serving)"""
+    client, db, fs = await get_async_database_connection(app.config)
+    await ensure_indexes_async(db)
+    app.config['ASYNC_MONGO_CLIENT'] = client
+    app.config['ASYNC_MONGO_DB'] = db
+    app.config['ASYNC_MONGO_FS'] = fs
+    app.config['ASYNC_MONGO_DERIVATIVES_FS'] = AsyncGridFSBucket(db, bucket_name='derivatives')
+
+
+async def close_async_mongo(app):
+    """Cierra el cliente asíncrono al detener el servidor"""
+    client = app.config.pop('ASYNC_MONGO_CLIENT', None)
+    if client:
+        await client.close()
+        print("Conexión asíncrona a MongoDB cerrada correctamente")
@@ -0,0 +1,73 @@
+"""
+Lectura incremental de cuerpos multipart/form-data en Quart.
+`await request.files` junta el cuerpo completo antes de devolver los
+archivos; aquí las partes se entregan a medida que llegan, así cada
+subida se copia a GridFS por bloques sin acumularla en memoria.
+"""
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.sansio.multipart import MultipartDecoder, Field, File, Data, Epilogue, NeedData
+
+
+async def iter_multipart(request, max_field_size):
+    """
+    Recorre el cuerpo multipart de la petición
+
+    Los campos de texto se entregan completos; los archivos como un
+    evento "file", varios "data" y un "file_end".
+
+    Args:
+        request: Objeto request de Quart
+        max_field_size: Tamaño máximo de un campo de texto en bytes
+
+    Yields:
+        tuple: ("field", nombre, valor str), ("file", nombre, filename, content_type),
+               ("data", bytes) o ("file_end",)
+
+    Raises:
+        ValueError: Si el cuerpo no es multipart o está incompleto
+        RequestEntityTooLarge: Si un campo de texto supera max_field_size
+    """
+    boundary = request.mimetype_params.get('boundary')
+    if request.mimetype != 'multipart/form-data' or not boundary:
+        raise ValueError("Se esperaba un cuerpo multipart/form-data")
+
+    # El límite del decoder aplica a todo su buffer (también a los archivos),
+    # por eso el tamaño de los campos se controla aquí
+    decoder = MultipartDecoder(boundary.encode('latin-1'))
+    body = request.body.__aiter__()
+    finished = False
+    part = None
+    value = bytearray()
+
+    while True:
+        event = decoder.next_event()
+
+        if isinstance(event, NeedData):
+            if finished:
+                raise ValueError("El cuerpo multipart está incompleto")
+            try:
+                chunk = await body.__anext__()
+            except StopAsyncIteration:
+                chunk, finished = None, True
+            decoder.receive_data(chunk)
+        elif isinstance(event, File):
+            part = event
+            yield ("file", event.name, event.filename, event.headers.get('content-type'))
+        elif isinstance(event, Field):
+            part = event
+            value.clear()
+        elif isinstance(event, Data):
+            if isinstance(part, File):
+                if event.data:
+                    yield ("data", event.data)
+                if not event.more_data:
+                    yield ("file_end",)
+            else:
+                value.extend(event.data)
+                if len(value) > max_field_size:
+                    raise RequestEntityTooLarge(f"El campo '{part.name}' es demasiado grande")
+                if not event.more_data:
+                    yield ("field", part.name, value.decode('utf-8', 'replace'))
+        elif isinstance(event, Epilogue):
+            return
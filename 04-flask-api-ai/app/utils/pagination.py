@@ -0,0 +1,65 @@
+"""
+Paginación por cursor (keyset) para consultas ordenadas.
+El cursor es un token opaco con el valor del campo de orden y el _id
+del último documento devuelto, así cada página usa el índice en lugar
+de recorrer y descartar los documentos con skip().
+"""
+
+import base64
+from bson import json_util
+
+
+def encode_cursor(value, last_id):
+    """
+    Codifica la posición del último documento como token opaco
+
+    Args:
+        value: Valor del campo de orden en el último documento
+        last_id: _id del último documento
+
+    Returns:
+        str: Token seguro para URL
+    """
+    raw = json_util.dumps([value, last_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Decodifica un token generado por encode_cursor
+
+    Args:
+        token: Token recibido del cliente
+
+    Returns:
+        tuple: (valor del campo de orden, _id)
+
+    Raises:
+        ValueError: Si el token no es válido
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        value, last_id = json_util.loads(base64.urlsafe_b64decode(padded))
+        return value, last_id
+    except Exception:
+        raise ValueError("Cursor de paginación inválido")
+
+
+def keyset_filter(field, direction, cursor):
+    """
+    Construye el filtro que continúa después de la posición del cursor
+
+    Args:
+        field: Campo de orden
+        direction: 1 ascendente, -1 descendente
+        cursor: Tupla (valor, _id) devuelta por decode_cursor
+
+    Returns:
+        dict: Filtro de MongoDB
+    """
+    value, last_id = cursor
+    op = "$lt" if direction < 0 else "$gt"
+    return {"$or": [
+        {field: {op: value}},
+        {field: value, "_id": {op: last_id}}
+    ]}
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""
+Utilidades para enviar archivos de GridFS por bloques.
+Evita cargar la imagen completa en memoria: cada respuesta
+mantiene como máximo un chunk de GridFS a la vez. Las respuestas
+incluyen ETag y Last-Modified para peticiones condicionales.
+"""
+
+from flask import Response
+import datetime
+import time
+from werkzeug.datastructures import ContentRange
+
+
+def iter_gridout(grid_out, start=0, stop=None, on_read=None):
+    """
+    Genera el contenido de un archivo de GridFS chunk por chunk
+
+    Args:
+        grid_out: Archivo abierto de GridFS (GridOut)
+        start: Posición inicial en bytes
+        stop: Posición final (exclusiva); por defecto el tamaño del archivo
+        on_read: Función opcional on_read(bytes, segundos) que recibe el total
+                 enviado y el tiempo pasado leyendo de GridFS
+
+    Yields:
+        bytes: Bloques del archivo de tamaño máximo chunk_size
+    """
+    if stop is None:
+        stop = grid_out.length
+
+    sent = 0
+    reading = 0.0
+    try:
+        grid_out.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            # readchunk lee solo hasta el final del chunk actual
+            started = time.perf_counter()
+            chunk = grid_out.readchunk()
+            reading += time.perf_counter() - started
+            if not chunk:
+                break
+            if len(chunk) > remaining:
+                chunk = chunk[:remaining]
+            remaining -= len(chunk)
+            sent += len(chunk)
+            yield chunk
+    finally:
+        grid_out.close()
+        if on_read:
+            on_read(sent, reading)
+
+
+def image_info(grid_out, metadata):
+    """
+    Reúne los datos necesarios para responder una imagen sin volver a
+    consultar la base de datos
+
+    Args:
+        grid_out: Archivo abierto de GridFS (GridOut)
+        metadata: Metadatos de la imagen
+
+    Returns:
+        dict: etag, last_modified, length, mimetype y download_name
+    """
+    last_modified = grid_out.upload_date
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=datetime.timezone.utc)
+
+    return {
+        # Las imágenes son inmutables: el hash del contenido o el _id sirven como ETag fuerte
+        "etag": metadata.get("sha256") or str(grid_out._id),
+        "last_modified": last_modified.replace(microsecond=0),
+        "length": grid_out.length,
+        "mimetype": metadata.get("content_type") or "image/jpeg",
+        "download_name": metadata.get("filename") or "image.jpg"
+    }
+
+
+def is_not_modified(request, info):
+    """
+    Evalúa If-None-Match / If-Modified-Since contra la imagen
+
+    Args:
+        request: Objeto request (Flask o Quart)
+        info: Datos devueltos por image_info
+
+    Returns:
+        bool: True si el cliente ya tiene la versión actual
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains(info["etag"])
+    if request.if_modified_since:
+        return info["last_modified"] <= request.if_modified_since
+    return False
+
+
+class RangeNotSatisfiable(ValueError):
+    """El rango pedido queda fuera del archivo (416)"""
+
+
+def select_range(request, info):
+    """
+    Elige el rango de bytes a enviar según Range e If-Range
+
+    Solo se atiende un único rango en bytes; en otro caso se envía el
+    archivo completo. Con If-Range el rango solo aplica si el cliente
+    tiene la versión actual.
+
+    Args:
+        request: Objeto request (Flask o Quart)
+        info: Datos devueltos por image_info
+
+    Returns:
+        tuple: (inicio, fin) del rango, o None para enviar el archivo completo
+
+    Raises:
+        RangeNotSatisfiable: Si el rango no cabe en el archivo
+    """
+    use_range = request.range is not None and len(request.range.ranges) == 1
+    if use_range and request.if_range.etag is not None:
+        use_range = request.if_range.etag == info["etag"]
+    elif use_range and request.if_range.date is not None:
+        use_range = info["last_modified"] <= request.if_range.date
+
+    if not use_range:
+        return None
+
+    byte_range = request.range.range_for_length(info["length"])
+    if byte_range is None:
+        raise RangeNotSatisfiable("Rango fuera del archivo")
+    return byte_range
+
+
+def send_image(request, info, data=None, grid_out=None, on_read=None):
+    """
+    Construye la respuesta HTTP de una imagen, desde memoria (data) o
+    transmitiéndola desde GridFS (grid_out), con soporte para peticiones
+    condicionales (304) y Range (206 Partial Content)
+
+    Args:
+        request: Objeto request de Flask
+        info: Datos devueltos por image_info
+        data: Contenido completo en bytes (opcional)
+        grid_out: Archivo abierto de GridFS, si no se pasa data
+        on_read: Se pasa a iter_gridout para medir la lectura (opcional)
+
+    Returns:
+        Response: Respuesta de la imagen
+    """
+    length = info["length"]
+
+    if is_not_modified(request, info):
+        if grid_out is not None:
+            grid_out.close()
+        response = Response(status=304)
+        set_cache_headers(response, info)
+        return response
+
+    try:
+        byte_range = select_range(request, info)
+    except RangeNotSatisfiable:
+        if grid_out is not None:
+            grid_out.close()
+        response = Response(status=416)
+        response.content_range = ContentRange('bytes', None, None, length)
+        return response
+
+    start, stop = byte_range or (0, length)
+
+    if data is not None:
+        body = data[start:stop] if byte_range else data
+    else:
+        body = iter_gridout(grid_out, start, stop, on_read)
+
+    response = Response(
+        body,
+        status=206 if byte_range else 200,
+        mimetype=info["mimetype"],
+        direct_passthrough=True
+    )
+    response.content_length = stop - start
+    response.accept_ranges = 'bytes'
+    if byte_range:
+        response.content_range = ContentRange('bytes', start, stop, length)
+    response.headers.set('Content-Disposition', 'inline', filename=info["download_name"])
+    set_cache_headers(response, info)
+
+    return response
+
+
+def set_cache_headers(response, info):
+    response.set_etag(info["etag"])
+    response.last_modified = info["last_modified"]
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
@@ -0,0 +1,106 @@
+"""
+Versión asíncrona de utils.streaming para el modo ASGI (Quart).
+Las descargas se envían con un generador asíncrono que pide a GridFS
+un chunk a la vez; mientras el cliente recibe, el event loop atiende
+otras peticiones. Las reglas de 304, Range e If-Range son las mismas
+que en utils.streaming.
+"""
+
+from quart import Response
+import time
+from werkzeug.datastructures import ContentRange
+from app.utils.streaming import (
+    is_not_modified, select_range, set_cache_headers, RangeNotSatisfiable
+)
+
+
+async def aiter_gridout(grid_out, start=0, stop=None, on_read=None):
+    """
+    Genera el contenido de un archivo de GridFS chunk por chunk
+
+    Args:
+        grid_out: Archivo abierto de GridFS (AsyncGridOut)
+        start: Posición inicial en bytes
+        stop: Posición final (exclusiva); por defecto el tamaño del archivo
+        on_read: Función opcional on_read(bytes, segundos) que recibe el total
+                 enviado y el tiempo pasado leyendo de GridFS
+
+    Yields:
+        bytes: Bloques del archivo de tamaño máximo chunk_size
+    """
+    if stop is None:
+        stop = grid_out.length
+
+    sent = 0
+    reading = 0.0
+    try:
+        await grid_out.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            # readchunk lee solo hasta el final del chunk actual
+            started = time.perf_counter()
+            chunk = await grid_out.readchunk()
+            reading += time.perf_counter() - started
+            if not chunk:
+                break
+            if len(chunk) > remaining:
+                chunk = chunk[:remaining]
+            remaining -= len(chunk)
+            sent += len(chunk)
+            yield chunk
+    finally:
+        # También se ejecuta si el cliente cierra la conexión a mitad
+        await grid_out.close()
+        if on_read:
+            on_read(sent, reading)
+
+
+async def send_image_async(request, info, data=None, grid_out=None, on_read=None):
+    """
+    Construye la respuesta de una imagen desde memoria (data) o
+    transmitiéndola desde GridFS (grid_out)
+
+    Args:
+        request: Objeto request de Quart
+        info: Datos devueltos por image_info
+        data: Contenido completo en bytes (opcional)
+        grid_out: Archivo abierto de GridFS (AsyncGridOut), si no se pasa data
+        on_read: Se pasa a aiter_gridout para medir la lectura (opcional)
+
+    Returns:
+        Response: Respuesta de la imagen (200, 206, 304 o 416)
+    """
+    length = info["length"]
+
+    if is_not_modified(request, info):
+        if grid_out is not None:
+            await grid_out.close()
+        response = Response(None, status=304)
+        set_cache_headers(response, info)
+        return response
+
+    try:
+        byte_range = select_range(request, info)
+    except RangeNotSatisfiable:
+        if grid_out is not None:
+            await grid_out.close()
+        response = Response(None, status=416)
+        response.content_range = ContentRange('bytes', None, None, length)
+        return response
+
+    start, stop = byte_range or (0, length)
+
+    if data is not None:
+        body = data[start:stop] if byte_range else data
+    else:
+        body = aiter_gridout(grid_out, start, stop, on_read)
+
+    response = Response(body, status=206 if byte_range else 200, mimetype=info["mimetype"])
+    response.content_length = stop - start
+    response.accept_ranges = 'bytes'
+    if byte_range:
+        response.content_range = ContentRange('bytes', start, stop, length)
+    response.headers.set('Content-Disposition', 'inline', filename=info["download_name"])
+    set_cache_headers(response, info)
+
+    return response
@@ -0,0 +1,49 @@
+"""
+Fixtures de la API sobre mongomock (sin servidor MongoDB).
+El código importa tanto desde `app.` como desde la carpeta app/
+(como lo hace run.py), así que las dos rutas van en sys.path.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "app")]
+
+import gridfs
+import mongomock
+import mongomock.gridfs
+import pytest
+from flask import Flask
+
+from utils.cache import init_cache
+from utils.config import Config
+from utils.mongo import ensure_indexes
+
+mongomock.gridfs.enable_gridfs_integration()
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().invernadero
+
+
+@pytest.fixture
+def app(db):
+    from routes.images import images
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['TESTING'] = True
+    ensure_indexes(db)
+    app.config['MONGO_DB'] = db
+    app.config['MONGO_FS'] = gridfs.GridFS(db)
+    app.config['MONGO_DERIVATIVES_FS'] = gridfs.GridFS(db, collection='derivatives')
+    init_cache(app)
+    app.register_blueprint(images)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
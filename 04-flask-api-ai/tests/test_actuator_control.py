@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from app.services.actuator_control import decide_actuators, load_thresholds
+from app.utils.config import Config
+
+CONFIG_ONLY = {
+    "ACTUATOR_FAN_ON": Config.ACTUATOR_FAN_ON,
+    "ACTUATOR_FAN_OFF": Config.ACTUATOR_FAN_OFF,
+    "ACTUATOR_LIGHT_ON": Config.ACTUATOR_LIGHT_ON,
+    "ACTUATOR_LIGHT_OFF": Config.ACTUATOR_LIGHT_OFF,
+}
+
+
+@pytest.fixture
+def thresholds():
+    return load_thresholds(Config)
+
+
+def _recorrer(thresholds, temps, current="nada"):
+    decisiones = []
+    for temp in temps:
+        current = decide_actuators(temp, current, thresholds)
+        decisiones.append(current)
+    return decisiones
+
+
+@pytest.mark.skipif(not os.path.exists(Config.ACTUATOR_RULES_FILE), reason="sin reglas.yaml de 02")
+def test_config_coincide_con_reglas_yaml():
+    pytest.importorskip("yaml")
+    assert load_thresholds(Config) == load_thresholds(CONFIG_ONLY)
+
+
+def test_umbrales_de_config_sin_archivo(tmp_path):
+    thresholds = load_thresholds({**CONFIG_ONLY, "ACTUATOR_RULES_FILE": str(tmp_path / "no.yaml")})
+    assert thresholds == {"fan_on": 30, "fan_off": 28, "light_on": 20, "light_off": 22}
+
+
+def test_umbrales_desde_el_archivo_de_reglas(tmp_path):
+    pytest.importorskip("yaml")
+    reglas = tmp_path / "reglas.yaml"
+    reglas.write_text(
+        "- trigger: {platform: numeric_state, entity_id: sensor.temperatura, above: 35}\n"
+        "  action: [{service: switch.turn_on, target: {entity_id: switch.ventilador}}]\n"
+        "- trigger: {platform: numeric_state, entity_id: sensor.temperatura, below: 31}\n"
+        "  action: [{service: switch.turn_off, target: {entity_id: switch.ventilador}}]\n",
+        encoding="utf-8")
+
+    thresholds = load_thresholds({**CONFIG_ONLY, "ACTUATOR_RULES_FILE": str(reglas)})
+    assert thresholds == {"fan_on": 35, "fan_off": 31, "light_on": 20, "light_off": 22}
+
+
+def test_ventilador_se_mantiene_dentro_del_margen(thresholds):
+    assert _recorrer(thresholds, [25, 31, 29, 30, 28.5, 28, 27.9, 27]) == [
+        "nada", "ventilador_on", "ventilador_on", "ventilador_on", "ventilador_on",
+        "ventilador_on", "nada", "nada"
+    ]
+
+
+def test_bombillo_se_mantiene_dentro_del_margen(thresholds):
+    assert _recorrer(thresholds, [19, 21, 20, 22, 22.1, 25]) == [
+        "bombillo_on", "bombillo_on", "bombillo_on", "bombillo_on", "nada", "nada"
+    ]
+
+
+def test_sin_estado_previo_no_hay_histeresis(thresholds):
+    assert decide_actuators(29, "nada", thresholds) == "nada"
+    assert decide_actuators(21, "nada", thresholds) == "nada"
+
+
+@pytest.mark.parametrize("temp, current, esperado", [
+    (35, "bombillo_on", "ventilador_on"),
+    (15, "ventilador_on", "bombillo_on"),
+])
+def test_umbral_contrario_cambia_de_actuador(thresholds, temp, current, esperado):
+    assert decide_actuators(temp, current, thresholds) == esperado
@@ -0,0 +1,155 @@
+"""
+Modo ASGI sin MongoDB: el driver asíncrono se reemplaza por dobles
+mínimos con la misma interfaz (AsyncGridIn y colecciones).
+"""
+
+import asyncio
+
+import pytest
+from gridfs.errors import FileExists
+
+pytest.importorskip("quart")
+
+from app.models import image_model_async
+from app.models.image_model_async import AsyncUpload
+
+
+class FakeGridIn:
+    def __init__(self, fail_close=None):
+        self._id = "nuevo"
+        self.fail_close = fail_close
+        self.aborted = False
+
+    async def write(self, data):
+        pass
+
+    async def set(self, name, value):
+        pass
+
+    async def close(self):
+        if self.fail_close:
+            raise self.fail_close
+
+    async def abort(self):
+        self.aborted = True
+
+
+class FakeChunks:
+    def __init__(self):
+        self.deleted = []
+
+    async def delete_many(self, query):
+        self.deleted.append(query["files_id"])
+
+
+class FakeModel:
+    def __init__(self, existing=None):
+        self.dedup_mode = "sha256"
+        self.metrics = None
+        self.existing = existing
+        self.lookups = 0
+        self.db = type("DB", (), {})()
+        self.db.fs = type("FS", (), {"chunks": FakeChunks()})()
+
+    async def _find_duplicate(self, digest):
+        # La primera búsqueda no ve la subida concurrente
+        self.lookups += 1
+        return self.existing if self.lookups > 1 else None
+
+
+@pytest.fixture
+def make_upload(monkeypatch):
+    def make(model, grid_in, max_size=None):
+        monkeypatch.setattr(image_model_async, "AsyncGridIn", lambda *args, **kwargs: grid_in)
+        return AsyncUpload(model, "a.jpg", "image/jpeg", max_size)
+    return make
+
+
+def test_concurrent_duplicate_returns_existing_and_drops_chunks(make_upload):
+    model = FakeModel(existing="existente")
+    upload = make_upload(model, FakeGridIn(fail_close=FileExists("duplicado")))
+
+    async def run():
+        await upload.write(b"contenido")
+        return await upload.finish()
+
+    assert asyncio.run(run()) == "existente"
+    assert model.db.fs.chunks.deleted == ["nuevo"]
+
+
+def test_failed_close_can_still_be_aborted(make_upload):
+    grid_in = FakeGridIn(fail_close=RuntimeError("red"))
+    upload = make_upload(FakeModel(), grid_in)
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await upload.finish()
+        await upload.abort()
+
+    asyncio.run(run())
+    assert grid_in.aborted
+
+
+@pytest.fixture
+def batch_app(make_upload, monkeypatch):
+    from quart import Quart, request
+    from app.controllers import image_controller_async
+    from app.utils.config import Config
+
+    model = FakeModel()
+    model.dedup_mode = None
+    grid_ins = []
+
+    class Model:
+        def __init__(self, app):
+            pass
+
+        def begin_upload(self, filename, content_type, max_size=None):
+            grid_ins.append(FakeGridIn())
+            return make_upload(model, grid_ins[-1], max_size)
+
+    monkeypatch.setattr(image_controller_async, "AsyncImageModel", Model)
+    app = Quart(__name__)
+    app.config.from_object(Config)
+    app.grid_ins = grid_ins
+
+    @app.post('/batch')
+    async def batch():
+        return await image_controller_async.AsyncImageController(app).upload_batch(request)
+
+    return app
+
+
+def _post_batch(app, files, metadata=None):
+    body = b"".join(
+        b'--B\r\nContent-Disposition: form-data; name="images"; filename="%s"\r\n\r\n%s\r\n' % (name, data)
+        for name, data in files
+    )
+    if metadata is not None:
+        body += b'--B\r\nContent-Disposition: form-data; name="metadata"\r\n\r\n%s\r\n' % metadata
+    body += b"--B--\r\n"
+
+    async def run():
+        response = await app.test_client().post(
+            '/batch', data=body, headers={"Content-Type": "multipart/form-data; boundary=B"})
+        return response.status_code, await response.get_json()
+
+    return asyncio.run(run())
+
+
+def test_batch_with_nothing_stored_is_error(batch_app):
+    batch_app.config['MAX_UPLOAD_SIZE'] = 2
+    code, result = _post_batch(batch_app, ((b"a.jpg", b"uno"), (b"b.jpg", b"dos")))
+
+    assert code == 400
+    assert result["status"] == "error" and result["stored"] == 0
+
+
+def test_batch_rejects_metadata_entries_that_are_not_objects(batch_app):
+    code, result = _post_batch(batch_app, ((b"a.jpg", b"uno"), (b"b.jpg", b"dos")), metadata=b"[1, 2]")
+
+    assert code == 400
+    assert "error" in result
+    # Los chunks ya escritos se descartan
+    assert len(batch_app.grid_ins) == 2
+    assert all(grid_in.aborted for grid_in in batch_app.grid_ins)
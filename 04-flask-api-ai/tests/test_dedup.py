@@ -0,0 +1,76 @@
+import io
+
+import pytest
+
+from app.models.image_model import ImageModel
+
+
+@pytest.fixture
+def model(app):
+    app.config['IMAGE_DEDUP_MODE'] = "sha256"
+    with app.app_context():
+        yield ImageModel(app)
+
+
+def _save(model, data, name="a.jpg"):
+    return model.save_image_stream(io.BytesIO(data), filename=name, content_type="image/jpeg")
+
+
+def test_duplicate_returns_existing_id(model, db):
+    first = _save(model, b"mismo contenido")
+    second = _save(model, b"mismo contenido", name="b.jpg")
+
+    assert second == first
+    assert db.fs.files.count_documents({}) == 1
+    assert db.fs.files.find_one()["metadata"]["duplicates"] == 1
+
+
+def test_concurrent_duplicate_race_leaves_no_orphan_chunks(model, db, monkeypatch):
+    first = _save(model, b"mismo contenido")
+
+    # La otra subida todavía no era visible cuando se buscó el hash
+    real_find = model._find_duplicate
+    calls = []
+
+    def miss_first(digest, *args, **kwargs):
+        calls.append(digest)
+        return None if len(calls) == 1 else real_find(digest, *args, **kwargs)
+
+    monkeypatch.setattr(model, "_find_duplicate", miss_first)
+
+    assert _save(model, b"mismo contenido", name="b.jpg") == first
+    assert db.fs.files.count_documents({}) == 1
+    assert db.fs.chunks.count_documents({}) == 1
+
+
+def test_batch_duplicates_in_same_batch(model, db):
+    ids = model.save_images_batch([
+        {"data": b"igual", "filename": "a.jpg", "content_type": "image/jpeg"},
+        {"data": b"igual", "filename": "b.jpg", "content_type": "image/jpeg"},
+        {"data": b"otra", "filename": "c.jpg", "content_type": "image/jpeg"},
+    ])
+
+    assert ids[0] == ids[1] != ids[2]
+    assert db.fs.files.count_documents({}) == 2
+    file_ids = {doc["_id"] for doc in db.fs.files.find()}
+    assert {chunk["files_id"] for chunk in db.fs.chunks.find()} == file_ids
+
+
+def test_batch_write_error_cleans_every_failed_file(model, db, monkeypatch):
+    from pymongo.errors import BulkWriteError
+
+    def failing_insert(docs, ordered=True):
+        raise BulkWriteError({"writeErrors": [
+            {"index": 0, "code": 121, "errmsg": "validación"},
+            {"index": 1, "code": 121, "errmsg": "validación"},
+        ]})
+
+    monkeypatch.setattr(db.fs.files, "insert_many", failing_insert)
+
+    with pytest.raises(BulkWriteError):
+        model.save_images_batch([
+            {"data": b"uno", "filename": "a.jpg", "content_type": "image/jpeg"},
+            {"data": b"dos", "filename": "b.jpg", "content_type": "image/jpeg"},
+        ])
+
+    assert db.fs.chunks.count_documents({}) == 0
@@ -0,0 +1,50 @@
+import io
+
+import pytest
+from bson.objectid import ObjectId
+from PIL import Image
+
+from app.services.derivatives import DerivativeService
+
+
+def _jpeg(width=64, height=48):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def service(app):
+    service = DerivativeService(app)
+    yield service
+    service.executor.shutdown()
+
+
+def test_derivative_is_generated_once(service, app, db):
+    file_id = str(app.config['MONGO_FS'].put(_jpeg(), filename="foto.jpg"))
+    params = service.parse_params({"w": "16", "format": "webp"})
+
+    info, data = service.get(file_id, params)
+    again, same = service.get(file_id, params)
+
+    assert info["mimetype"] == "image/webp"
+    assert same == data
+    assert db.derivatives.files.count_documents({}) == 1
+
+
+def test_concurrent_derivative_race_reuses_stored_copy(service, app, db):
+    file_id = str(app.config['MONGO_FS'].put(_jpeg(), filename="foto.jpg"))
+    params = service.parse_params({"w": "16"})
+    key = service.make_key(file_id, params)
+
+    # Otro proceso guardó el mismo derivado mientras este lo generaba
+    app.config['MONGO_DERIVATIVES_FS'].put(
+        b"ya guardado", filename="otro.jpeg", content_type="image/jpeg",
+        metadata={"key": key, "source_id": ObjectId(file_id)}
+    )
+
+    info, data = service._generate(file_id, params, key)
+
+    assert data == b"ya guardado"
+    assert db.derivatives.files.count_documents({}) == 1
+    assert db.derivatives.chunks.count_documents({}) == 1
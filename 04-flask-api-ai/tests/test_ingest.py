@@ -0,0 +1,86 @@
+import json
+import time
+
+import pytest
+
+from mqtt import ingest
+from mqtt.ingest import ImageIngestor
+
+
+@pytest.fixture
+def ingestor(app, monkeypatch):
+    app.config['MQTT_IMAGE_BATCH_SIZE'] = 3
+    published = []
+    monkeypatch.setattr(ingest, "process_face_image",
+                        lambda app, image_id, data: {"image_id": image_id, "faces": []})
+    ingestor = ImageIngestor(app, lambda topic, payload: published.append(json.loads(payload)))
+    ingestor.published = published
+    yield ingestor
+    ingestor.stop()
+
+
+def _processed(ingestor):
+    return [m for m in ingestor.published if m["status"] == "processed"]
+
+
+def test_processing_error_does_not_stop_the_batch(ingestor, db, monkeypatch):
+    def process(app, image_id, data):
+        if data == b"mala":
+            raise RuntimeError("modelo caído")
+        return {"image_id": image_id}
+
+    monkeypatch.setattr(ingest, "process_face_image", process)
+    for data in (b"buena1", b"mala", b"buena2"):
+        ingestor.add(data, "camara/foto")
+
+    assert len(_processed(ingestor)) == 2
+    assert db.resultados.count_documents({}) == 2
+    assert ingestor.stats()["errors"] == 1
+
+
+def test_unsaved_image_is_not_linked_to_a_random_id(ingestor, db, monkeypatch):
+    save = ingestor.model.save_images_batch
+
+    def save_with_gap(batch):
+        ids = save(batch)
+        ids[0] = None
+        return ids
+
+    monkeypatch.setattr(ingestor.model, "save_images_batch", save_with_gap)
+    for data in (b"a", b"b", b"c"):
+        ingestor.add(data, "camara/foto")
+
+    stored = {str(doc["_id"]) for doc in db.fs.files.find()}
+    results = list(db.resultados.find())
+    assert len(results) == 2
+    assert all(str(r["file_id"]) in stored for r in results)
+    assert [m["status"] for m in ingestor.published].count("error") == 1
+    assert ingestor.stats()["errors"] == 1
+
+
+def test_stale_flush_survives_a_failed_batch(ingestor, monkeypatch):
+    write = ingestor._write
+    calls = []
+
+    def flaky_write(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise RuntimeError("fallo inesperado")
+        write(batch)
+
+    monkeypatch.setattr(ingestor, "_write", flaky_write)
+    ingestor.add(b"a", "camara/foto")
+    assert _wait(lambda: len(calls) == 1)
+    ingestor.add(b"b", "camara/foto")
+    assert _wait(lambda: len(_processed(ingestor)) == 1)
+    assert ingestor._timer.is_alive()
+    assert ingestor.stats()["errors"] == 1
+
+
+def _wait(condition, timeout=3):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
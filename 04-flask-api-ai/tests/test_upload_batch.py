@@ -0,0 +1,61 @@
+import io
+import json
+
+
+def _files(*items):
+    return [(io.BytesIO(data), name) for name, data in items]
+
+
+def test_batch_stores_every_image(client, db):
+    response = client.post('/api/upload/batch', data={
+        'images': _files(("a.jpg", b"uno"), ("b.jpg", b"dos")),
+        'metadata': json.dumps([{"device_id": "cam1"}, {"device_id": "cam2"}])
+    })
+
+    body = response.get_json()
+    assert response.status_code == 201
+    assert body["status"] == "success" and body["stored"] == 2
+    devices = sorted(doc["metadata"]["device_id"] for doc in db.fs.files.find())
+    assert devices == ["cam1", "cam2"]
+
+
+def test_batch_partial_failure_is_207(client, app):
+    app.config['MAX_UPLOAD_SIZE'] = 4
+    response = client.post('/api/upload/batch', data={
+        'images': _files(("a.jpg", b"uno"), ("grande.jpg", b"demasiado"))
+    })
+
+    body = response.get_json()
+    assert response.status_code == 207
+    assert body["status"] == "partial"
+    assert [r["status"] for r in body["results"]] == ["success", "error"]
+
+
+def test_batch_nothing_stored_is_error(client, app):
+    app.config['MAX_UPLOAD_SIZE'] = 2
+    response = client.post('/api/upload/batch', data={
+        'images': _files(("a.jpg", b"uno"), ("b.jpg", b"dos"))
+    })
+
+    body = response.get_json()
+    assert response.status_code == 400
+    assert body["status"] == "error" and body["stored"] == 0
+
+
+def test_batch_rejects_mismatched_metadata(client):
+    response = client.post('/api/upload/batch', data={
+        'images': _files(("a.jpg", b"uno")),
+        'metadata': json.dumps([{}, {}])
+    })
+
+    assert response.status_code == 400
+
+
+def test_batch_rejects_metadata_entries_that_are_not_objects(client, db):
+    response = client.post('/api/upload/batch', data={
+        'images': _files(("a.jpg", b"uno"), ("b.jpg", b"dos")),
+        'metadata': json.dumps([1, 2])
+    })
+
+    assert response.status_code == 400
+    assert db.fs.files.count_documents({}) == 0
@@ -1,9 +1,14 @@
 from flask import Flask, request, jsonify, send_file
 from pymongo import MongoClient
 from bson.objectid import ObjectId
+from bson import json_util
+import base64
 import gridfs
 import io
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
 from keys import MONGO_URI
 
 #para tener logs de lo que se hace
@@ -16,6 +21,11 @@ logging.basicConfig(
 
 app = Flask(__name__)
 
+# Límites de subida: Flask responde 413 si el Content-Length ya lo supera
+MAX_UPLOAD_SIZE = 16 * 1024 * 1024   # bytes por imagen
+UPLOAD_CHUNK_SIZE = 255 * 1024       # igual al chunk por defecto de GridFS
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_SIZE + 64 * 1024
+
 
 # Conexión a la base de datos
 client = MongoClient(MONGO_URI)
@@ -28,10 +38,42 @@ try:
     db = client["ia_images"]  # Nombre de la base de datos que usarás
     db.list_collection_names()  # Esto lanza una consulta real
     print("✅ Conexión exitosa a MongoDB  (base de datos 'ia_images')")
+
+    # Índices para /search (create_index no hace nada si ya existen)
+    collection.create_index([("metadata.device_id", 1), ("upload_date", -1)])
+    collection.create_index([("metadata.tags", 1), ("upload_date", -1)])
+    collection.create_index([("metadata.uploader", 1), ("upload_date", -1)])
+    collection.create_index([("content_type", 1), ("upload_date", -1)])
+    collection.create_index([("upload_date", -1)])
 except Exception as e:
     print("❌ Error al conectar con MongoDB :", e)
     
 
+class ArchivoMuyGrande(Exception):
+    pass
+
+
+def guardar_en_gridfs(stream, filename):
+    """Copia el stream a GridFS por bloques y aborta si supera MAX_UPLOAD_SIZE"""
+    grid_in = fs.new_file(filename=filename)
+    escritos = 0
+    try:
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            escritos += len(chunk)
+            if escritos > MAX_UPLOAD_SIZE:
+                raise ArchivoMuyGrande()
+            grid_in.write(chunk)
+    except BaseException:
+        # Borra los chunks que alcanzaron a escribirse
+        grid_in.abort()
+        raise
+    grid_in.close()
+    return grid_in._id
+
+
 #SUbir imagne a bd ia_images 
 @app.route('/upload', methods=['POST'])
 def upload():
@@ -42,17 +84,24 @@ def upload():
     filename = file.filename
     uploader = request.form.get('uploader', 'Desconocido')
     tags = request.form.get('tags', '').split(',')
+    device_id = request.form.get('device_id')
 
-    # Guardar imagen binaria
-    image_id = fs.put(file, filename=filename)
+    # Guardar imagen binaria por bloques
+    try:
+        image_id = guardar_en_gridfs(file.stream, filename)
+    except ArchivoMuyGrande:
+        logging.warning(f"Subida rechazada por tamaño: {filename} por {uploader}")
+        return jsonify({"error": "Archivo demasiado grande"}), 413
 
     # Guardar metadata
     data = {
         "filename": filename,
+        "content_type": file.content_type,
         "upload_date": datetime.utcnow().isoformat(),
         "metadata": {
             "uploader": uploader,
             "tags": tags,
+            "device_id": device_id,
             "project": "Advanced Store"
         },
         "image_id": image_id
@@ -64,23 +113,207 @@ def upload():
     
 
 
+#caché LRU en memoria: las imágenes no cambian una vez subidas
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_MAX_ITEM = 2 * 1024 * 1024
+CACHE_TTL = 300  # segundos
+
+
+class CacheImagenes:
+    def __init__(self, max_bytes, max_item, ttl):
+        self.max_bytes = max_bytes
+        self.max_item = max_item
+        self.ttl = ttl
+        self.entradas = OrderedDict()  # doc_id -> (expira, info, datos)
+        self.usado = 0
+        self.lock = threading.Lock()
+
+    def get(self, doc_id):
+        with self.lock:
+            entrada = self.entradas.get(doc_id)
+            if entrada is None:
+                return None
+            if entrada[0] < time.monotonic():
+                self._quitar(doc_id)
+                return None
+            self.entradas.move_to_end(doc_id)
+            return entrada[1], entrada[2]
+
+    def put(self, doc_id, info, datos):
+        if len(datos) > self.max_item:
+            return
+        with self.lock:
+            if doc_id in self.entradas:
+                self._quitar(doc_id)
+            self.entradas[doc_id] = (time.monotonic() + self.ttl, info, datos)
+            self.usado += len(datos)
+            while self.usado > self.max_bytes:
+                self._quitar(next(iter(self.entradas)))
+
+    def invalidar(self, doc_id):
+        with self.lock:
+            if doc_id in self.entradas:
+                self._quitar(doc_id)
+
+    def _quitar(self, doc_id):
+        _, _, datos = self.entradas.pop(doc_id)
+        self.usado -= len(datos)
+
+
+cache = CacheImagenes(CACHE_MAX_BYTES, CACHE_MAX_ITEM, CACHE_TTL)
+
+
+def respuesta_imagen(info, datos):
+    # El doc_id identifica un contenido que nunca cambia: sirve como ETag fuerte
+    if request.if_none_match:
+        no_modificado = request.if_none_match.contains(info["etag"])
+    else:
+        no_modificado = bool(request.if_modified_since) and \
+            info["last_modified"] <= request.if_modified_since
+
+    if no_modificado:
+        resp = app.response_class(status=304)
+    else:
+        resp = send_file(io.BytesIO(datos), mimetype=info["mimetype"],
+                         download_name=info["filename"], etag=False,
+                         conditional=False)
+    resp.set_etag(info["etag"])
+    resp.last_modified = info["last_modified"]
+    resp.cache_control.public = True
+    resp.cache_control.max_age = 31536000
+    return resp
+
+
 #leer informacion de las imagenes
 @app.route('/get/<doc_id>', methods=['GET'])
 def get(doc_id):
+    cached = cache.get(doc_id)
+    if cached:
+        return respuesta_imagen(*cached)
+
     try:
         doc = collection.find_one({"_id": ObjectId(doc_id)})
         if not doc:
             return jsonify({"error": "No encontrado"}), 404
 
         image_file = fs.get(doc["image_id"])
-        image_bytes = io.BytesIO(image_file.read())
+        datos = image_file.read()
+
+        fecha = datetime.fromisoformat(doc["upload_date"]).replace(
+            tzinfo=timezone.utc, microsecond=0)
+        info = {
+            "etag": doc_id,
+            "last_modified": fecha,
+            "mimetype": doc.get("content_type") or 'image/jpeg',
+            "filename": doc['filename']
+        }
+        cache.put(doc_id, info, datos)
 
-        return send_file(image_bytes, mimetype='image/jpeg',
-                         download_name=doc['filename'])
+        return respuesta_imagen(info, datos)
     except:
         return jsonify({"error": "ID inválido"}), 400
 
 
+#buscar por metadata (fechas en ISO, tags separados por coma)
+CAMPOS_ORDEN = ("upload_date", "filename")
+
+
+def fecha_guardada(valor):
+    """
+    Convierte una fecha ISO 8601 al formato de upload_date (UTC sin zona,
+    como datetime.utcnow().isoformat()) para que la comparación de textos
+    en MongoDB sea correcta
+
+    Raises:
+        ValueError: Si la fecha no es ISO 8601
+    """
+    fecha = datetime.fromisoformat(valor)
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    return fecha.isoformat()
+
+
+def codificar_cursor(valor, ultimo_id):
+    """Token opaco con el valor de orden y el _id del último documento de la página"""
+    crudo = json_util.dumps([valor, ultimo_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(crudo).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(token):
+    try:
+        valor, ultimo_id = json_util.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return valor, ultimo_id
+    except Exception:
+        raise ValueError("Cursor de paginación inválido")
+
+
+@app.route('/search', methods=['GET'])
+def search():
+    query = {}
+
+    rango = {}
+    try:
+        if request.args.get('from'):
+            rango["$gte"] = fecha_guardada(request.args['from'])
+        if request.args.get('to'):
+            rango["$lt"] = fecha_guardada(request.args['to'])
+    except ValueError:
+        return jsonify({"error": "Las fechas deben estar en formato ISO 8601 (p. ej. 2024-01-05T10:00:00)"}), 400
+    if rango:
+        query["upload_date"] = rango
+
+    tags = [t.strip() for t in request.args.get('tags', '').split(',') if t.strip()]
+    if tags:
+        query["metadata.tags"] = {"$all": tags}
+    if request.args.get('uploader'):
+        query["metadata.uploader"] = request.args['uploader']
+    if request.args.get('device_id'):
+        query["metadata.device_id"] = request.args['device_id']
+    if request.args.get('content_type'):
+        query["content_type"] = request.args['content_type']
+
+    orden = request.args.get('sort', '-upload_date')
+    direccion = -1 if orden.startswith('-') else 1
+    campo = orden.lstrip('-+')
+    if campo not in CAMPOS_ORDEN:
+        return jsonify({"error": f"sort debe ser uno de: {', '.join(CAMPOS_ORDEN)}"}), 400
+
+    try:
+        limite = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({"error": "limit inválido"}), 400
+
+    # Paginación por cursor: continúa después del último (campo, _id) de la página anterior
+    if request.args.get('cursor'):
+        try:
+            valor, ultimo_id = decodificar_cursor(request.args['cursor'])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        op = "$lt" if direccion < 0 else "$gt"
+        query = {"$and": [query, {"$or": [
+            {campo: {op: valor}},
+            {campo: valor, "_id": {op: ultimo_id}}
+        ]}]}
+
+    # Solo metadata: nunca se leen los chunks de GridFS. Se pide uno de más
+    # para saber si hay otra página
+    docs = list(collection.find(query, {
+        "filename": 1, "content_type": 1, "upload_date": 1, "metadata": 1
+    }).sort([(campo, direccion), ("_id", direccion)]).limit(limite + 1))
+
+    siguiente = None
+    if len(docs) > limite:
+        docs = docs[:limite]
+        siguiente = codificar_cursor(docs[-1].get(campo), docs[-1]["_id"])
+
+    resultados = []
+    for doc in docs:
+        doc["id"] = str(doc.pop("_id"))
+        resultados.append(doc)
+
+    return jsonify({"limit": limite, "next": siguiente, "data": resultados}), 200
+
+
 #lista ids + nombre
 
 #editar o actualizar
@@ -115,6 +348,7 @@ def delete(doc_id):
 
         fs.delete(doc["image_id"])
         collection.delete_one({"_id": ObjectId(doc_id)})
+        cache.invalidar(doc_id)
 
         return jsonify({"message": "Eliminado correctamente"}), 200
     except:
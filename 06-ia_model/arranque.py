@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+import numpy as np
+import face_recognition
+
+
+class Cronometro:
+    """Acumula el tiempo de cada etapa del arranque para imprimir el desglose"""
+
+    def __init__(self):
+        self.etapas = []
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas.append((nombre, time.perf_counter() - inicio))
+
+    def reporte(self, titulo="Arranque"):
+        total = time.perf_counter() - self._inicio
+        detalle = " | ".join(f"{nombre} {segundos * 1000:.0f} ms" for nombre, segundos in self.etapas)
+        print(f"⏱️ {titulo}: {total * 1000:.0f} ms ({detalle})")
+
+
+def resolver_modelo(ruta_pt):
+    """
+    Prefiere un modelo exportado si existe junto a los pesos .pt:
+    OpenVINO (yolov8n_openvino_model/) y luego ONNX (yolov8n.onnx)
+    """
+    base = os.path.splitext(ruta_pt)[0]
+    for candidato in (f"{base}_openvino_model", f"{base}.onnx"):
+        if os.path.exists(candidato):
+            return candidato
+    return ruta_pt
+
+
+def cargar_modelo(ruta_pt):
+    from ultralytics import YOLO
+
+    ruta = resolver_modelo(ruta_pt)
+    print(f"🧠 Modelo: {ruta}")
+    return YOLO(ruta, task="detect")
+
+
+def calentar(pipeline, alto=480, ancho=640):
+    """
+    Inferencia de prueba para pagar la inicialización perezosa (pesos,
+    sesión ONNX/OpenVINO, modelos de dlib) antes del primer frame real
+    """
+    falso = np.zeros((alto, ancho, 3), dtype=np.uint8)
+    pipeline.model([falso], verbose=False)
+    # Con la cascada activa el frame vacío no llega a dlib: se inicializa aparte
+    pequeno = np.zeros((150, 150, 3), dtype=np.uint8)
+    face_recognition.face_encodings(pequeno, known_face_locations=[(0, 150, 150, 0)])
+
+
+def exportar(ruta_pt, formato):
+    """Exporta los pesos .pt a un formato optimizado para CPU (onnx u openvino)"""
+    from ultralytics import YOLO
+
+    # dynamic=True: sin él la exportación fija batch=1 y el modelo rechaza
+    # los micro-lotes de lotes.py (hasta MAX_LOTE frames por llamada)
+    destino = YOLO(ruta_pt).export(format=formato, dynamic=True)
+    print(f"📦 Modelo exportado: {destino}")
+
+
+if __name__ == "__main__":
+    # Uso: python arranque.py onnx|openvino [yolov8n.pt]
+    if len(sys.argv) < 2 or sys.argv[1] not in ("onnx", "openvino"):
+        print("Uso: python arranque.py onnx|openvino [yolov8n.pt]")
+        sys.exit(1)
+    exportar(sys.argv[2] if len(sys.argv) > 2 else "yolov8n.pt", sys.argv[1])
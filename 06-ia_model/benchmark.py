@@ -0,0 +1,339 @@
+"""
+Benchmark del pipeline de inferencia (decodificar -> YOLO -> rostros).
+
+Repite las imágenes .jpg de un directorio por el mismo camino que
+recibidor_mqtt.py y reporta latencia por etapa (p50/p95/p99), frames por
+segundo y RSS máximo para cada combinación de tamaño de lote y workers.
+
+    python benchmark.py --lotes 1,4,8 --workers 0,2
+    python benchmark.py --modo broker --broker localhost:1883   # con recibidor_mqtt.py corriendo
+    python benchmark.py --salida actual.json --comparar anterior.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+import numpy as np
+import cv2
+import psutil
+
+from utils import encode_frame
+
+
+def percentiles(valores_s):
+    if not valores_s:
+        return None
+    ms = np.array(valores_s) * 1000
+    return {
+        "p50": round(float(np.percentile(ms, 50)), 2),
+        "p95": round(float(np.percentile(ms, 95)), 2),
+        "p99": round(float(np.percentile(ms, 99)), 2),
+        "prom": round(float(ms.mean()), 2)
+    }
+
+
+class MuestreadorRSS:
+    """
+    Máximo de RSS durante una corrida, sumando este proceso y sus hijos
+    (workers). ru_maxrss no sirve: es el máximo de toda la vida del proceso
+    y para los hijos solo reporta el mayor de ellos.
+    """
+
+    def __init__(self, intervalo_s=0.1):
+        self.intervalo_s = intervalo_s
+        self.maximo = 0
+        self._proceso = psutil.Process()
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def _rss_actual(self):
+        total = 0
+        for proceso in [self._proceso, *self._proceso.children(recursive=True)]:
+            try:
+                total += proceso.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return total
+
+    def _muestrear(self):
+        while True:
+            self.maximo = max(self.maximo, self._rss_actual())
+            if self._parar.wait(self.intervalo_s):
+                return
+
+    def __enter__(self):
+        self.maximo = 0
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._hilo.join()
+
+    def max_mb(self):
+        return round(self.maximo / (1024 * 1024), 1)
+
+
+def cargar_jpegs(directorio, repeticiones):
+    rutas = sorted(glob.glob(os.path.join(directorio, "*.jpg")))
+    if not rutas:
+        raise SystemExit(f"No hay imágenes .jpg en {directorio}")
+    jpegs = []
+    for ruta in rutas:
+        with open(ruta, "rb") as f:
+            jpegs.append(f.read())
+    print(f"🖼️ {len(rutas)} imágenes x {repeticiones} repeticiones")
+    return jpegs * repeticiones
+
+
+def decodificar(jpeg):
+    return cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), flags=cv2.IMREAD_COLOR)
+
+
+# === EN PROCESO ===
+def correr_en_proceso(pipeline, jpegs, lote):
+    etapas = {"decodificar": [], "yolo": [], "rostros": [], "total": []}
+    inicio = time.perf_counter()
+
+    for i in range(0, len(jpegs), lote):
+        llegada = time.perf_counter()
+        imagenes = []
+        for jpeg in jpegs[i:i + lote]:
+            t = time.perf_counter()
+            imagen = decodificar(jpeg)
+            etapas["decodificar"].append(time.perf_counter() - t)
+            if imagen is not None:
+                imagenes.append(imagen)
+        if not imagenes:
+            continue
+
+        for resultado in pipeline.procesar_lote(imagenes):
+            etapas["yolo"].append(resultado["tiempos"]["yolo"])
+            etapas["rostros"].append(resultado["tiempos"]["rostros"])
+        fin = time.perf_counter()
+        etapas["total"].extend([fin - llegada] * len(imagenes))
+
+    return etapas, time.perf_counter() - inicio
+
+
+def correr_workers(jpegs, lote, workers, opciones_pipeline):
+    from trabajadores import InferencePool
+
+    etapas = {"decodificar": [], "yolo": [], "rostros": [], "total": []}
+    listos = threading.Event()
+    lock = threading.Lock()
+    # esperados se ajusta al terminar de enviar (los frames que no decodifican no se envían)
+    recibidos, esperados = [0], [len(jpegs)]
+
+    def on_resultado(contexto, resultado):
+        if "error" not in resultado:
+            etapas["yolo"].append(resultado["tiempos"]["yolo"])
+            etapas["rostros"].append(resultado["tiempos"]["rostros"])
+        etapas["total"].append(time.perf_counter() - contexto["llegada"])
+        with lock:
+            recibidos[0] += 1
+            if recibidos[0] >= esperados[0]:
+                listos.set()
+
+    pool = InferencePool(on_resultado, workers=workers, max_lote=lote,
+                         opciones_pipeline=opciones_pipeline)
+    pool.start()
+
+    invalidos = 0
+    inicio = time.perf_counter()
+    for jpeg in jpegs:
+        llegada = time.perf_counter()
+        imagen = decodificar(jpeg)
+        etapas["decodificar"].append(time.perf_counter() - llegada)
+        if imagen is None:
+            invalidos += 1
+            continue
+        # Sin descartes: se espera a que haya un slot libre
+        pool.submit(imagen, {"llegada": llegada}, esperar=True)
+
+    with lock:
+        esperados[0] = len(jpegs) - invalidos
+        if recibidos[0] >= esperados[0]:
+            listos.set()
+    listos.wait()
+    duracion = time.perf_counter() - inicio
+    pool.stop()
+    if invalidos:
+        print(f"⚠️ {invalidos} imágenes no se pudieron decodificar")
+    return etapas, duracion
+
+
+# === CON BROKER ===
+def correr_broker(jpegs, broker, topic, ventana, timeout_frame=10):
+    """
+    Publica al broker y mide hasta recibir el resultado en result/bench (recibidor_mqtt.py debe estar corriendo).
+    Un frame sin resultado tras timeout_frame segundos (omitido por MOVIMIENTO, descartado
+    con la cola llena o inválido) se da por perdido y libera su lugar en la ventana.
+    """
+    import paho.mqtt.client as mqtt
+
+    host, _, puerto = broker.partition(":")
+    enviados, latencias = {}, []
+    perdidos = [0]
+    lock = threading.Lock()
+    completos = threading.Event()
+    en_vuelo = threading.Semaphore(ventana)
+
+    def revisar_fin():
+        # Debe llamarse con el lock tomado
+        if len(latencias) + perdidos[0] == len(jpegs):
+            completos.set()
+
+    def on_message(client, userdata, msg):
+        documento = json.loads(msg.payload)
+        with lock:
+            publicado = enviados.pop(documento.get("seq"), None)
+            if publicado is None:
+                return
+            latencias.append(time.perf_counter() - publicado)
+            revisar_fin()
+        en_vuelo.release()
+
+    def expirar():
+        limite = time.perf_counter() - timeout_frame
+        with lock:
+            vencidos = [seq for seq, publicado in enviados.items() if publicado < limite]
+            for seq in vencidos:
+                del enviados[seq]
+            perdidos[0] += len(vencidos)
+            revisar_fin()
+        for _ in vencidos:
+            en_vuelo.release()
+
+    client = mqtt.Client()
+    client.on_message = on_message
+    client.connect(host, int(puerto or 1883), 60)
+    client.subscribe("result/bench", qos=1)
+    client.loop_start()
+
+    inicio = time.perf_counter()
+    for seq, jpeg in enumerate(jpegs):
+        while not en_vuelo.acquire(timeout=1):
+            expirar()
+        with lock:
+            enviados[seq] = time.perf_counter()
+        client.publish(topic, encode_frame(jpeg, {"camera_id": "bench", "seq": seq}), qos=1)
+
+    while not completos.wait(timeout=1):
+        expirar()
+    duracion = time.perf_counter() - inicio
+    client.loop_stop()
+    client.disconnect()
+
+    if perdidos[0]:
+        print(f"⚠️ {perdidos[0]} frames sin resultado (¿MOVIMIENTO=1 o cola llena en el receptor?)")
+    return {"total": latencias}, duracion
+
+
+# === REPORTE ===
+def version_codigo():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def comparar(actual, ruta_anterior):
+    with open(ruta_anterior) as f:
+        anterior = json.load(f)
+    previas = {(c["modo"], c["lote"], c["workers"]): c for c in anterior["corridas"]}
+    print(f"\n🔍 Comparación contra {ruta_anterior} ({anterior.get('version')})")
+    for corrida in actual["corridas"]:
+        previa = previas.get((corrida["modo"], corrida["lote"], corrida["workers"]))
+        if previa is None:
+            continue
+        p95 = corrida["latencias_ms"]["total"]["p95"]
+        p95_prev = previa["latencias_ms"]["total"]["p95"]
+        print(f"  {corrida['modo']} lote={corrida['lote']} workers={corrida['workers']}: "
+              f"fps {previa['fps']} -> {corrida['fps']} ({(corrida['fps'] / previa['fps'] - 1):+.0%}), "
+              f"p95 {p95_prev} -> {p95} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline de inferencia")
+    parser.add_argument("--imagenes", default=".", help="Directorio con imágenes .jpg")
+    parser.add_argument("--repeticiones", type=int, default=10)
+    parser.add_argument("--lotes", default="1,4,8", help="Tamaños de lote separados por coma")
+    parser.add_argument("--workers", default="0", help="Procesos separados por coma (0 = en proceso)")
+    parser.add_argument("--modo", choices=("proceso", "broker"), default="proceso")
+    parser.add_argument("--broker", default="localhost:1883")
+    parser.add_argument("--topic", default="imagen/entrada")
+    parser.add_argument("--ventana", type=int, default=8, help="Frames en vuelo en modo broker")
+    parser.add_argument("--timeout-frame", type=float, default=10,
+                        help="Segundos sin resultado para dar un frame por perdido (modo broker)")
+    parser.add_argument("--sin-cascada", action="store_true")
+    parser.add_argument("--salida", default="benchmark.json")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    args = parser.parse_args()
+
+    jpegs = cargar_jpegs(args.imagenes, args.repeticiones)
+    lotes = [int(x) for x in args.lotes.split(",")]
+    workers_lista = [int(x) for x in args.workers.split(",")]
+    opciones_pipeline = {"cascada": not args.sin_cascada}
+
+    corridas = []
+    pipeline = None
+    for workers in workers_lista if args.modo == "proceso" else [None]:
+        for lote in lotes if args.modo == "proceso" else [None]:
+            # El RSS se mide por corrida, desde cero
+            with MuestreadorRSS() as rss:
+                if args.modo == "broker":
+                    etapas, duracion = correr_broker(jpegs, args.broker, args.topic, args.ventana,
+                                                     args.timeout_frame)
+                elif workers == 0:
+                    if pipeline is None:
+                        from galeria import FaceGallery
+                        from pipeline import InferencePipeline
+                        from arranque import cargar_modelo, calentar
+                        gallery = FaceGallery()
+                        gallery.load()
+                        pipeline = InferencePipeline(cargar_modelo("yolov8n.pt"), gallery, **opciones_pipeline)
+                        calentar(pipeline)
+                    etapas, duracion = correr_en_proceso(pipeline, jpegs, lote)
+                else:
+                    etapas, duracion = correr_workers(jpegs, lote, workers, opciones_pipeline)
+
+            corrida = {
+                "modo": args.modo,
+                "lote": lote,
+                "workers": workers,
+                "frames": len(etapas["total"]),
+                "fps": round(len(etapas["total"]) / duracion, 2),
+                "latencias_ms": {etapa: percentiles(v) for etapa, v in etapas.items() if v},
+                "rss_max_mb": rss.max_mb()
+            }
+            corridas.append(corrida)
+            total = corrida["latencias_ms"]["total"]
+            print(f"📊 {args.modo} lote={lote} workers={workers}: {corrida['fps']} fps | "
+                  f"total p50 {total['p50']} ms, p95 {total['p95']} ms | RSS {corrida['rss_max_mb']} MB")
+
+    resultado = {
+        "version": version_codigo(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "maquina": {"cpu": platform.processor() or platform.machine(),
+                    "nucleos": os.cpu_count(), "python": platform.python_version()},
+        "corridas": corridas
+    }
+    with open(args.salida, "w") as f:
+        json.dump(resultado, f, indent=2)
+    print(f"💾 Resultados en {args.salida}")
+
+    if args.comparar:
+        comparar(resultado, args.comparar)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import os
+import threading
+import numpy as np
+import face_recognition
+
+# Extensiones de imagen que se aceptan en la galería
+EXTENSIONES = (".jpg", ".jpeg", ".png")
+
+
+class FaceGallery:
+    """
+    Galería de rostros autorizados guardada como una matriz N x 128.
+
+    Estructura del directorio:
+        autorizados/<persona>.jpg          una foto por persona
+        autorizados/<persona>/<foto>.jpg   varias fotos por persona
+
+    Los encodings se guardan en un .npz; al recargar solo se vuelven a
+    calcular las fotos nuevas o modificadas.
+    """
+
+    def __init__(self, directorio="autorizados", cache="galeria_cache.npz",
+                 tolerancia=0.6, usar_ann=False, imagen_respaldo="prueba.jpg"):
+        self.directorio = directorio
+        self.cache = cache
+        self.tolerancia = tolerancia
+        self.usar_ann = usar_ann
+        self.imagen_respaldo = imagen_respaldo
+
+        # (matriz, normas², nombres, índice ANN); se reemplaza completo al recargar
+        self._indice = (np.zeros((0, 128)), np.zeros(0), np.array([], dtype=str), None)
+        self._firma = None
+        self._hilo = None
+        self._detener = threading.Event()
+
+    def __len__(self):
+        return len(self._indice[2])
+
+    # === CARGA ===
+    def _listar_fotos(self):
+        fotos = []
+        if os.path.isdir(self.directorio):
+            for entrada in sorted(os.listdir(self.directorio)):
+                ruta = os.path.join(self.directorio, entrada)
+                if os.path.isdir(ruta):
+                    for archivo in sorted(os.listdir(ruta)):
+                        if archivo.lower().endswith(EXTENSIONES):
+                            fotos.append((entrada, os.path.join(ruta, archivo)))
+                elif entrada.lower().endswith(EXTENSIONES):
+                    fotos.append((os.path.splitext(entrada)[0], ruta))
+        elif os.path.exists(self.imagen_respaldo):
+            # Compatibilidad: sin directorio se usa la foto autorizada original
+            nombre = os.path.splitext(os.path.basename(self.imagen_respaldo))[0]
+            fotos.append((nombre, self.imagen_respaldo))
+        return fotos
+
+    def _leer_cache(self):
+        if not os.path.exists(self.cache):
+            return {}
+        try:
+            datos = np.load(self.cache, allow_pickle=False)
+            return {
+                (str(ruta), float(mtime)): (str(nombre), encoding)
+                for ruta, mtime, nombre, encoding in zip(
+                    datos["rutas"], datos["mtimes"], datos["nombres"], datos["encodings"])
+            }
+        except Exception as e:
+            print(f"⚠️ Caché de galería inválida, se recalcula: {e}")
+            return {}
+
+    def load(self):
+        """Carga (o recarga) la galería; devuelve el número de rostros"""
+        fotos = self._listar_fotos()
+        firma = tuple((ruta, os.path.getmtime(ruta)) for _, ruta in fotos)
+        if firma == self._firma:
+            return len(self)
+
+        en_cache = self._leer_cache()
+        rutas, mtimes, nombres, encodings = [], [], [], []
+        nuevas = 0
+
+        for (nombre, ruta), (_, mtime) in zip(fotos, firma):
+            guardado = en_cache.get((ruta, mtime))
+            if guardado is not None and guardado[0] == nombre:
+                encoding = guardado[1]
+            else:
+                rostros = face_recognition.face_encodings(face_recognition.load_image_file(ruta))
+                nuevas += 1
+                if not rostros:
+                    print(f"⚠️ No se detectó rostro en {ruta}, se omite")
+                    continue
+                encoding = rostros[0]
+            rutas.append(ruta)
+            mtimes.append(mtime)
+            nombres.append(nombre)
+            encodings.append(encoding)
+
+        matriz = np.ascontiguousarray(encodings, dtype=np.float64).reshape(-1, 128)
+        nombres = np.array(nombres, dtype=str)
+
+        if nuevas:
+            np.savez(self.cache, rutas=np.array(rutas, dtype=str), mtimes=np.array(mtimes),
+                     nombres=nombres, encodings=matriz)
+
+        self._indice = (matriz, (matriz ** 2).sum(axis=1), nombres, self._crear_ann(matriz))
+        self._firma = firma
+        print(f"🗂️ Galería cargada: {len(nombres)} rostros ({nuevas} calculados)")
+        return len(nombres)
+
+    def _crear_ann(self, matriz):
+        if not self.usar_ann or len(matriz) == 0:
+            return None
+        try:
+            import faiss
+        except ImportError:
+            print("⚠️ faiss no está instalado, se usa búsqueda exacta")
+            return None
+        indice = faiss.IndexHNSWFlat(128, 32)
+        indice.add(matriz.astype(np.float32))
+        return indice
+
+    # === BÚSQUEDA ===
+    def match(self, encodings):
+        """
+        Compara todos los rostros detectados contra toda la galería
+
+        Returns:
+            lista de (nombre o None, distancia) en el mismo orden de encodings
+        """
+        matriz, normas, nombres, ann = self._indice
+        if len(encodings) == 0:
+            return []
+        if len(nombres) == 0:
+            return [(None, float("inf"))] * len(encodings)
+
+        consultas = np.asarray(encodings, dtype=np.float64).reshape(-1, 128)
+
+        if ann is not None:
+            d2, idx = ann.search(consultas.astype(np.float32), 1)
+            mejores, distancias = idx[:, 0], np.sqrt(np.maximum(d2[:, 0], 0))
+        else:
+            # |a - b|² = |a|² + |b|² - 2 a·b, para todas las parejas a la vez
+            d2 = (consultas ** 2).sum(axis=1)[:, None] + normas[None, :] - 2 * consultas @ matriz.T
+            mejores = d2.argmin(axis=1)
+            distancias = np.sqrt(np.maximum(d2[np.arange(len(consultas)), mejores], 0))
+
+        return [
+            (str(nombres[i]) if d <= self.tolerancia else None, float(d))
+            for i, d in zip(mejores, distancias)
+        ]
+
+    # === RECARGA EN CALIENTE ===
+    def start_watching(self, intervalo=5):
+        """Revisa el directorio cada `intervalo` segundos y recarga si cambió"""
+        def vigilar():
+            while not self._detener.wait(intervalo):
+                try:
+                    self.load()
+                except Exception as e:
+                    print(f"❌ Error recargando galería: {e}")
+
+        self._hilo = threading.Thread(target=vigilar, daemon=True)
+        self._hilo.start()
+
+    def stop_watching(self):
+        self._detener.set()
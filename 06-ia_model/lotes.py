@@ -0,0 +1,130 @@
+import queue
+import threading
+import time
+from collections import deque
+
+
+class MicroBatcher:
+    """
+    Agrupa frames hasta `max_lote` imágenes o `max_espera_ms` milisegundos
+    y los procesa con una sola llamada, fuera del hilo de red de MQTT.
+
+    procesar(lista_de_frames) -> lista_de_resultados (mismo orden)
+    on_resultado(contexto, resultado) se llama por cada frame
+    """
+
+    def __init__(self, procesar, on_resultado, max_lote=8, max_espera_ms=50,
+                 max_cola=64, reporte_cada=10):
+        self.procesar = procesar
+        self.on_resultado = on_resultado
+        self.max_lote = max_lote
+        self.max_espera = max_espera_ms / 1000
+        self.reporte_cada = reporte_cada
+
+        self._cola = queue.Queue(maxsize=max_cola)
+        self._hilo = threading.Thread(target=self._trabajar, daemon=True)
+        self._activo = False
+
+        # Métricas
+        self._latencias = deque(maxlen=1000)   # segundos desde la llegada hasta el resultado
+        self._frames = 0
+        self._lotes = 0
+        self._descartados = 0
+        self._inicio = None
+        self._ultimo_reporte = None
+
+    def start(self):
+        self._activo = True
+        self._inicio = self._ultimo_reporte = time.monotonic()
+        self._hilo.start()
+
+    def stop(self):
+        self._activo = False
+        self._hilo.join(timeout=5)
+
+    def submit(self, frame, contexto=None):
+        """Encola un frame; si la cola está llena se descarta el más viejo"""
+        item = (time.monotonic(), frame, contexto)
+        while True:
+            try:
+                self._cola.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._cola.get_nowait()
+                    self._descartados += 1
+                except queue.Empty:
+                    pass
+
+    def pendientes(self):
+        """Frames esperando a entrar en un lote"""
+        return self._cola.qsize()
+
+    @property
+    def descartados(self):
+        return self._descartados
+
+    def _siguiente_lote(self):
+        try:
+            lote = [self._cola.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        limite = time.monotonic() + self.max_espera
+        while len(lote) < self.max_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _trabajar(self):
+        while self._activo or not self._cola.empty():
+            lote = self._siguiente_lote()
+            if not lote:
+                continue
+
+            try:
+                resultados = self.procesar([frame for _, frame, _ in lote])
+            except Exception as e:
+                print(f"❌ Error procesando lote de {len(lote)} frames: {e}")
+                continue
+
+            fin = time.monotonic()
+            for (llegada, _, contexto), resultado in zip(lote, resultados):
+                self._latencias.append(fin - llegada)
+                self.on_resultado(contexto, resultado)
+
+            self._frames += len(lote)
+            self._lotes += 1
+            if fin - self._ultimo_reporte >= self.reporte_cada:
+                self._reportar(fin)
+
+    def stats(self):
+        latencias = sorted(self._latencias)
+        transcurrido = max(time.monotonic() - (self._inicio or time.monotonic()), 1e-9)
+
+        def percentil(p):
+            if not latencias:
+                return 0.0
+            return latencias[min(int(p * len(latencias)), len(latencias) - 1)] * 1000
+
+        return {
+            "frames": self._frames,
+            "lotes": self._lotes,
+            "lote_promedio": self._frames / self._lotes if self._lotes else 0.0,
+            "fps": self._frames / transcurrido,
+            "latencia_p50_ms": percentil(0.50),
+            "latencia_p95_ms": percentil(0.95),
+            "descartados": self._descartados,
+            "en_cola": self._cola.qsize()
+        }
+
+    def _reportar(self, ahora):
+        self._ultimo_reporte = ahora
+        s = self.stats()
+        print(f"📊 {s['fps']:.1f} fps | lote prom. {s['lote_promedio']:.1f} | "
+              f"latencia p50 {s['latencia_p50_ms']:.0f} ms, p95 {s['latencia_p95_ms']:.0f} ms | "
+              f"descartados {s['descartados']} | en cola {s['en_cola']}")
@@ -0,0 +1,103 @@
+"""
+Métricas Prometheus del receptor de inferencia.
+
+    METRICAS_PUERTO=9101 python recibidor_mqtt.py
+    curl localhost:9101/metrics
+
+Los nombres y etiquetas son los mismos que usan 04-flask-api-ai
+(app/utils/metrics.py) y 02-Cloud Computing (metricas.py), así un mismo
+panel sirve para los tres servicios. Si prometheus_client no está instalado todo sigue funcionando y las
+métricas no se exportan.
+"""
+
+import time
+
+try:
+    from prometheus_client import REGISTRY, Counter, Gauge, Histogram, start_http_server
+    from prometheus_client.core import CounterMetricFamily
+except ImportError:
+    Counter = Gauge = Histogram = start_http_server = None
+
+# Segundos: desde 1 ms (decodificar) hasta varios segundos (cola llena)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class _Nulo:
+    """Métrica que no hace nada (sin prometheus_client)"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, *args):
+        pass
+
+    def observe(self, *args):
+        pass
+
+    def set_function(self, *args):
+        pass
+
+
+def _crear(tipo, *args, **kwargs):
+    return tipo(*args, **kwargs) if tipo is not None else _Nulo()
+
+
+MENSAJES = _crear(Counter, "mqtt_messages_total",
+                  "Mensajes MQTT por topic y resultado (processed, invalid, skipped)",
+                  ["topic", "outcome"])
+MANEJO = _crear(Histogram, "mqtt_handle_duration_seconds", "Tiempo dentro de on_message",
+                ["topic"], buckets=BUCKETS)
+ETAPAS = _crear(Histogram, "stage_duration_seconds", "Duración de cada etapa por frame",
+                ["stage"], buckets=BUCKETS)
+RESULTADOS = _crear(Counter, "inference_results_total", "Resultados publicados", ["authorized"])
+COLA = _crear(Gauge, "queue_depth", "Frames esperando en cada cola interna", ["queue"])
+
+
+class _Descartes:
+    """queue_dropped_total a partir del acumulado que lleva el procesador"""
+
+    def __init__(self, procesador):
+        self.procesador = procesador
+
+    def collect(self):
+        familia = CounterMetricFamily("queue_dropped", "Frames descartados por cola llena",
+                                      labels=["queue"])
+        familia.add_metric(["inference"], self.procesador.descartados)
+        yield familia
+
+
+def iniciar(puerto, procesador):
+    """Expone /metrics en `puerto` (0 = desactivado) y enlaza las colas del procesador"""
+    if not puerto:
+        return
+    if start_http_server is None:
+        print("⚠️ prometheus_client no está instalado, no se exportan métricas")
+        return
+    COLA.labels(queue="inference").set_function(procesador.pendientes)
+    REGISTRY.register(_Descartes(procesador))
+    start_http_server(puerto)
+    print(f"📈 Métricas en http://0.0.0.0:{puerto}/metrics")
+
+
+def observar_resultado(documento):
+    """Registra las etapas de un resultado ya armado (latencia_ms del esquema v1)"""
+    RESULTADOS.labels(authorized=str(documento["autorizado"]).lower()).inc()
+    if documento.get("reutilizado"):
+        return
+    for etapa, ms in documento["latencia_ms"].items():
+        if ms is not None:
+            ETAPAS.labels(stage=etapa).observe(ms / 1000)
+
+
+class cronometrar:
+    """Context manager que observa la duración en un histograma"""
+
+    def __init__(self, histograma):
+        self.histograma = histograma
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histograma.observe(time.perf_counter() - self.inicio)
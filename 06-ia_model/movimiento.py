@@ -0,0 +1,65 @@
+import time
+import cv2
+
+
+class ChangeDetector:
+    """
+    Filtro barato de cambios por cámara, antes de la inferencia.
+
+    Compara una versión pequeña en grises del frame contra el último frame
+    procesado; si cambió menos de `umbral_fraccion` de los píxeles el frame
+    se omite. Cada `keyframe_cada` frames o `keyframe_segundos` segundos se
+    fuerza un frame completo aunque no haya cambio.
+    """
+
+    def __init__(self, umbral_pixel=25, umbral_fraccion=0.01, lado=64,
+                 keyframe_cada=30, keyframe_segundos=10):
+        self.umbral_pixel = umbral_pixel
+        self.umbral_fraccion = umbral_fraccion
+        self.lado = lado
+        self.keyframe_cada = keyframe_cada
+        self.keyframe_segundos = keyframe_segundos
+
+        self._camaras = {}   # camara -> (referencia, frames desde el keyframe, hora del keyframe)
+        self.procesados = 0
+        self.omitidos = 0
+
+    def _reducir(self, image):
+        gris = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        alto = max(int(self.lado * gris.shape[0] / gris.shape[1]), 1)
+        pequeno = cv2.resize(gris, (self.lado, alto), interpolation=cv2.INTER_AREA)
+        # Suaviza el ruido del sensor para que no cuente como cambio
+        return cv2.GaussianBlur(pequeno, (3, 3), 0)
+
+    def cambio(self, camara, image):
+        """True si el frame debe pasar a inferencia, False si se puede omitir"""
+        actual = self._reducir(image)
+        ahora = time.monotonic()
+        estado = self._camaras.get(camara)
+
+        procesar = True
+        if estado is not None:
+            referencia, desde_keyframe, hora_keyframe = estado
+            es_keyframe = desde_keyframe + 1 >= self.keyframe_cada or \
+                ahora - hora_keyframe >= self.keyframe_segundos
+            if not es_keyframe and referencia.shape == actual.shape:
+                fraccion = (cv2.absdiff(actual, referencia) > self.umbral_pixel).mean()
+                procesar = fraccion >= self.umbral_fraccion
+
+        if procesar:
+            # La referencia es el último frame procesado: los cambios lentos se acumulan
+            self._camaras[camara] = (actual, 0, ahora)
+            self.procesados += 1
+        else:
+            referencia, desde_keyframe, hora_keyframe = estado
+            self._camaras[camara] = (referencia, desde_keyframe + 1, hora_keyframe)
+            self.omitidos += 1
+        return procesar
+
+    def stats(self):
+        total = self.procesados + self.omitidos
+        return {
+            "procesados": self.procesados,
+            "omitidos": self.omitidos,
+            "proporcion_omitidos": self.omitidos / total if total else 0.0
+        }
@@ -0,0 +1,106 @@
+import time
+import cv2
+import numpy as np
+import face_recognition
+
+# Clases de YOLO que interesan
+ETIQUETAS = ('person', 'dog')
+
+
+class InferencePipeline:
+    """
+    Detección YOLO + reconocimiento facial sobre uno o varios frames.
+
+    En modo cascada YOLO corre primero: si no hay personas no se hace
+    trabajo facial, y si las hay el rostro se busca solo dentro de cada
+    caja de persona, recortada y reducida a `roi_max_lado` píxeles.
+    """
+
+    def __init__(self, model, gallery, etiquetas=ETIQUETAS, cascada=True,
+                 roi_max_lado=320, margen=0.1):
+        self.model = model
+        self.gallery = gallery
+        self.etiquetas = etiquetas
+        self.cascada = cascada
+        self.roi_max_lado = roi_max_lado
+        self.margen = margen
+
+    def procesar_lote(self, imagenes):
+        """
+        Procesa una lista de imágenes (BGR) con un solo forward de YOLO
+
+        Returns:
+            lista de dicts, uno por imagen, con 'rostros', 'detecciones' y 'tiempos'
+        """
+        imagenes = list(imagenes)
+        resultados = [{"rostros": [], "detecciones": [], "tiempos": {}} for _ in imagenes]
+
+        # 1) Detección de objetos con YOLOv8: un forward para todo el lote
+        inicio = time.perf_counter()
+        salidas = self.model(imagenes, verbose=False)
+        tiempo_yolo = (time.perf_counter() - inicio) / max(len(imagenes), 1)
+
+        for resultado, r in zip(resultados, salidas):
+            for box in r.boxes:
+                cls = int(box.cls[0])
+                label = self.model.names[cls]
+                conf = float(box.conf[0])
+                if label in self.etiquetas:
+                    resultado["detecciones"].append((label, conf, [float(v) for v in box.xyxy[0]]))
+            resultado["tiempos"]["yolo"] = tiempo_yolo
+
+        # 2) Reconocimiento facial (por imagen)
+        for image, resultado in zip(imagenes, resultados):
+            inicio = time.perf_counter()
+            if self.cascada:
+                personas = [caja for label, _, caja in resultado["detecciones"] if label == 'person']
+                faces = self._rostros_en_personas(image, personas) if personas else []
+            else:
+                faces = face_recognition.face_encodings(image)
+            # Todos los rostros contra toda la galería en una sola operación
+            resultado["rostros"] = self.gallery.match(faces)
+            resultado["tiempos"]["rostros"] = time.perf_counter() - inicio
+
+        return resultados
+
+    def _rostros_en_personas(self, image, cajas):
+        """Encodings de los rostros encontrados dentro de cada caja de persona"""
+        alto, ancho = image.shape[:2]
+        encodings = []
+        for x1, y1, x2, y2 in cajas:
+            # Margen alrededor de la caja para no cortar la cabeza
+            mx, my = (x2 - x1) * self.margen, (y2 - y1) * self.margen
+            x1, y1 = max(int(x1 - mx), 0), max(int(y1 - my), 0)
+            x2, y2 = min(int(x2 + mx), ancho), min(int(y2 + my), alto)
+            if x2 <= x1 or y2 <= y1:
+                continue
+
+            roi = image[y1:y2, x1:x2]
+            escala = self.roi_max_lado / max(roi.shape[:2])
+            if escala < 1:
+                roi = cv2.resize(roi, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+            # face_recognition espera RGB y OpenCV entrega BGR
+            roi = np.ascontiguousarray(roi[:, :, ::-1])
+
+            ubicaciones = face_recognition.face_locations(roi)
+            if ubicaciones:
+                encodings.extend(face_recognition.face_encodings(roi, known_face_locations=ubicaciones))
+        return encodings
+
+
+def mostrar_resultado(resultado):
+    """Imprime el resultado de un frame con el formato original"""
+    if resultado["rostros"]:
+        for nombre, distancia in resultado["rostros"]:
+            if nombre:
+                print(f"🔐 AUTORIZADO ✅ {nombre} (distancia {distancia:.2f})")
+            else:
+                print("❌ DENEGADO: Rostro no autorizado")
+    else:
+        print("🚫 No se detectó rostro")
+
+    if resultado["detecciones"]:
+        for label, conf, _ in resultado["detecciones"]:
+            print(f"🟢 Detectado: {label} ({conf:.2f})")
+    else:
+        print("⚠️ No se detectaron personas ni perros")
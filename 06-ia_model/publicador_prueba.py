@@ -1,11 +1,22 @@
+import sys
 import json
+import time
+import uuid
 import paho.mqtt.client as mqtt
-from utils import encode_image
+from utils import encode_image, encode_frame
 
-image_b64 = encode_image("i.jpg")
-payload = json.dumps({"image": image_b64})
+IMAGEN = "i.jpg"
+
+# --legacy publica el formato anterior (JSON + base64)
+if "--legacy" in sys.argv:
+    image_b64 = encode_image(IMAGEN)
+    payload = json.dumps({"image": image_b64})
+else:
+    # El JPEG se envía tal cual, sin recodificar ni base64
+    with open(IMAGEN, "rb") as f:
+        payload = encode_frame(f.read(), {"camera_id": "prueba", "ts": time.time(), "trace_id": uuid.uuid4().hex})
 
 client = mqtt.Client()
 client.connect("localhost", 1883, 60)
 client.publish("imagen/entrada", payload)
-print("📤 Imagen enviada")
\ No newline at end of file
+print(f"📤 Imagen enviada ({len(payload)} bytes)")
\ No newline at end of file
@@ -1,59 +1,160 @@
-import face_recognition
-import base64
-import json
+import os
+import time
+import uuid
 import paho.mqtt.client as mqtt
-from utils import decode_image
-from ultralytics import YOLO
+from utils import decode_payload
+from galeria import FaceGallery
+from lotes import MicroBatcher
+from pipeline import InferencePipeline, mostrar_resultado
+from trabajadores import InferencePool
+from movimiento import ChangeDetector
+from arranque import Cronometro, cargar_modelo, calentar
+from resultados import armar_resultado, ResultPublisher, ResultSink
+import metricas
 
-# Carga rostro autorizado
-known_image = face_recognition.load_image_file("prueba.jpg")
-known_encoding = face_recognition.face_encodings(known_image)[0]
+# Micro-lotes: más imágenes por lote = más fps, más espera = más latencia
+MAX_LOTE = int(os.environ.get("MAX_LOTE", 8))
+MAX_ESPERA_MS = int(os.environ.get("MAX_ESPERA_MS", 50))
+# WORKERS > 0: inferencia en N procesos (uno por núcleo); 0: en este proceso
+WORKERS = int(os.environ.get("WORKERS", 0))
+# CASCADA=1: rostros solo dentro de las personas que detecta YOLO; 0: imagen completa
+CASCADA = os.environ.get("CASCADA", "1") == "1"
+ROI_MAX_LADO = int(os.environ.get("ROI_MAX_LADO", 320))
+# MOVIMIENTO=1: omite frames sin cambios y reutiliza el último resultado de esa cámara
+MOVIMIENTO = os.environ.get("MOVIMIENTO", "1") == "1"
+UMBRAL_MOVIMIENTO = float(os.environ.get("UMBRAL_MOVIMIENTO", 0.01))  # fracción de píxeles
+KEYFRAME_CADA = int(os.environ.get("KEYFRAME_CADA", 30))              # frames
 
-# Carga modelo YOLOv8 (asegúrate de haber descargado yolov8n.pt o usa yolov8s.pt)
-model = YOLO("yolov8n.pt")
+TOPICS = ["imagen/entrada", "camara/foto"]
+# Resultados: topic por dispositivo y, si hay MONGO_URI, persistencia por lotes
+TOPIC_RESULTADO = os.environ.get("TOPIC_RESULTADO", "result/{device_id}")
+MONGO_URI = os.environ.get("MONGO_URI")
+# Puerto del endpoint /metrics de Prometheus (0 = desactivado)
+METRICAS_PUERTO = int(os.environ.get("METRICAS_PUERTO", 9101))
+
+# asegúrate de haber descargado yolov8n.pt o usa yolov8s.pt; si existe una
+# exportación (python arranque.py onnx|openvino) se usa esa en su lugar
+MODELO = "yolov8n.pt"
+OPCIONES_GALERIA = {"directorio": "autorizados", "cache": "galeria_cache.npz"}
+OPCIONES_PIPELINE = {"cascada": CASCADA, "roi_max_lado": ROI_MAX_LADO}
+
+detector = ChangeDetector(umbral_fraccion=UMBRAL_MOVIMIENTO, keyframe_cada=KEYFRAME_CADA)
+ultimos = {}  # camara -> último resultado de inferencia
+
+publicador = None  # ResultPublisher, se crea en main()
+sink = None        # ResultSink, solo si hay MONGO_URI
+
+def on_resultado(contexto, resultado):
+    if "error" in resultado:
+        print(f"❌ Error de inferencia: {resultado['error']}")
+        return
+    if not resultado.get("reutilizado"):
+        ultimos[contexto["camara"]] = resultado
+    mostrar_resultado(resultado)
+
+    documento = armar_resultado(contexto, resultado)
+    metricas.observar_resultado(documento)
+    if publicador is not None:
+        publicador.publicar(documento)
+    if sink is not None:
+        sink.put(documento)  # No bloquea: la escritura es en otro hilo
+
+def crear_procesador():
+    """Devuelve el objeto con submit()/stop() que recibe los frames decodificados"""
+    if WORKERS > 0:
+        # Cada proceso carga su propio YOLO y galería; los frames van por memoria compartida
+        pool = InferencePool(on_resultado, workers=WORKERS, ruta_modelo=MODELO,
+                             opciones_galeria=OPCIONES_GALERIA, max_lote=MAX_LOTE,
+                             opciones_pipeline=OPCIONES_PIPELINE)
+        pool.start()
+        return pool
+
+    cronometro = Cronometro()
+
+    # Carga la galería de rostros autorizados (autorizados/ o, si no existe, prueba.jpg)
+    with cronometro.etapa("galería"):
+        gallery = FaceGallery(**OPCIONES_GALERIA)
+        gallery.load()  # Usa galeria_cache.npz: solo calcula fotos nuevas
+        gallery.start_watching(intervalo=5)  # Recarga en caliente al agregar o cambiar fotos
+
+    with cronometro.etapa("modelo"):
+        pipeline = InferencePipeline(cargar_modelo(MODELO), gallery, **OPCIONES_PIPELINE)
+
+    with cronometro.etapa("calentamiento"):
+        calentar(pipeline)
+
+    batcher = MicroBatcher(pipeline.procesar_lote, on_resultado,
+                           max_lote=MAX_LOTE, max_espera_ms=MAX_ESPERA_MS)
+    batcher.start()
+    cronometro.reporte()
+    return batcher
 
 def on_connect(client, userdata, flags, rc):
     print("✅ Conectado a MQTT")
-    client.subscribe("imagen/entrada")
+    for topic in TOPICS:
+        client.subscribe(topic)
 
 def on_message(client, userdata, msg):
+    with metricas.cronometrar(metricas.MANEJO.labels(topic=msg.topic)):
+        resultado = procesar_mensaje(msg, userdata)
+    metricas.MENSAJES.labels(topic=msg.topic, outcome=resultado).inc()
+
+def procesar_mensaje(msg, procesador):
+    """Devuelve el resultado para mqtt_messages_total ("processed", "invalid" o "skipped")"""
     print("📥 Imagen recibida")
-    data = json.loads(msg.payload.decode())
-    image = decode_image(data['image'])
-
-    # 1) Reconocimiento facial
-    faces = face_recognition.face_encodings(image)
-    if faces:
-        match = face_recognition.compare_faces([known_encoding], faces[0])[0]
-        if match:
-            print("🔐 AUTORIZADO ✅")
-        else:
-            print("❌ DENEGADO: Rostro no autorizado")
-    else:
-        print("🚫 No se detectó rostro")
-
-    # 2) Detección de objetos con YOLOv8
-    results = model(image)
-    detected = []
-    for r in results:
-        for box in r.boxes:
-            cls = int(box.cls[0])
-            label = model.names[cls]
-            conf = float(box.conf[0])
-            if label in ['person', 'dog']:
-                detected.append((label, conf))
-
-    if detected:
-        for label, conf in detected:
-            print(f"🟢 Detectado: {label} ({conf:.2f})")
-    else:
-        print("⚠️ No se detectaron personas ni perros")
-
-    # Opcional: mostrar imagen con cajas
-    # results[0].show()
-
-client = mqtt.Client()
-client.on_connect = on_connect
-client.on_message = on_message
-client.connect("localhost", 1883, 60)
-client.loop_forever()
+    recibido = time.time()
+    # Sobre binario (o JSON + base64 de publicadores anteriores)
+    try:
+        image, metadata = decode_payload(msg.payload)
+    except ValueError as e:
+        # Versión de sobre desconocida, JSON/base64 corrupto o imagen vacía:
+        # una excepción aquí detendría loop_forever
+        print(f"❌ Payload inválido: {e}")
+        return "invalid"
+
+    contexto = {"topic": msg.topic, "recibido": recibido, **metadata}
+    contexto["camara"] = metadata.get("camera_id", msg.topic)
+    contexto["decodificar"] = time.time() - recibido
+    # El trace_id viaja en los metadatos del sobre; si no viene se asigna uno
+    contexto.setdefault("trace_id", uuid.uuid4().hex)
+
+    # Frame sin cambios: se reutiliza el último resultado de la cámara
+    if MOVIMIENTO and not detector.cambio(contexto["camara"], image):
+        if contexto["camara"] in ultimos:
+            on_resultado(contexto, {**ultimos[contexto["camara"]], "reutilizado": True})
+        total = detector.procesados + detector.omitidos
+        if total % 100 == 0:
+            print(f"📉 Frames omitidos por falta de cambio: {detector.stats()['proporcion_omitidos']:.0%}")
+        return "skipped"
+
+    # La inferencia corre fuera del loop de paho
+    procesador.submit(image, contexto=contexto)
+    return "processed"
+
+def main():
+    global publicador, sink
+
+    # Todo se carga y se calienta antes de suscribirse a los topics
+    procesador = crear_procesador()
+    print("✅ Inferencia lista")
+    metricas.iniciar(METRICAS_PUERTO, procesador)
+
+    client = mqtt.Client(userdata=procesador)
+    publicador = ResultPublisher(client, TOPIC_RESULTADO)
+    if MONGO_URI:
+        sink = ResultSink(MONGO_URI)
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect("localhost", 1883, 60)
+    try:
+        client.loop_forever()
+    except KeyboardInterrupt:
+        print("🛑 Deteniendo receptor...")
+    finally:
+        procesador.stop()
+        if sink is not None:
+            sink.stop()
+        client.disconnect()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,126 @@
+import json
+import queue
+import threading
+import time
+
+VERSION_ESQUEMA = 1
+
+
+def armar_resultado(contexto, resultado):
+    """
+    Convierte el resultado de inferencia de un frame en el esquema publicado:
+
+    {
+      "v": 1, "device_id": str, "file_id": str|null, "ts": epoch,
+      "autorizado": bool, "identidad": str|null,
+      "rostros": [{"nombre": str|null, "distancia": float}],
+      "detecciones": [{"label": str, "conf": float, "box": [x1, y1, x2, y2]}],
+      "latencia_ms": {"decodificar": float, "yolo": float, "rostros": float, "total": float},
+      "reutilizado": bool, "trace_id": str
+    }
+    """
+    rostros = [
+        {"nombre": nombre, "distancia": round(distancia, 3)}
+        for nombre, distancia in resultado["rostros"]
+    ]
+    identidades = [r["nombre"] for r in rostros if r["nombre"]]
+    tiempos = resultado.get("tiempos", {})
+    recibido = contexto.get("recibido")
+
+    documento = {
+        "v": VERSION_ESQUEMA,
+        "device_id": contexto.get("camara"),
+        "file_id": contexto.get("file_id"),
+        "ts": round(time.time(), 3),
+        "autorizado": bool(identidades),
+        "identidad": identidades[0] if identidades else None,
+        "rostros": rostros,
+        "detecciones": [
+            {"label": label, "conf": round(conf, 3), "box": [round(v, 1) for v in caja]}
+            for label, conf, caja in resultado["detecciones"]
+        ],
+        "latencia_ms": {
+            "decodificar": round(contexto.get("decodificar", 0) * 1000, 1),
+            "yolo": round(tiempos.get("yolo", 0) * 1000, 1),
+            "rostros": round(tiempos.get("rostros", 0) * 1000, 1),
+            "total": round((time.time() - recibido) * 1000, 1) if recibido else None
+        },
+        "reutilizado": bool(resultado.get("reutilizado")),
+        # Mismo id que trae el sobre MQTT (o el que asignó el receptor)
+        "trace_id": contexto.get("trace_id")
+    }
+    # Número de secuencia del publicador (lo usa benchmark.py para medir extremo a extremo)
+    if "seq" in contexto:
+        documento["seq"] = contexto["seq"]
+    return documento
+
+
+class ResultPublisher:
+    """Publica cada resultado en result/{device_id} (el topic que escucha la app móvil)"""
+
+    def __init__(self, client, topic="result/{device_id}", qos=0):
+        self.client = client
+        self.topic = topic
+        self.qos = qos
+
+    def publicar(self, documento):
+        topic = self.topic.format(device_id=documento["device_id"] or "desconocido")
+        self.client.publish(topic, json.dumps(documento, separators=(",", ":")), qos=self.qos)
+
+
+class ResultSink:
+    """
+    Guarda los resultados en MongoDB con insert_many(ordered=False) por lotes,
+    desde un hilo propio. put() nunca bloquea: si la cola está llena el
+    resultado se descarta y se cuenta.
+    """
+
+    def __init__(self, uri, base="ia_model", coleccion="resultados",
+                 max_lote=200, max_espera=1.0, max_cola=10000):
+        from pymongo import MongoClient
+
+        self.coleccion = MongoClient(uri, w=1)[base][coleccion]
+        self.max_lote = max_lote
+        self.max_espera = max_espera
+        self._cola = queue.Queue(maxsize=max_cola)
+        self._activo = True
+        self.guardados = 0
+        self.descartados = 0
+        self._hilo = threading.Thread(target=self._escribir, daemon=True)
+        self._hilo.start()
+
+    def put(self, documento):
+        documento = dict(documento)
+        documento["file_id"] = self._object_id(documento.get("file_id"))
+        try:
+            self._cola.put_nowait(documento)
+        except queue.Full:
+            self.descartados += 1
+
+    def stop(self):
+        self._activo = False
+        self._hilo.join(timeout=5)
+
+    @staticmethod
+    def _object_id(file_id):
+        # Se guarda como ObjectId para poder cruzarlo con fs.files
+        from bson.objectid import ObjectId
+        return ObjectId(file_id) if file_id and ObjectId.is_valid(file_id) else file_id
+
+    def _escribir(self):
+        while self._activo or not self._cola.empty():
+            try:
+                lote = [self._cola.get(timeout=self.max_espera)]
+            except queue.Empty:
+                continue
+            limite = time.monotonic() + self.max_espera
+            while len(lote) < self.max_lote and time.monotonic() < limite:
+                try:
+                    lote.append(self._cola.get(timeout=max(limite - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            try:
+                self.coleccion.insert_many(lote, ordered=False)
+                self.guardados += len(lote)
+            except Exception as e:
+                print(f"❌ Error guardando {len(lote)} resultados: {e}")
@@ -0,0 +1,268 @@
+import queue
+import threading
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+# Tamaño máximo de un frame decodificado (BGR) que cabe en un slot
+MAX_FRAME_BYTES = 1920 * 1080 * 3
+
+# Primer elemento del aviso que manda cada proceso al terminar de arrancar
+LISTO = "listo"
+
+
+def _trabajador(nombre_shm, slot_bytes, tareas, resultados, ruta_modelo, opciones_galeria,
+                opciones_pipeline, max_lote):
+    """Proceso de inferencia: carga su propio YOLO y galería y procesa frames de la memoria compartida"""
+    from galeria import FaceGallery
+    from pipeline import InferencePipeline
+    from arranque import Cronometro, cargar_modelo, calentar
+
+    cronometro = Cronometro()
+    shm = shared_memory.SharedMemory(name=nombre_shm)
+    with cronometro.etapa("galería"):
+        gallery = FaceGallery(**opciones_galeria)
+        gallery.load()
+        gallery.start_watching(intervalo=5)
+    with cronometro.etapa("modelo"):
+        pipeline = InferencePipeline(cargar_modelo(ruta_modelo), gallery, **opciones_pipeline)
+    with cronometro.etapa("calentamiento"):
+        calentar(pipeline)
+    cronometro.reporte(f"Arranque del proceso {mp.current_process().name}")
+    resultados.put((LISTO, mp.current_process().name, None))
+
+    try:
+        while True:
+            tarea = tareas.get()
+            if tarea is None:
+                break
+            lote = [tarea]
+            # Micro-lote con lo que ya esté en cola, sin esperar
+            while len(lote) < max_lote:
+                try:
+                    siguiente = tareas.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    tareas.put(None)  # Devolver el aviso de cierre para este mismo proceso
+                    break
+                lote.append(siguiente)
+
+            # Vistas sobre la memoria compartida: no se copian los píxeles
+            imagenes = [
+                np.ndarray(forma, dtype=np.uint8, buffer=shm.buf, offset=slot * slot_bytes)
+                for _, slot, forma in lote
+            ]
+            try:
+                salidas = pipeline.procesar_lote(imagenes)
+                error = None
+            except Exception as e:
+                salidas, error = [None] * len(lote), str(e)
+            del imagenes
+
+            for (seq, slot, _), salida in zip(lote, salidas):
+                resultados.put((seq, slot, salida if error is None else {"error": error}))
+    finally:
+        gallery.stop_watching()
+        shm.close()
+
+
+class InferencePool:
+    """
+    N procesos de inferencia, cada uno con su modelo YOLO y su galería.
+
+    Los frames se copian a slots de memoria compartida y por la cola solo
+    viaja (secuencia, slot, forma). Los resultados se entregan a
+    on_resultado(contexto, resultado) en el mismo orden en que llegaron.
+
+    Si un proceso muere se reemplaza; los frames que tenía se dan por
+    perdidos tras timeout_resultado segundos (se publica un resultado
+    con "error" y se libera su slot) para no frenar a los siguientes.
+    """
+
+    def __init__(self, on_resultado, workers=2, slots=None, ruta_modelo="yolov8n.pt",
+                 opciones_galeria=None, opciones_pipeline=None, max_lote=4,
+                 max_frame_bytes=MAX_FRAME_BYTES, timeout_resultado=30):
+        self.on_resultado = on_resultado
+        self.workers = workers
+        self.slots = slots or workers * max_lote * 2
+        self.slot_bytes = max_frame_bytes
+        self.ruta_modelo = ruta_modelo
+        self.opciones_galeria = opciones_galeria or {}
+        self.opciones_pipeline = opciones_pipeline or {}
+        self.max_lote = max_lote
+        self.timeout_resultado = timeout_resultado
+
+        ctx = mp.get_context("spawn")
+        self._tareas = ctx.Queue()
+        self._resultados = ctx.Queue()
+        self._ctx = ctx
+        self._procesos = []
+        self._shm = None
+
+        self._libres = queue.Queue()
+        self._seq = 0
+        self._contextos = {}           # seq -> contexto
+        self._en_vuelo = {}            # seq -> (slot, momento de envío)
+        self._pendientes = {}          # seq -> resultado listo pero fuera de orden
+        self._siguiente = 0
+        self._lock = threading.Lock()
+        self._colector = None
+        self._detenido = False
+        self.descartados = 0
+        self.perdidos = 0              # Frames sin resultado (proceso caído o demorado)
+
+    def start(self, esperar_listos=True):
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+        for slot in range(self.slots):
+            self._libres.put(slot)
+
+        self._procesos = [self._lanzar() for _ in range(self.workers)]
+
+        if esperar_listos:
+            listos = 0
+            while listos < self.workers:
+                try:
+                    mensaje = self._resultados.get(timeout=1)
+                except queue.Empty:
+                    # Un proceso que muere al cargar el modelo nunca manda el aviso
+                    caidos = [p for p in self._procesos if p.exitcode is not None]
+                    if caidos:
+                        self.stop()
+                        raise RuntimeError(
+                            f"El proceso {caidos[0].name} terminó al arrancar (código {caidos[0].exitcode})"
+                        )
+                    continue
+                if mensaje[0] == LISTO:
+                    listos += 1
+            print(f"⚙️ {self.workers} procesos de inferencia listos")
+
+        self._colector = threading.Thread(target=self._recolectar, daemon=True)
+        self._colector.start()
+
+    def _lanzar(self):
+        proceso = self._ctx.Process(
+            target=_trabajador,
+            args=(self._shm.name, self.slot_bytes, self._tareas, self._resultados,
+                  self.ruta_modelo, self.opciones_galeria, self.opciones_pipeline,
+                  self.max_lote),
+            daemon=True
+        )
+        proceso.start()
+        return proceso
+
+    def submit(self, frame, contexto=None, esperar=False):
+        """
+        Copia el frame a un slot libre y lo encola; devuelve False si se descartó.
+        Con esperar=True bloquea hasta que haya un slot (no usar desde el loop de MQTT).
+        """
+        if frame.nbytes > self.slot_bytes:
+            print(f"⚠️ Frame de {frame.nbytes} bytes supera el slot, se descarta")
+            self.descartados += 1
+            return False
+        try:
+            slot = self._libres.get(block=esperar)
+        except queue.Empty:
+            # Todos los slots ocupados: no bloquear el loop de MQTT
+            self.descartados += 1
+            return False
+
+        destino = np.ndarray(frame.shape, dtype=np.uint8, buffer=self._shm.buf,
+                             offset=slot * self.slot_bytes)
+        destino[...] = frame
+        del destino
+
+        with self._lock:
+            seq = self._seq
+            self._seq += 1
+            self._contextos[seq] = contexto
+            self._en_vuelo[seq] = (slot, time.monotonic())
+        self._tareas.put((seq, slot, frame.shape))
+        return True
+
+    def pendientes(self):
+        """Frames enviados a los procesos que aún no tienen resultado"""
+        with self._lock:
+            return len(self._contextos)
+
+    def _recolectar(self):
+        while True:
+            try:
+                mensaje = self._resultados.get(timeout=1)
+            except queue.Empty:
+                mensaje = None
+            if mensaje is not None:
+                seq, slot, resultado = mensaje
+                if seq is None:
+                    break
+                # Los avisos de arranque (start sin esperar o procesos de reemplazo) se ignoran
+                if seq != LISTO:
+                    self._recibir(seq, slot, resultado)
+            self._vigilar()
+            self._publicar()
+
+    def _recibir(self, seq, slot, resultado):
+        with self._lock:
+            if self._en_vuelo.pop(seq, None) is None:
+                # Ya se dio por perdido y su slot se liberó entonces
+                return
+            self._pendientes[seq] = resultado
+        self._libres.put(slot)
+
+    def _vigilar(self):
+        """Reemplaza procesos caídos y da por perdidos los frames sin resultado"""
+        with self._lock:
+            if not self._detenido:
+                for i, proceso in enumerate(self._procesos):
+                    if proceso.exitcode is not None:
+                        print(f"⚠️ El proceso {proceso.name} terminó (código {proceso.exitcode}), se reemplaza")
+                        self._procesos[i] = self._lanzar()
+
+            limite = time.monotonic() - self.timeout_resultado
+            vencidos = [(seq, slot) for seq, (slot, enviado) in self._en_vuelo.items() if enviado < limite]
+            for seq, _ in vencidos:
+                del self._en_vuelo[seq]
+                self._pendientes[seq] = {"error": f"Sin resultado después de {self.timeout_resultado} s"}
+                self.perdidos += 1
+
+        for _, slot in vencidos:
+            self._libres.put(slot)
+
+    def _publicar(self):
+        # Publicar en orden de llegada, reteniendo los que se adelantan
+        with self._lock:
+            listos = []
+            while self._siguiente in self._pendientes:
+                listos.append((self._contextos.pop(self._siguiente),
+                               self._pendientes.pop(self._siguiente)))
+                self._siguiente += 1
+
+        for contexto, resultado in listos:
+            try:
+                self.on_resultado(contexto, resultado)
+            except Exception as e:
+                print(f"❌ Error publicando resultado: {e}")
+
+    def stop(self, timeout=10):
+        """Cierre ordenado: termina lo encolado, detiene procesos y libera la memoria compartida"""
+        with self._lock:
+            self._detenido = True
+            procesos = list(self._procesos)
+        for _ in procesos:
+            self._tareas.put(None)
+        for proceso in procesos:
+            proceso.join(timeout)
+            if proceso.is_alive():
+                proceso.terminate()
+        self._procesos = []
+
+        self._resultados.put((None, None, None))
+        if self._colector is not None:
+            self._colector.join(timeout)
+
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+        print("🛑 Procesos de inferencia detenidos")
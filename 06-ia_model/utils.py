@@ -1,7 +1,14 @@
-
 import cv2
 import numpy as np
 import base64
+import json
+import struct
+
+# Sobre binario para imágenes por MQTT:
+#   "IAF1" | versión (1 byte) | flags (1 byte) | largo metadatos (2 bytes) | metadatos JSON | JPEG
+MAGIC = b"IAF1"
+VERSION = 1
+HEADER = struct.Struct("!4sBBH")
 
 def encode_image(image_path):
     image = cv2.imread(image_path)
@@ -10,5 +17,53 @@ def encode_image(image_path):
 
 def decode_image(b64_string):
     img_bytes = base64.b64decode(b64_string)
-    img_array = np.frombuffer(img_bytes, dtype=np.uint8)
-    return cv2.imdecode(img_array, flags=cv2.IMREAD_COLOR)
\ No newline at end of file
+    return _imdecode(np.frombuffer(img_bytes, dtype=np.uint8))
+
+def _imdecode(img_array):
+    # cv2.imdecode lanza cv2.error con un buffer vacío y devuelve None si no es una imagen
+    if img_array.size == 0:
+        raise ValueError("El payload no trae imagen")
+    image = cv2.imdecode(img_array, flags=cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("La imagen no se pudo decodificar")
+    return image
+
+def encode_frame(jpeg_bytes, metadata=None):
+    """Arma el sobre binario: cabecera fija + metadatos JSON + JPEG sin base64"""
+    meta = json.dumps(metadata or {}, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(MAGIC, VERSION, 0, len(meta)) + meta + jpeg_bytes
+
+def decode_payload(payload):
+    """
+    Decodifica un payload MQTT en (imagen BGR, metadatos).
+    Acepta el sobre binario, un JPEG crudo y el formato anterior {"image": base64, ...}.
+
+    Raises:
+        ValueError: Si el payload no tiene ninguno de esos formatos o la imagen no decodifica
+    """
+    if payload[:4] == MAGIC:
+        if len(payload) < HEADER.size:
+            raise ValueError("Cabecera de sobre incompleta")
+        _, version, _, meta_len = HEADER.unpack_from(payload)
+        if version != VERSION:
+            raise ValueError(f"Versión de sobre no soportada: {version}")
+        inicio = HEADER.size + meta_len
+        if len(payload) < inicio:
+            raise ValueError("Metadatos de sobre incompletos")
+        metadata = json.loads(bytes(payload[HEADER.size:inicio])) if meta_len else {}
+        if not isinstance(metadata, dict):
+            raise ValueError("Los metadatos del sobre deben ser un objeto JSON")
+        # Vista sobre el mismo buffer del mensaje, sin copiar el JPEG
+        img_array = np.frombuffer(payload, dtype=np.uint8, offset=inicio)
+        return _imdecode(img_array), metadata
+
+    # JPEG crudo (por ejemplo camara/foto), sin metadatos
+    if payload[:2] == b"\xff\xd8":
+        return _imdecode(np.frombuffer(payload, dtype=np.uint8)), {}
+
+    # Formato anterior (JSON + base64), se mantiene durante la migración
+    data = json.loads(payload)
+    if not isinstance(data, dict) or not isinstance(data.get('image'), str):
+        raise ValueError("Se esperaba un objeto JSON con la imagen en base64")
+    image = decode_image(data.pop('image'))
+    return image, data